@@ -1,576 +1,849 @@
-import streamlit as st
-import pandas as pd
-import sqlite3
-import random
-import time
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-import plotly.express as px
-
-# --- CONFIGURAÇÃO DA PÁGINA ---
-st.set_page_config(page_title="PeegFlow ERP", layout="wide", page_icon="🔹")
-
-# Paleta PeegFlow
-CORES = {
-    'Azul': '#4169E1', 'Vermelho': '#D50000', 'Amarelo': '#FFD700', 
-    'Cinza': '#E0E0E0', 'Verde': '#2E7D32', 'Roxo': '#6A1B9A',
-    'Fundo': '#F0F2F6'
-}
-
-# --- CAMADA DE DADOS ---
-
-def init_db():
-    """Cria a estrutura do banco se não existir"""
-    conn = sqlite3.connect('peegflow.db')
-    c = conn.cursor()
-    
-    # Tabelas
-    c.execute('''CREATE TABLE IF NOT EXISTS usuarios (
-                    id INTEGER PRIMARY KEY, usuario TEXT, senha TEXT, nome TEXT, cargo TEXT, perfil TEXT)''')
-
-    c.execute('''CREATE TABLE IF NOT EXISTS clientes (
-                    id INTEGER PRIMARY KEY, nome TEXT, cpf_cnpj TEXT, setor TEXT, 
-                    porte TEXT, filiais INTEGER, endereco TEXT, email TEXT, data_cadastro DATE)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS contratos (
-                    id INTEGER PRIMARY KEY, cliente_id INTEGER, tipo TEXT, valor_total REAL, 
-                    qtd_parcelas INTEGER, inicio DATE, fim DATE, status TEXT,
-                    FOREIGN KEY(cliente_id) REFERENCES clientes(id))''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS projetos (
-                    id INTEGER PRIMARY KEY, contrato_id INTEGER, nome TEXT, 
-                    inicio DATE, fim DATE, status TEXT, responsavel TEXT,
-                    FOREIGN KEY(contrato_id) REFERENCES contratos(id))''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS tarefas (
-                    id INTEGER PRIMARY KEY, projeto_id INTEGER, descricao TEXT, tipo TEXT,
-                    data_limite DATE, responsavel TEXT, status TEXT, data_conclusao DATE,
-                    FOREIGN KEY(projeto_id) REFERENCES projetos(id))''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS financeiro (
-                    id INTEGER PRIMARY KEY, contrato_id INTEGER, tipo TEXT, categoria TEXT, 
-                    valor REAL, data_vencimento DATE, status TEXT,
-                    FOREIGN KEY(contrato_id) REFERENCES contratos(id))''')
-    
-    # Cria admin padrão se vazio
-    c.execute("SELECT count(*) FROM usuarios")
-    if c.fetchone()[0] == 0:
-        c.execute("INSERT INTO usuarios (usuario, senha, nome, cargo, perfil) VALUES (?,?,?,?,?)",
-                  ("admin", "123", "Carlos Gestor", "CEO", "admin"))
-        
-    conn.commit()
-    conn.close()
-
-def gerar_demo_robusta():
-    """Popula o banco com 20 clientes, histórico financeiro e tarefas"""
-    conn = sqlite3.connect('peegflow.db')
-    c = conn.cursor()
-    
-    # Evita duplicidade se já rodou
-    c.execute("SELECT count(*) FROM clientes")
-    if c.fetchone()[0] > 0:
-        conn.close()
-        return
-
-    # 1. Equipe
-    equipe = [
-        ("ana", "123", "Ana Silva", "Consultora Pleno", "user"),
-        ("bruno", "123", "Bruno Souza", "Consultor Jr", "user"),
-        ("roberto", "123", "Roberto TI", "Tech Lead", "user"),
-        ("julia", "123", "Julia Financeiro", "Analista", "user")
-    ]
-    c.executemany("INSERT INTO usuarios (usuario, senha, nome, cargo, perfil) VALUES (?,?,?,?,?)", equipe)
-
-    # 2. Clientes (20)
-    nomes = ["Inova", "Agro", "Tech", "Log", "Construtora", "Hospital", "Escola", "Varejo", "Consultoria", "Indústria"]
-    sufixos = ["Solutions", "Corp", "Brasil", "S.A.", "Global", "Systems", "Partners", "Ltda"]
-    setores = ["Tecnologia", "Agronegócio", "Saúde", "Educação", "Varejo", "Indústria"]
-    
-    hoje = datetime.now()
-    
-    for i in range(20):
-        nome = f"{random.choice(nomes)} {random.choice(sufixos)} {i+1}"
-        cnpj = f"{random.randint(10,99)}.456.789/0001-{random.randint(10,99)}"
-        setor = random.choice(setores)
-        c.execute("INSERT INTO clientes (nome, cpf_cnpj, setor, porte, filiais, endereco, email, data_cadastro) VALUES (?,?,?,?,?,?,?,?)", 
-                  (nome, cnpj, setor, random.choice(["Médio", "Grande"]), random.randint(1,5), "Av. Central, 1000", f"contato@cli{i}.com", (hoje-timedelta(days=random.randint(100,400))).date()))
-        cli_id = i + 1
-        
-        # 3. Contratos e Projetos (70% de chance)
-        if random.random() > 0.3:
-            tipo = random.choice(["Estratégia", "Financeira", "TI", "RH"])
-            valor = random.choice([30000, 60000, 120000])
-            inicio = hoje - timedelta(days=random.randint(30, 180))
-            meses = 6
-            fim = inicio + relativedelta(months=meses)
-            status_ct = "Ativo" if fim > hoje else "Encerrado"
-            
-            c.execute("INSERT INTO contratos (cliente_id, tipo, valor_total, qtd_parcelas, inicio, fim, status) VALUES (?,?,?,?,?,?,?)",
-                      (cli_id, tipo, valor, meses, inicio.date(), fim.date(), status_ct))
-            ct_id = c.lastrowid
-            
-            # Financeiro (Parcelas)
-            val_parc = valor/meses
-            for m in range(meses):
-                venc = inicio + relativedelta(months=m)
-                stt_fin = "Pago" if venc < hoje else "Aberto"
-                c.execute("INSERT INTO financeiro (contrato_id, tipo, categoria, valor, data_vencimento, status) VALUES (?,?,?,?,?,?)",
-                          (ct_id, "Receita", f"Parcela {m+1}/{meses}", val_parc, venc.date(), stt_fin))
-            
-            # Projeto
-            resp = random.choice(["Ana Silva", "Bruno Souza", "Roberto TI"])
-            status_pj = "Em Andamento" if status_ct == "Ativo" else "Concluído"
-            c.execute("INSERT INTO projetos (contrato_id, nome, inicio, fim, status, responsavel) VALUES (?,?,?,?,?,?)",
-                      (ct_id, f"Projeto {nome}", inicio.date(), fim.date(), status_pj, resp))
-            pj_id = c.lastrowid
-            
-            # Tarefas
-            tasks = ["Kickoff", "Diagnóstico", "Desenvolvimento", "Treinamento", "Entrega Final"]
-            for t_desc in tasks:
-                d_lim = inicio + timedelta(days=random.randint(10, 150))
-                stt_task = "Concluída" if d_lim < hoje and random.random() > 0.2 else "Pendente"
-                d_conc = d_lim if stt_task == "Concluída" else None
-                c.execute("INSERT INTO tarefas (projeto_id, descricao, tipo, data_limite, responsavel, status, data_conclusao) VALUES (?,?,?,?,?,?,?)",
-                          (pj_id, t_desc, "Etapa", d_lim.date(), resp, stt_task, d_conc))
-
-    # 4. Despesas Recorrentes (Últimos 6 meses)
-    cats = [("Salários", 40000), ("Aluguel", 5000), ("Impostos", 8000), ("Software", 2000)]
-    for m in range(-5, 2):
-        dt_ref = hoje + relativedelta(months=m)
-        dt_venc = dt_ref.replace(day=10)
-        stt = "Pago" if dt_venc < hoje else "Aberto"
-        for cat, val in cats:
-            val_var = val * random.uniform(0.95, 1.05)
-            c.execute("INSERT INTO financeiro (tipo, categoria, valor, data_vencimento, status) VALUES (?,?,?,?,?)",
-                      ("Despesa", cat, val_var, dt_venc.date(), stt))
-
-    conn.commit()
-    conn.close()
-
-def run_query(query, params=(), fetch=False):
-    conn = sqlite3.connect('peegflow.db')
-    c = conn.cursor()
-    c.execute(query, params)
-    if fetch:
-        data = c.fetchall()
-        cols = [description[0] for description in c.description]
-        df = pd.DataFrame(data, columns=cols)
-        conn.close()
-        return df
-    conn.commit()
-    conn.close()
-
-# --- AUTOMAÇÃO E LÓGICA ---
-
-def criar_financeiro_contrato(ct_id, valor, parcelas, inicio):
-    """Gera Contas a Receber automaticamente"""
-    conn = sqlite3.connect('peegflow.db')
-    c = conn.cursor()
-    val_p = valor / parcelas
-    dt_ini = pd.to_datetime(inicio)
-    
-    for i in range(parcelas):
-        venc = dt_ini + relativedelta(months=i)
-        c.execute("INSERT INTO financeiro (contrato_id, tipo, categoria, valor, data_vencimento, status) VALUES (?,?,?,?,?,?)",
-                  (ct_id, "Receita", f"Mensalidade {i+1}/{parcelas}", val_p, venc.date(), "Aberto"))
-    conn.commit()
-    conn.close()
-
-# --- TELAS / MÓDULOS ---
-
-def login_page():
-    st.markdown(f"""
-    <div style='text-align: center; padding: 20px;'>
-        <h1 style='color: {CORES['Azul']}'>PeegFlow ERP</h1>
-        <p>Sistema Integrado de Gestão & Projetos</p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    c1, c2, c3 = st.columns([1, 1.5, 1])
-    with c2:
-        with st.container(border=True):
-            st.markdown("### Acesso ao Sistema")
-            with st.form("login"):
-                user = st.text_input("Usuário")
-                pwd = st.text_input("Senha", type="password")
-                
-                st.markdown("---")
-                # SELETOR DE DEMO
-                usar_demo = st.checkbox("📌 Carregar Dados de Demonstração (Demo Mode)", value=False)
-                
-                if st.form_submit_button("Entrar", type="primary"):
-                    # Inicializa DB básico
-                    init_db()
-                    
-                    # Se pediu demo, roda o gerador
-                    if usar_demo:
-                        gerar_demo_robusta()
-                    
-                    # Verifica credenciais
-                    df = run_query("SELECT * FROM usuarios WHERE usuario=? AND senha=?", (user, pwd), fetch=True)
-                    if not df.empty:
-                        st.session_state['logged_in'] = True
-                        st.session_state['user_name'] = df.iloc[0]['nome']
-                        st.session_state['role'] = df.iloc[0]['perfil']
-                        st.rerun()
-                    else:
-                        st.error("Usuário ou senha incorretos.")
-            
-            st.caption("Credenciais Padrão: `admin` / `123`")
-
-def dashboard_view():
-    st.title("📊 Dashboard Executivo")
-    st.markdown("Visão consolidada de performance.")
-    
-    # 1. Filtros Globais
-    with st.container(border=True):
-        c1, c2, c3, c4 = st.columns([1, 1, 2, 1])
-        dt_ini = c1.date_input("De", datetime.now() - timedelta(days=90))
-        dt_fim = c2.date_input("Até", datetime.now() + timedelta(days=30))
-        visao = c3.selectbox("Visualização de Gráficos", ["Financeiro", "Eficiência Equipe", "CRM Clientes"])
-        
-        if c4.button("🔄 Atualizar KPIs"):
-            st.rerun()
-
-    # 2. KPIs (Top)
-    df_fin = run_query("SELECT * FROM financeiro", fetch=True)
-    df_proj = run_query("SELECT * FROM projetos", fetch=True)
-    
-    # Filtragem básica para KPIs acumulados
-    receita = df_fin[df_fin['tipo']=='Receita']['valor'].sum()
-    despesa = df_fin[df_fin['tipo']=='Despesa']['valor'].sum()
-    saldo = receita - despesa
-    ativos = len(df_proj[df_proj['status']=='Em Andamento'])
-    
-    k1, k2, k3, k4 = st.columns(4)
-    k1.metric("Saldo Geral", f"R$ {saldo:,.2f}", delta="Acumulado Caixa")
-    k2.metric("Projetos Ativos", ativos, delta="Em execução")
-    k3.metric("Faturamento", f"R$ {receita:,.2f}", delta="Total")
-    k4.metric("Despesas", f"R$ {despesa:,.2f}", delta_color="inverse")
-
-    st.markdown("---")
-
-    # 3. Gráficos Dinâmicos
-    df_fin['data_vencimento'] = pd.to_datetime(df_fin['data_vencimento'])
-    mask = (df_fin['data_vencimento'].dt.date >= dt_ini) & (df_fin['data_vencimento'].dt.date <= dt_fim)
-    df_filt = df_fin.loc[mask]
-
-    if visao == "Financeiro":
-        col_g1, col_g2 = st.columns([2, 1])
-        with col_g1:
-            # Fluxo de Caixa no Tempo
-            df_time = df_filt.groupby([pd.Grouper(key='data_vencimento', freq='M'), 'tipo'])['valor'].sum().reset_index()
-            fig = px.bar(df_time, x='data_vencimento', y='valor', color='tipo', barmode='group',
-                         title="Fluxo de Caixa Mensal",
-                         color_discrete_map={'Receita': CORES['Azul'], 'Despesa': CORES['Vermelho']})
-            st.plotly_chart(fig, use_container_width=True)
-        with col_g2:
-            # Custos
-            df_desp = df_filt[df_filt['tipo']=='Despesa']
-            if not df_desp.empty:
-                fig2 = px.pie(df_desp, values='valor', names='categoria', title="Share de Despesas", hole=0.4,
-                              color_discrete_sequence=px.colors.sequential.RdBu)
-                st.plotly_chart(fig2, use_container_width=True)
-            else:
-                st.info("Sem despesas no período.")
-
-    elif visao == "Eficiência Equipe":
-        df_tasks = run_query("SELECT * FROM tarefas", fetch=True)
-        # Ranking
-        df_rank = df_tasks[df_tasks['status']=='Concluída'].groupby('responsavel').count().reset_index()
-        
-        c1, c2 = st.columns(2)
-        with c1:
-            fig = px.bar(df_rank, x='responsavel', y='id', title="Tarefas Concluídas por Consultor",
-                         labels={'id': 'Entregas'}, color='id', color_continuous_scale='Blues')
-            st.plotly_chart(fig, use_container_width=True)
-        with c2:
-            st.subheader("Top Performers 🏆")
-            st.dataframe(df_rank.sort_values('id', ascending=False), use_container_width=True, hide_index=True)
-
-    elif visao == "CRM Clientes":
-        df_cli = run_query("SELECT * FROM clientes", fetch=True)
-        c1, c2 = st.columns(2)
-        with c1:
-            fig = px.pie(df_cli, names='setor', title="Carteira por Setor")
-            st.plotly_chart(fig, use_container_width=True)
-        with c2:
-            st.metric("Total de Clientes", len(df_cli))
-            st.dataframe(df_cli[['nome', 'setor', 'porte']], use_container_width=True, hide_index=True)
-
-def crm_view():
-    st.title("🤝 CRM & Contratos")
-    tab1, tab2, tab3 = st.tabs(["Base de Clientes", "Novo Cadastro", "Gerar Contrato"])
-    
-    with tab1:
-        df = run_query("SELECT id, nome, cpf_cnpj, setor, email FROM clientes", fetch=True)
-        st.dataframe(df, use_container_width=True, hide_index=True)
-        
-    with tab2:
-        with st.form("new_cli"):
-            st.subheader("Cadastro de Cliente")
-            c1, c2 = st.columns(2)
-            nm = c1.text_input("Nome/Razão Social")
-            doc = c2.text_input("CNPJ/CPF")
-            c3, c4 = st.columns(2)
-            setor = c3.selectbox("Setor", ["Tecnologia", "Varejo", "Indústria", "Serviços"])
-            porte = c4.selectbox("Porte", ["Pequeno", "Médio", "Grande"])
-            end = st.text_input("Endereço")
-            email = st.text_input("Email")
-            
-            if st.form_submit_button("Salvar Cliente"):
-                run_query("INSERT INTO clientes (nome, cpf_cnpj, setor, porte, filiais, endereco, email, data_cadastro) VALUES (?,?,?,?,?,?,?,?)",
-                          (nm, doc, setor, porte, 1, end, email, datetime.now().date()))
-                st.success("Cliente Cadastrado!")
-                st.rerun()
-
-    with tab3:
-        st.info("ℹ️ Este formulário cria o contrato e gera o financeiro automaticamente.")
-        clientes = run_query("SELECT id, nome FROM clientes", fetch=True)
-        if not clientes.empty:
-            opts = clientes.set_index('id')['nome'].to_dict()
-            with st.form("new_ct"):
-                cli_id = st.selectbox("Cliente", options=opts.keys(), format_func=lambda x: opts[x])
-                c1, c2 = st.columns(2)
-                tipo = c1.selectbox("Tipo", ["Consultoria TI", "Financeira", "Estratégica"])
-                val = c2.number_input("Valor Total (R$)", min_value=1000.0)
-                c3, c4 = st.columns(2)
-                parc = c3.number_input("Parcelas", min_value=1, value=6)
-                ini = c4.date_input("Início")
-                
-                if st.form_submit_button("Firmar Contrato"):
-                    fim = pd.to_datetime(ini) + relativedelta(months=parc)
-                    run_query("INSERT INTO contratos (cliente_id, tipo, valor_total, qtd_parcelas, inicio, fim, status) VALUES (?,?,?,?,?,?,?)",
-                              (cli_id, tipo, val, parc, ini, fim.date(), "Ativo"))
-                    res = run_query("SELECT last_insert_rowid()", fetch=True)
-                    ct_id = res.iloc[0][0]
-                    
-                    criar_financeiro_contrato(ct_id, val, parc, ini)
-                    st.success("Contrato Gerado e Parcelas lançadas!")
-        else:
-            st.warning("Cadastre clientes primeiro.")
-
-def projetos_view():
-    st.title("📅 Projetos & Tarefas (Operacional)")
-    
-    # Seção 1: Criar Novo Projeto (Vinculado)
-    with st.expander("➕ Iniciar Novo Projeto"):
-        cts = run_query("SELECT ct.id, c.nome, ct.tipo FROM contratos ct JOIN clientes c ON ct.cliente_id = c.id WHERE ct.status='Ativo'", fetch=True)
-        if not cts.empty:
-            cts['label'] = cts['nome'] + " - " + cts['tipo']
-            opts = cts.set_index('id')['label'].to_dict()
-            
-            with st.form("new_pj"):
-                ct_sel = st.selectbox("Contrato Base", options=opts.keys(), format_func=lambda x: opts[x])
-                nm_pj = st.text_input("Nome do Projeto", value="Implantação Consultoria")
-                resp = st.selectbox("Líder", ["Ana Silva", "Bruno Souza", "Roberto TI", "Carlos Gestor"])
-                c1, c2 = st.columns(2)
-                ini = c1.date_input("Início")
-                fim = c2.date_input("Entrega")
-                
-                st.markdown("**Tarefas Iniciais (Separar por vírgula):**")
-                tasks = st.text_area("", "Reunião Kickoff, Diagnóstico, Planejamento")
-                
-                if st.form_submit_button("Criar Projeto"):
-                    run_query("INSERT INTO projetos (contrato_id, nome, inicio, fim, status, responsavel) VALUES (?,?,?,?,?,?)",
-                              (ct_sel, nm_pj, ini, fim, "Em Andamento", resp))
-                    res = run_query("SELECT last_insert_rowid()", fetch=True)
-                    pj_id = res.iloc[0][0]
-                    
-                    if tasks:
-                        for t in tasks.split(','):
-                            run_query("INSERT INTO tarefas (projeto_id, descricao, tipo, data_limite, responsavel, status) VALUES (?,?,?,?,?,?)",
-                                      (pj_id, t.strip(), "Inicial", ini, resp, "Pendente"))
-                    st.success("Projeto Criado!")
-                    st.rerun()
-        else:
-            st.warning("Sem contratos ativos.")
-
-    st.markdown("---")
-    
-# Seção 2: Gerenciamento (Editável)
-    pjs = run_query("SELECT p.id, p.nome, c.nome as cli, p.inicio, p.fim, p.status, p.responsavel FROM projetos p JOIN contratos ct ON p.contrato_id = ct.id JOIN clientes c ON ct.cliente_id = c.id", fetch=True)
-    
-    if not pjs.empty:
-        # --- 1. CRONOGRAMA VISUAL (GANTT) ---
-        st.subheader("Visão Geral do Cronograma")
-        
-        # Converter datas para datetime para o Plotly não dar erro
-        pjs['inicio'] = pd.to_datetime(pjs['inicio'])
-        pjs['fim'] = pd.to_datetime(pjs['fim'])
-        
-        # Gráfico de Gantt
-        fig = px.timeline(pjs, x_start="inicio", x_end="fim", y="nome", color="status",
-                          hover_data=["cli", "responsavel"],
-                          title="Linha do Tempo dos Projetos",
-                          color_discrete_map={"Em Andamento": CORES['Azul'], "Concluído": CORES['Verde']})
-        
-        # Ordenar cronograma para o mais recente ficar no topo (opcional)
-        fig.update_yaxes(autorange="reversed") 
-        st.plotly_chart(fig, use_container_width=True)
-        
-        st.markdown("---")
-
-        # --- 2. SELEÇÃO DE PROJETO (MENU SUSPENSO) ---
-        st.subheader("Gerenciar Tarefas do Projeto")
-        
-        # Cria um dicionário para formatar o nome no menu: "ID - Nome Projeto - Cliente"
-        # Isso facilita a busca pelo usuário
-        opcoes_proj = {row['id']: f"{row['nome']} - {row['cli']}" for i, row in pjs.iterrows()}
-        
-        sel_pj = st.selectbox(
-            "Selecione o Projeto para editar:", 
-            options=opcoes_proj.keys(), 
-            format_func=lambda x: opcoes_proj[x]
-        )
-        
-        # --- 3. EDITOR DE TAREFAS ---
-        if sel_pj:
-            st.markdown(f"**Editando:** {opcoes_proj[sel_pj]}")
-            df_t = run_query("SELECT id, descricao, data_limite, responsavel, status FROM tarefas WHERE projeto_id=?", (sel_pj,), fetch=True)
-            
-            if not df_t.empty:
-                # CORREÇÃO CRÍTICA: Converte data para datetime antes do editor
-                df_t['data_limite'] = pd.to_datetime(df_t['data_limite'])
-
-                # Editor de Dados (CRUD Tabela)
-                edited = st.data_editor(
-                    df_t,
-                    column_config={
-                        "id": None,
-                        "status": st.column_config.SelectboxColumn("Status", options=["Pendente", "Em Andamento", "Concluída"]),
-                        "data_limite": st.column_config.DateColumn("Prazo"),
-                        "responsavel": st.column_config.SelectboxColumn("Responsável", options=["Ana Silva", "Bruno Souza", "Roberto TI", "Carlos Gestor"])
-                    },
-                    hide_index=True,
-                    use_container_width=True,
-                    key="editor_task"
-                )
-                
-                col_btn, col_info = st.columns([1, 4])
-                with col_btn:
-                    if st.button("💾 Salvar Alterações"):
-                        for i, row in edited.iterrows():
-                            d_conc = datetime.now().date() if row['status'] == 'Concluída' else None
-                            # Verifica se a data é NaT (Not a Time) ou válida antes de salvar
-                            nova_data = row['data_limite'].date() if pd.notnull(row['data_limite']) else None
-                            
-                            run_query("UPDATE tarefas SET status=?, data_limite=?, responsavel=?, data_conclusao=? WHERE id=?",
-                                      (row['status'], nova_data, row['responsavel'], d_conc, row['id']))
-                        st.success("Salvo!")
-                        time.sleep(0.5)
-                        st.rerun()
-            else:
-                st.info("Este projeto ainda não tem tarefas cadastradas.")
-            
-            # --- 4. ADICIONAR TAREFA RÁPIDA ---
-            with st.expander("➕ Adicionar Nova Tarefa", expanded=False):
-                with st.form("fast_task"):
-                    c1, c2, c3 = st.columns([2, 1, 1])
-                    desc = c1.text_input("Descrição da Tarefa")
-                    who = c2.selectbox("Responsável", ["Ana Silva", "Bruno Souza", "Roberto TI", "Carlos Gestor"])
-                    prazo = c3.date_input("Prazo Limite")
-                    
-                    if st.form_submit_button("Adicionar Tarefa"):
-                        run_query("INSERT INTO tarefas (projeto_id, descricao, tipo, data_limite, responsavel, status) VALUES (?,?,?,?,?,?)",
-                                  (sel_pj, desc, "Extra", prazo, who, "Pendente"))
-                        st.success("Tarefa Adicionada!")
-                        st.rerun()
-
-def financeiro_view():
-    st.title("💰 Gestão Financeira")
-    
-    # Filtros
-    c1, c2, c3 = st.columns(3)
-    mes = c1.selectbox("Mês", range(1,13), index=datetime.now().month-1)
-    ano = c2.number_input("Ano", value=datetime.now().year)
-    view = c3.selectbox("Filtro", ["Todos", "Receita", "Despesa"])
-    
-    # Query Dinâmica
-    sql = "SELECT id, tipo, categoria, valor, data_vencimento, status FROM financeiro WHERE strftime('%m', data_vencimento) = ? AND strftime('%Y', data_vencimento) = ?"
-    args = [f"{mes:02d}", str(ano)]
-    if view != "Todos":
-        sql += " AND tipo = ?"
-        args.append(view)
-        
-    df = run_query(sql, tuple(args), fetch=True)
-    
-    # KPIs Mensais
-    r = df[df['tipo']=='Receita']['valor'].sum()
-    d = df[df['tipo']=='Despesa']['valor'].sum()
-    
-    k1, k2, k3 = st.columns(3)
-    k1.metric("Entradas (Mês)", f"R$ {r:,.2f}")
-    k2.metric("Saídas (Mês)", f"R$ {d:,.2f}")
-    k3.metric("Resultado (Mês)", f"R$ {r-d:,.2f}", delta_color="normal")
-    
-    st.divider()
-    
-    if not df.empty:
-        st.subheader("Lançamentos (Clique para editar)")
-        
-        # CORREÇÃO CRÍTICA: Converter data string para datetime
-        df['data_vencimento'] = pd.to_datetime(df['data_vencimento'])
-
-        edited_fin = st.data_editor(
-            df,
-            column_config={
-                "id": None,
-                "valor": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
-                "status": st.column_config.SelectboxColumn("Status", options=["Aberto", "Pago", "Atrasado"], required=True),
-                "data_vencimento": st.column_config.DateColumn("Vencimento")
-            },
-            hide_index=True,
-            use_container_width=True
-        )
-        
-        if st.button("💾 Atualizar Financeiro"):
-            for i, row in edited_fin.iterrows():
-                run_query("UPDATE financeiro SET status=?, valor=?, data_vencimento=? WHERE id=?",
-                          (row['status'], row['valor'], pd.to_datetime(row['data_vencimento']).date(), row['id']))
-            st.success("Atualizado!")
-            time.sleep(0.5)
-            st.rerun()
-            
-    # Lançamento Avulso
-    with st.expander("Novo Lançamento Avulso (Ex: Conta Luz)"):
-        with st.form("avulso"):
-            c1, c2, c3 = st.columns(3)
-            tp = c1.selectbox("Tipo", ["Despesa", "Receita"])
-            cat = c2.text_input("Categoria")
-            val = c3.number_input("Valor")
-            dt = st.date_input("Vencimento")
-            if st.form_submit_button("Lançar"):
-                run_query("INSERT INTO financeiro (tipo, categoria, valor, data_vencimento, status) VALUES (?,?,?,?,?)",
-                          (tp, cat, val, dt, "Aberto"))
-                st.rerun()
-
-# --- ORQUESTRADOR ---
-
-if 'logged_in' not in st.session_state:
-    st.session_state['logged_in'] = False
-
-if not st.session_state['logged_in']:
-    login_page()
-else:
-    # Sidebar de Navegação
-    with st.sidebar:
-        st.markdown(f"## PeegFlow")
-        st.caption(f"Olá, {st.session_state['user_name']}")
-        st.markdown("---")
-        
-        if st.session_state['role'] == 'admin':
-            menu = st.radio("Navegação", ["Dashboard", "CRM & Contratos", "Projetos", "Financeiro"])
-        else:
-            menu = st.radio("Navegação", ["Projetos"])
-            
-        st.markdown("---")
-        if st.button("Sair"):
-            st.session_state['logged_in'] = False
-            st.rerun()
-
-    # Roteamento
-    if menu == "Dashboard": dashboard_view()
-    elif menu == "CRM & Contratos": crm_view()
-    elif menu == "Projetos": projetos_view()
-    elif menu == "Financeiro": financeiro_view()
\ No newline at end of file
+import time
+
+# Cronômetro da tela: no primeiro run do processo inclui os imports abaixo
+INICIO_SCRIPT = time.perf_counter()
+
+import streamlit as st
+from streamlit.errors import StreamlitAPIException
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from busca import buscar
+from consultas import (ORDENS_CLIENTES, aging_recebiveis, clientes_por_setor, contar_clientes,
+                       contar_cronograma, cronograma_por_cliente, cronograma_projetos,
+                       despesas_por_categoria, entregas_por_responsavel, fluxo_caixa_mensal,
+                       kpis_gerais, pagina_clientes, pagina_lancamentos, projetos_com_cliente,
+                       frame_tarefas, sql_clientes, sql_lancamentos, sql_projetos_tarefas,
+                       referencia_aging, totais_mes)
+from db import atualizar_versionado, cache_consultas, em_paralelo, executar_lote, get_pool, preparar_banco, run_query
+from exportacao import DEPENDENCIAS, FORMATOS_EXPORTACAO, disponivel, exportar
+import graficos
+from graficos import CORES, GANTT_MAX_BARRAS
+from jobs import CONCLUIDO, ERRO, get_agendador, get_fila, jobs_por_id, ultimo_job
+from metricas import metricas
+from mudancas import IDADE_SEQ, INTERVALO_ATUALIZACAO, sincronizar, ultima_seq
+from usuarios import COOKIE_SESSAO, SESSAO_HORAS, autenticar, criar_sessao, encerrar_sessao, equipe, sessao
+
+# --- CONFIGURAÇÃO DA PÁGINA ---
+st.set_page_config(page_title="PeegFlow ERP", layout="wide", page_icon="🔹")
+
+# Migrações uma vez por processo; nos demais reruns é só um acerto no cache
+preparar_banco()
+
+# --- INICIALIZAÇÃO EM SEGUNDO PLANO ---
+
+def periodo_padrao():
+    """Período inicial dos filtros do dashboard"""
+    hoje = datetime.now()
+    return (hoje - timedelta(days=90)).date(), (hoje + timedelta(days=30)).date()
+
+def aquecer(pool):
+    """Abre o pool e prepara o dashboard (carregando pandas e plotly) enquanto o usuário faz login"""
+    with metricas.medir("inicio", "aquecimento") as m:
+        m['conexoes'] = pool.aquecer()
+        # Consultas e figuras da primeira visão do dashboard (ficam nos caches, com os mesmos argumentos)
+        dt_ini, dt_fim = periodo_padrao()
+        kpis_gerais()
+        graficos.fluxo_caixa(fluxo_caixa_mensal(dt_ini, dt_fim))
+        df_desp = despesas_por_categoria(dt_ini, dt_fim)
+        if not df_desp.empty:
+            graficos.despesas(df_desp)
+
+@st.cache_resource(show_spinner=False)
+def iniciar_aquecimento():
+    """Dispara aquecer() uma vez por processo, depois que a primeira tela já foi enviada"""
+    threading.Thread(target=aquecer, args=(get_pool(),), name="peegflow-aquecimento", daemon=True).start()
+    return True
+
+# --- AUTOMAÇÃO E LÓGICA ---
+
+def enfileirar_job(tipo, params=None):
+    """Enfileira o job e passa a acompanhá-lo no painel da sessão"""
+    job_id = get_fila().enfileirar(tipo, params, usuario=st.session_state.get('user_name'))
+    # Job único já na fila (ex.: demo): o painel continua acompanhando o mesmo
+    if job_id not in st.session_state.setdefault('jobs', []):
+        st.session_state['jobs'].append(job_id)
+    return job_id
+
+def reexecutar_painel():
+    """Reexecuta só o fragment atual; numa execução completa da página (ex.: AppTest) reexecuta tudo"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+def linhas_alteradas(original, editado, colunas):
+    """Linhas do data_editor que mudaram em alguma das colunas (compara pelo índice)"""
+    antes = original[colunas]
+    depois = editado.loc[antes.index, colunas]
+    iguais = (antes == depois) | (antes.isna() & depois.isna())
+    return editado.loc[~iguais.all(axis=1)]
+
+def gravar_edicoes(chave, tabela, colunas, alteradas, valores):
+    """Grava as linhas alteradas do data_editor só onde a versão lida ainda vale (controle otimista).
+
+    `valores(row)` dá os valores de `colunas` para uma linha. As linhas que outra pessoa
+    alterou nesse meio tempo não são gravadas: ficam em session_state[chave], com a
+    edição desta sessão, para painel_conflitos. Devolve (gravadas, em conflito).
+    """
+    edicoes = {int(row['id']): (valores(row), int(row['versao'])) for _, row in alteradas.iterrows()}
+    conflitos = atualizar_versionado(tabela, colunas, [(*v, i, versao) for i, (v, versao) in edicoes.items()])
+    if conflitos:
+        pendentes = st.session_state.setdefault(chave, {'tabela': tabela, 'colunas': colunas, 'linhas': {}})
+        pendentes['linhas'].update({i: edicoes[i][0] for i in conflitos})
+    return len(edicoes) - len(conflitos), len(conflitos)
+
+def painel_conflitos(chave, ao_resolver):
+    """Edições recusadas por conflito: a versão atual ao lado da desta sessão, para escolher qual fica"""
+    import pandas as pd
+
+    pendentes = st.session_state.get(chave)
+    if not pendentes:
+        return
+    tabela, colunas, linhas = pendentes['tabela'], pendentes['colunas'], pendentes['linhas']
+    ids = list(linhas)
+    atual = run_query(f"SELECT id, versao, {', '.join(colunas)} FROM {tabela} WHERE id IN ({','.join('?' * len(ids))})",
+                      ids, fetch=True).set_index('id')
+    # Linhas apagadas por outra pessoa não têm mais o que mesclar
+    for i in set(ids) - set(atual.index):
+        linhas.pop(i)
+    if not linhas:
+        st.session_state.pop(chave)
+        return
+    st.warning(f"{len(linhas)} linha(s) foram alteradas por outra pessoa depois que você abriu a tela; "
+               "sua edição nelas não foi gravada.")
+    comparacao = pd.concat([atual.loc[list(linhas), colunas].assign(origem="Atual"),
+                            pd.DataFrame(list(linhas.values()), index=list(linhas), columns=colunas)
+                            .assign(origem="Sua edição")])
+    # Texto em todas as células: o banco devolve datas como texto e a edição como date
+    comparacao[colunas] = comparacao[colunas].map(lambda v: "" if v is None or pd.isna(v) else str(v))
+    st.dataframe(comparacao.rename_axis('id').reset_index().sort_values(['id', 'origem'])[['id', 'origem', *colunas]],
+                 hide_index=True, use_container_width=True)
+    c1, c2 = st.columns(2)
+    if c1.button("Manter a versão atual", key=f"{chave}_manter"):
+        st.session_state.pop(chave)
+        ao_resolver()
+    if c2.button("Gravar a minha por cima", key=f"{chave}_gravar"):
+        # Contra a versão que acabou de ser mostrada: se mudou de novo, o conflito volta
+        lote = [(*v, i, int(atual.at[i, 'versao'])) for i, v in linhas.items()]
+        conflitos = set(atualizar_versionado(tabela, colunas, lote))
+        pendentes['linhas'] = {i: v for i, v in linhas.items() if i in conflitos}
+        if not conflitos:
+            st.session_state.pop(chave)
+        ao_resolver()
+
+# --- COMPONENTES DE TELA ---
+
+TAMANHOS_PAGINA = [25, 50, 100, 200]
+
+def paginador(chave, assinatura, carregar):
+    """Navegação keyset com a pilha de cursores em session_state.
+
+    `carregar(cursor)` devolve (DataFrame, próximo cursor); mudar a `assinatura`
+    (busca, ordem, tamanho...) volta para a primeira página.
+    """
+    est = st.session_state.get(chave)
+    if est is None or est['assinatura'] != assinatura:
+        est = st.session_state[chave] = {'assinatura': assinatura, 'cursores': [None]}
+    df, proximo = carregar(est['cursores'][-1])
+    
+    # Callbacks em vez de st.rerun(): o clique já dispara o rerun, que dentro de um
+    # fragment reexecuta só o fragment
+    c1, c2, c3 = st.columns([1, 1, 4])
+    c1.button("◀ Anterior", key=f"{chave}_ant", disabled=len(est['cursores']) == 1, on_click=est['cursores'].pop)
+    c2.button("Próxima ▶", key=f"{chave}_prox", disabled=proximo is None,
+              on_click=est['cursores'].append, args=(proximo,))
+    c3.caption(f"Página {len(est['cursores'])}")
+    return df
+
+def botoes_exportacao(chave, nome_arquivo, sql, args=()):
+    """Um botão de download por formato; o arquivo só é gerado, em fluxo, no clique"""
+    for col, (formato, (ext, mime)) in zip(st.columns(len(FORMATOS_EXPORTACAO)), FORMATOS_EXPORTACAO.items()):
+        ok = disponivel(formato)
+        col.download_button(f"⬇️ {formato}", data=(lambda f=formato: exportar(sql, args, f)) if ok else b"",
+                            file_name=f"{nome_arquivo}.{ext}", mime=mime, key=f"{chave}_{ext}", on_click="ignore",
+                            disabled=not ok, help=None if ok else f"Requer o pacote {DEPENDENCIAS[formato]}")
+
+def grade_clientes(chave, colunas="id, nome, cpf_cnpj, setor, email", column_config=None, exportar=False):
+    """Grade de clientes paginada com busca e ordenação feitas no SQLite"""
+    c1, c2, c3, c4 = st.columns([3, 1, 1, 1])
+    busca = c1.text_input("Buscar (nome, CNPJ/CPF ou setor)", key=f"{chave}_busca").strip()
+    ordem = c2.selectbox("Ordenar por", list(ORDENS_CLIENTES), key=f"{chave}_ordem")
+    desc = c3.selectbox("Direção", ["Crescente", "Decrescente"], key=f"{chave}_dir") == "Decrescente"
+    tamanho = c4.selectbox("Por página", TAMANHOS_PAGINA, index=1, key=f"{chave}_tam")
+    
+    st.caption(f"{contar_clientes(busca)} cliente(s)")
+    df = paginador(chave, (busca, ordem, desc, tamanho),
+                   lambda cursor: pagina_clientes(cursor, tamanho, busca, ORDENS_CLIENTES[ordem], desc, colunas))
+    st.dataframe(df, column_config=column_config, use_container_width=True, hide_index=True)
+    if exportar:
+        st.caption("Exportar clientes" + (f" (busca: {busca})" if busca else ""))
+        botoes_exportacao(f"{chave}_exp", "clientes", *sql_clientes(busca))
+
+def importador(tabela, titulo):
+    """Upload de CSV/Parquet importado em segundo plano, com o resultado da última importação"""
+    painel = st.expander(f"📥 {titulo}", key=f"imp_{tabela}_painel", on_change="rerun")
+    if not painel.open:
+        return
+    from importacao import COLUNAS, FORMATOS, OBRIGATORIAS, guardar_upload
+
+    with painel:
+        st.caption(f"Colunas: {', '.join(COLUNAS[tabela])} (obrigatórias: {', '.join(OBRIGATORIAS[tabela])}). "
+                   "Datas em AAAA-MM-DD ou dd/mm/aaaa; CSV separado por vírgula ou ponto e vírgula.")
+        arquivo = st.file_uploader("Arquivo", type=FORMATOS, key=f"imp_{tabela}")
+        if arquivo is not None and st.button("Importar", key=f"imp_{tabela}_btn"):
+            enfileirar_job("importacao", {'tabela': tabela, 'caminho': guardar_upload(arquivo), 'apagar': True})
+            st.success("Importação iniciada! Acompanhe o progresso na barra lateral.")
+
+        ultimo = ultimo_job("importacao", tabela=tabela)
+        if ultimo is not None and ultimo['status'] == CONCLUIDO:
+            res = json.loads(ultimo['resultado'])
+            st.caption(f"Última importação: {res['importadas']} de {res['lidas']} linha(s) "
+                       f"({res['linhas_s'] or 0:,} linhas/s), {res['rejeitadas']} recusada(s).")
+            if res['rejeitados'] and os.path.exists(res['rejeitados']):
+                with open(res['rejeitados'], "rb") as f:
+                    st.download_button("Baixar linhas recusadas", f, file_name=f"{tabela}_rejeitados.csv",
+                                       mime="text/csv", key=f"imp_{tabela}_rej")
+        elif ultimo is not None and ultimo['status'] == ERRO:
+            st.caption(f"Última importação falhou: {ultimo['erro']}")
+
+def painel_aging():
+    """Aging dos recebíveis atrasados, lido do resumo que o lote de inadimplência mantém"""
+    painel = st.expander("📆 Inadimplência (aging dos recebíveis)", key="fin_aging_painel", on_change="rerun")
+    if not painel.open:
+        return
+    with painel:
+        c1, c2 = st.columns([4, 1])
+        por = c1.radio("Agrupar por", ["Cliente", "Contrato"], horizontal=True, key="fin_aging_por")
+        if c2.button("🔄 Recalcular agora", key="fin_aging_btn"):
+            enfileirar_job("inadimplencia")
+            st.success("Recálculo iniciado! Acompanhe o progresso na barra lateral.")
+        df = aging_recebiveis(por_contrato=por == "Contrato")
+        referencia = referencia_aging()
+        if df.empty:
+            st.info("Nenhum recebível atrasado no último cálculo.")
+            return
+        st.caption(f"Posição de {datetime.fromisoformat(referencia):%d/%m/%Y}, "
+                   "recalculada periodicamente pelo lote de inadimplência.")
+        moeda = st.column_config.NumberColumn(format="R$ %.2f")
+        st.dataframe(df, column_config={c: moeda for c in ["0-30", "31-60", "61-90", "90+", "total"]},
+                     use_container_width=True, hide_index=True)
+
+# --- SESSÃO DO USUÁRIO ---
+
+def entrar(usuario, token):
+    st.session_state['logged_in'] = True
+    st.session_state['user_id'], st.session_state['user_name'], st.session_state['role'] = usuario
+    st.session_state['token_sessao'] = token
+
+def retomar_sessao():
+    """Sessão nova do navegador (recarga, outra aba) com token válido no cookie entra sem conferir a senha"""
+    token = st.context.cookies.get(COOKIE_SESSAO)
+    if not isinstance(token, str):
+        # Sem navegador (AppTest, modo bare) não há cookies de verdade
+        return
+    usuario = sessao(token)
+    if usuario:
+        entrar(usuario, token)
+    elif token:
+        # Token vencido ou revogado: o cookie é apagado
+        st.session_state['cookie_sessao'] = ""
+
+def gravar_cookie(token):
+    """Grava (ou apaga, com token vazio) o cookie da sessão no navegador.
+
+    O Streamlit não envia Set-Cookie, então o cookie é gravado por JavaScript e não pode
+    ser HttpOnly; dura o mesmo que a sessão no servidor e, em https, só trafega cifrado.
+    """
+    validade = int(SESSAO_HORAS * 3600) if token else 0
+    st.html(f"<script>document.cookie = '{COOKIE_SESSAO}={token}; path=/; max-age={validade}; SameSite=Strict'"
+            " + (location.protocol === 'https:' ? '; Secure' : '');</script>", unsafe_allow_javascript=True)
+
+# --- TELAS / MÓDULOS ---
+
+def login_page():
+    st.markdown(f"""
+    <div style='text-align: center; padding: 20px;'>
+        <h1 style='color: {CORES['Azul']}'>PeegFlow ERP</h1>
+        <p>Sistema Integrado de Gestão & Projetos</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    c1, c2, c3 = st.columns([1, 1.5, 1])
+    with c2:
+        with st.container(border=True):
+            st.markdown("### Acesso ao Sistema")
+            with st.form("login"):
+                user = st.text_input("Usuário")
+                pwd = st.text_input("Senha", type="password")
+                
+                st.markdown("---")
+                # SELETOR DE DEMO
+                usar_demo = st.checkbox("📌 Carregar Dados de Demonstração (Demo Mode)", value=False)
+                
+                if st.form_submit_button("Entrar", type="primary"):
+                    # Se pediu demo, roda o gerador em segundo plano
+                    if usar_demo:
+                        enfileirar_job("demo")
+                    
+                    # Verifica credenciais
+                    usuario = autenticar(user, pwd)
+                    if usuario:
+                        token = criar_sessao(usuario[0])
+                        entrar(usuario, token)
+                        # O cookie é gravado no próximo rerun (o rerun daqui descartaria o script)
+                        st.session_state['cookie_sessao'] = token
+                        st.rerun()
+                    else:
+                        st.error("Usuário ou senha incorretos.")
+            
+            st.caption("Credenciais Padrão: `admin` / `123`")
+
+@metricas.cronometrar("tela")
+def dashboard_view():
+    st.title("📊 Dashboard Executivo")
+    st.markdown("Visão consolidada de performance.")
+    
+    # 1. Filtros Globais
+    with st.container(border=True):
+        c1, c2, c3, c4 = st.columns([1, 1, 2, 1])
+        padrao_ini, padrao_fim = periodo_padrao()
+        dt_ini = c1.date_input("De", padrao_ini)
+        dt_fim = c2.date_input("Até", padrao_fim)
+        visao = c3.selectbox("Visualização de Gráficos", ["Financeiro", "Eficiência Equipe", "CRM Clientes"])
+        
+        if c4.button("🔄 Atualizar KPIs"):
+            st.rerun()
+
+    # 2. Consultas da tela disparadas juntas (KPIs + gráficos da visão), cada uma numa conexão do pool
+    chamadas = {'kpis': (kpis_gerais,)}
+    if visao == "Financeiro":
+        chamadas['fluxo'] = (fluxo_caixa_mensal, dt_ini, dt_fim)
+        chamadas['despesas'] = (despesas_por_categoria, dt_ini, dt_fim)
+    elif visao == "Eficiência Equipe":
+        chamadas['entregas'] = (entregas_por_responsavel,)
+    elif visao == "CRM Clientes":
+        chamadas['setores'] = (clientes_por_setor,)
+    dados = em_paralelo(chamadas)
+
+    # KPIs (Top) - agregados no SQLite
+    kpis = dados['kpis']
+    receita, despesa = kpis['receita'], kpis['despesa']
+    saldo = kpis['saldo']
+    ativos = kpis['ativos']
+    
+    k1, k2, k3, k4 = st.columns(4)
+    k1.metric("Saldo Geral", f"R$ {saldo:,.2f}", delta="Acumulado Caixa")
+    k2.metric("Projetos Ativos", ativos, delta="Em execução")
+    k3.metric("Faturamento", f"R$ {receita:,.2f}", delta="Total")
+    k4.metric("Despesas", f"R$ {despesa:,.2f}", delta_color="inverse")
+
+    st.markdown("---")
+
+    # 3. Gráficos Dinâmicos
+    if visao == "Financeiro":
+        col_g1, col_g2 = st.columns([2, 1])
+        with col_g1:
+            # Fluxo de Caixa no Tempo
+            df_time = dados['fluxo']
+            with metricas.medir("grafico", "Fluxo de Caixa Mensal"):
+                st.plotly_chart(graficos.fluxo_caixa(df_time), use_container_width=True)
+        with col_g2:
+            # Custos
+            df_desp = dados['despesas']
+            if not df_desp.empty:
+                with metricas.medir("grafico", "Share de Despesas"):
+                    st.plotly_chart(graficos.despesas(df_desp), use_container_width=True)
+            else:
+                st.info("Sem despesas no período.")
+
+    elif visao == "Eficiência Equipe":
+        # Ranking
+        df_rank = dados['entregas']
+        
+        c1, c2 = st.columns(2)
+        with c1:
+            with metricas.medir("grafico", "Tarefas Concluídas por Consultor"):
+                st.plotly_chart(graficos.entregas(df_rank), use_container_width=True)
+        with c2:
+            st.subheader("Top Performers 🏆")
+            st.dataframe(df_rank, use_container_width=True, hide_index=True)
+
+    elif visao == "CRM Clientes":
+        df_setor = dados['setores']
+        c1, c2 = st.columns(2)
+        with c1:
+            with metricas.medir("grafico", "Carteira por Setor"):
+                st.plotly_chart(graficos.setores(df_setor), use_container_width=True)
+        with c2:
+            st.metric("Total de Clientes", int(df_setor['qtd'].sum()))
+            grade_clientes("dash_cli", colunas="id, nome, cpf_cnpj, setor, porte", column_config={"id": None})
+
+@st.fragment
+@metricas.cronometrar("tela")
+def painel_clientes():
+    """Busca e paginação da base; só este painel reexecuta ao interagir"""
+    grade_clientes("crm_cli", exportar=True)
+
+@metricas.cronometrar("tela")
+def crm_view():
+    st.title("🤝 CRM & Contratos")
+    # Só a aba aberta é executada (e consulta o banco)
+    tab1, tab2, tab3 = st.tabs(["Base de Clientes", "Novo Cadastro", "Gerar Contrato"], key="crm_aba", on_change="rerun")
+    
+    if tab1.open:
+        with tab1:
+            painel_clientes()
+        
+    if tab2.open:
+        with tab2:
+            with st.form("new_cli"):
+                st.subheader("Cadastro de Cliente")
+                c1, c2 = st.columns(2)
+                nm = c1.text_input("Nome/Razão Social")
+                doc = c2.text_input("CNPJ/CPF")
+                c3, c4 = st.columns(2)
+                setor = c3.selectbox("Setor", ["Tecnologia", "Varejo", "Indústria", "Serviços"])
+                porte = c4.selectbox("Porte", ["Pequeno", "Médio", "Grande"])
+                end = st.text_input("Endereço")
+                email = st.text_input("Email")
+            
+                if st.form_submit_button("Salvar Cliente"):
+                    run_query("INSERT INTO clientes (nome, cpf_cnpj, setor, porte, filiais, endereco, email, data_cadastro) VALUES (?,?,?,?,?,?,?,?)",
+                              (nm, doc, setor, porte, 1, end, email, datetime.now().date()))
+                    st.success("Cliente Cadastrado!")
+                    st.rerun()
+            importador("clientes", "Importar clientes (CSV/Parquet)")
+
+    if tab3.open:
+        with tab3:
+            st.info("ℹ️ Este formulário cria o contrato e gera o financeiro automaticamente.")
+            clientes = run_query("SELECT id, nome FROM clientes", fetch=True, cache=True)
+            if not clientes.empty:
+                opts = clientes.set_index('id')['nome'].to_dict()
+                with st.form("new_ct"):
+                    cli_id = st.selectbox("Cliente", options=opts.keys(), format_func=lambda x: opts[x])
+                    c1, c2 = st.columns(2)
+                    tipo = c1.selectbox("Tipo", ["Consultoria TI", "Financeira", "Estratégica"])
+                    val = c2.number_input("Valor Total (R$)", min_value=1000.0)
+                    c3, c4 = st.columns(2)
+                    parc = c3.number_input("Parcelas", min_value=1, value=6)
+                    ini = c4.date_input("Início")
+                    c5, c6 = st.columns(2)
+                    venc1 = c5.date_input("1º vencimento", value=None, help="Padrão: a data de início")
+                    dia = c6.number_input("Dia do vencimento", min_value=1, max_value=31, value=None,
+                                          help="Padrão: o dia do 1º vencimento; nos meses mais curtos, o último dia")
+                
+                    if st.form_submit_button("Firmar Contrato"):
+                        enfileirar_job("contrato", {'cliente_id': int(cli_id), 'tipo': tipo, 'valor': val,
+                                                    'parcelas': int(parc), 'inicio': ini.isoformat(),
+                                                    'primeiro_vencimento': venc1.isoformat() if venc1 else None,
+                                                    'dia_vencimento': int(dia) if dia else None})
+                        st.success("Contrato enviado! As parcelas são lançadas em segundo plano.")
+            else:
+                st.warning("Cadastre clientes primeiro.")
+
+@st.fragment
+@metricas.cronometrar("tela")
+def painel_cronograma(status_opcoes):
+    """Gantt com seus filtros; mexer nos filtros só reexecuta este painel"""
+    # Janela do cronograma (filtrada no SQLite)
+    hoje = datetime.now().date()
+    c1, c2, c3 = st.columns([2, 2, 1])
+    janela = c1.date_input("Período", (hoje - timedelta(days=180), hoje + timedelta(days=180)), key="gantt_periodo")
+    status = c2.multiselect("Status", status_opcoes, key="gantt_status")
+    # Período apagado no seletor chega como tupla vazia: não há janela a consultar
+    qtd = contar_cronograma(janela[0], janela[-1], status) if janela else 0
+    # Muitas barras: uma por cliente, a menos que o usuário peça o detalhe
+    por_cliente = c3.toggle("Agrupar por cliente", value=qtd > GANTT_MAX_BARRAS)
+    
+    if not janela:
+        st.info("Escolha o período do cronograma.")
+    elif qtd == 0:
+        st.info("Nenhum projeto no período.")
+    else:
+        st.caption(f"{qtd} projeto(s) no período" +
+                   (f" · acima de {GANTT_MAX_BARRAS} barras o cronograma é agrupado por cliente" if qtd > GANTT_MAX_BARRAS else ""))
+        dados = (cronograma_por_cliente if por_cliente else cronograma_projetos)(janela[0], janela[-1], status)
+        # Gráfico de Gantt (figura memoizada pelo conteúdo)
+        with metricas.medir("grafico", "Linha do Tempo dos Projetos"):
+            st.plotly_chart(graficos.gantt(dados, por_cliente), use_container_width=True)
+    with st.expander("⬇️ Exportar projetos e tarefas"):
+        botoes_exportacao("pj_exp", "projetos_tarefas", *sql_projetos_tarefas())
+
+@st.fragment
+@metricas.cronometrar("tela")
+def painel_tarefas(pjs):
+    """Seleção de projeto e editor de tarefas; trocar de projeto só reexecuta este painel"""
+    import pandas as pd
+
+    # Cria um dicionário para formatar o nome no menu: "ID - Nome Projeto - Cliente"
+    # Isso facilita a busca pelo usuário
+    opcoes_proj = {row['id']: f"{row['nome']} - {row['cli']}" for i, row in pjs.iterrows()}
+    
+    # A busca global pode ter escolhido um projeto que não está na lista
+    if st.session_state.get('proj_sel') not in opcoes_proj:
+        st.session_state.pop('proj_sel', None)
+    sel_pj = st.selectbox(
+        "Selecione o Projeto para editar:", 
+        options=opcoes_proj.keys(), 
+        format_func=lambda x: opcoes_proj[x],
+        key="proj_sel"
+    )
+    
+    # --- 3. EDITOR DE TAREFAS ---
+    if sel_pj:
+        st.markdown(f"**Editando:** {opcoes_proj[sel_pj]}")
+        # O frame fica na sessão e é atualizado pelo log de mudanças: só as tarefas alteradas são relidas
+        frame = st.session_state.get('frame_tarefas')
+        if frame is None or frame.args != (sel_pj,):
+            frame = st.session_state['frame_tarefas'] = frame_tarefas(sel_pj)
+        else:
+            frame.atualizar()
+        df_t = frame.df
+        
+        if not df_t.empty:
+            # Editor de Dados (CRUD Tabela)
+            edited = st.data_editor(
+                df_t,
+                column_config={
+                    "id": None,
+                    "versao": None,
+                    "status": st.column_config.SelectboxColumn("Status", options=["Pendente", "Em Andamento", "Concluída"]),
+                    "data_limite": st.column_config.DateColumn("Prazo"),
+                    # Equipe do cadastro de usuários, mais quem já responde por alguma tarefa (importada, ex-membro)
+                    "responsavel": st.column_config.SelectboxColumn(
+                        "Responsável", options=sorted(set(equipe()).union(df_t['responsavel'].dropna())))
+                },
+                hide_index=True,
+                use_container_width=True,
+                key="editor_task"
+            )
+            
+            col_btn, col_info = st.columns([1, 4])
+            with col_btn:
+                if st.button("💾 Salvar Alterações"):
+                    def valores(row):
+                        d_conc = datetime.now().date() if row['status'] == 'Concluída' else None
+                        # Verifica se a data é NaT (Not a Time) ou válida antes de salvar
+                        nova_data = row['data_limite'].date() if pd.notnull(row['data_limite']) else None
+                        return row['status'], nova_data, row['responsavel'], d_conc
+
+                    # Só as linhas alteradas, numa transação curta e só onde ninguém gravou antes
+                    gravadas, _ = gravar_edicoes(
+                        "conflitos_tarefas", "tarefas", ['status', 'data_limite', 'responsavel', 'data_conclusao'],
+                        linhas_alteradas(df_t, edited, ['status', 'data_limite', 'responsavel']), valores)
+                    st.success(f"Salvo! ({gravadas} alteração(ões))")
+                    time.sleep(0.5)
+                    reexecutar_painel()
+            painel_conflitos("conflitos_tarefas", reexecutar_painel)
+        else:
+            st.info("Este projeto ainda não tem tarefas cadastradas.")
+        
+        # --- 4. ADICIONAR TAREFA RÁPIDA ---
+        with st.expander("➕ Adicionar Nova Tarefa", expanded=False):
+            with st.form("fast_task"):
+                c1, c2, c3 = st.columns([2, 1, 1])
+                desc = c1.text_input("Descrição da Tarefa")
+                who = c2.selectbox("Responsável", equipe())
+                prazo = c3.date_input("Prazo Limite")
+                
+                if st.form_submit_button("Adicionar Tarefa"):
+                    run_query("INSERT INTO tarefas (projeto_id, descricao, tipo, data_limite, responsavel, status) VALUES (?,?,?,?,?,?)",
+                              (sel_pj, desc, "Extra", prazo, who, "Pendente"))
+                    st.success("Tarefa Adicionada!")
+                    reexecutar_painel()
+
+@metricas.cronometrar("tela")
+def projetos_view():
+    st.title("📅 Projetos & Tarefas (Operacional)")
+    
+    # Seção 1: Criar Novo Projeto (Vinculado) - os contratos só são lidos com o painel aberto
+    novo = st.expander("➕ Iniciar Novo Projeto", key="pj_novo", on_change="rerun")
+    with novo:
+        if novo.open:
+            cts = run_query("SELECT ct.id, c.nome, ct.tipo FROM contratos ct JOIN clientes c ON ct.cliente_id = c.id WHERE ct.status='Ativo'", fetch=True, cache=True)
+            if not cts.empty:
+                cts['label'] = cts['nome'] + " - " + cts['tipo']
+                opts = cts.set_index('id')['label'].to_dict()
+            
+                with st.form("new_pj"):
+                    ct_sel = st.selectbox("Contrato Base", options=opts.keys(), format_func=lambda x: opts[x])
+                    nm_pj = st.text_input("Nome do Projeto", value="Implantação Consultoria")
+                    resp = st.selectbox("Líder", equipe())
+                    c1, c2 = st.columns(2)
+                    ini = c1.date_input("Início")
+                    fim = c2.date_input("Entrega")
+                
+                    st.markdown("**Tarefas Iniciais (Separar por vírgula):**")
+                    tasks = st.text_area("", "Reunião Kickoff, Diagnóstico, Planejamento")
+                
+                    if st.form_submit_button("Criar Projeto"):
+                        pj_id = run_query("INSERT INTO projetos (contrato_id, nome, inicio, fim, status, responsavel) VALUES (?,?,?,?,?,?)",
+                                          (ct_sel, nm_pj, ini, fim, "Em Andamento", resp))
+                    
+                        if tasks:
+                            executar_lote("INSERT INTO tarefas (projeto_id, descricao, tipo, data_limite, responsavel, status) VALUES (?,?,?,?,?,?)",
+                                          [(pj_id, t.strip(), "Inicial", ini, resp, "Pendente") for t in tasks.split(',') if t.strip()])
+                        st.success("Projeto Criado!")
+                        st.rerun()
+            else:
+                st.warning("Sem contratos ativos.")
+
+    st.markdown("---")
+    
+# Seção 2: Gerenciamento (Editável)
+    pjs = projetos_com_cliente()
+    
+    if not pjs.empty:
+        # --- 1. CRONOGRAMA VISUAL (GANTT) ---
+        st.subheader("Visão Geral do Cronograma")
+        painel_cronograma(sorted(pjs['status'].dropna().unique()))
+        
+        st.markdown("---")
+
+        # --- 2. SELEÇÃO DE PROJETO (MENU SUSPENSO) ---
+        st.subheader("Gerenciar Tarefas do Projeto")
+        painel_tarefas(pjs)
+
+@metricas.cronometrar("tela")
+def financeiro_view():
+    import pandas as pd
+
+    st.title("💰 Gestão Financeira")
+    
+    # Filtros
+    c1, c2, c3 = st.columns(3)
+    mes = c1.selectbox("Mês", range(1,13), index=datetime.now().month-1)
+    ano = c2.number_input("Ano", value=datetime.now().year)
+    view = c3.selectbox("Filtro", ["Todos", "Receita", "Despesa"])
+    
+    tipo = None if view == "Todos" else view
+    
+    # KPIs Mensais (somados no SQLite, independente da página exibida)
+    totais = totais_mes(int(ano), mes, tipo)
+    r, d = totais['receita'], totais['despesa']
+    
+    k1, k2, k3 = st.columns(3)
+    k1.metric("Entradas (Mês)", f"R$ {r:,.2f}")
+    k2.metric("Saídas (Mês)", f"R$ {d:,.2f}")
+    k3.metric("Resultado (Mês)", f"R$ {r-d:,.2f}", delta_color="normal")
+    
+    with st.expander("⬇️ Exportar lançamentos"):
+        periodo = st.radio("Período", ["Mês selecionado", f"Ano de {int(ano)}"], horizontal=True, key="fin_exp_per")
+        mes_exp = mes if periodo == "Mês selecionado" else None
+        nome = f"lancamentos_{int(ano)}" + (f"_{mes:02d}" if mes_exp else "") + (f"_{tipo.lower()}" if tipo else "")
+        botoes_exportacao("fin_exp", nome, *sql_lancamentos(int(ano), mes_exp, tipo))
+    
+    painel_aging()
+    
+    st.divider()
+    
+    if totais['qtd']:
+        c1, c2 = st.columns([4, 1])
+        c1.subheader("Lançamentos (Clique para editar)")
+        tamanho = c2.selectbox("Por página", TAMANHOS_PAGINA, index=1, key="fin_tam")
+        # Query por intervalo de datas (usa o índice de vencimento), uma página por vez
+        df = paginador("fin_pag", (int(ano), mes, tipo, tamanho),
+                       lambda cursor: pagina_lancamentos(int(ano), mes, tipo, cursor, tamanho))
+        
+        # CORREÇÃO CRÍTICA: Converter data string para datetime
+        df['data_vencimento'] = pd.to_datetime(df['data_vencimento'])
+
+        edited_fin = st.data_editor(
+            df,
+            column_config={
+                "id": None,
+                "versao": None,
+                "valor": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
+                "status": st.column_config.SelectboxColumn("Status", options=["Aberto", "Pago", "Atrasado"], required=True),
+                "data_vencimento": st.column_config.DateColumn("Vencimento")
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+        
+        if 'fin_invalidas' in st.session_state:
+            st.warning(f"Lançamento(s) {', '.join(map(str, st.session_state.pop('fin_invalidas')))} sem status, "
+                       "valor ou vencimento não foram gravados; preencha e salve de novo.")
+        if st.button("💾 Atualizar Financeiro"):
+            colunas_fin = ['status', 'valor', 'data_vencimento']
+            alteradas = linhas_alteradas(df, edited_fin, colunas_fin)
+            # Célula apagada (NaN/NaT): só essa linha fica de fora, as demais edições são gravadas
+            invalidas = alteradas[colunas_fin].isna().any(axis=1)
+            if invalidas.any():
+                st.session_state['fin_invalidas'] = alteradas.loc[invalidas, 'id'].astype(int).tolist()
+            gravadas, _ = gravar_edicoes(
+                "conflitos_financeiro", "financeiro", colunas_fin, alteradas[~invalidas],
+                lambda row: (row['status'], float(row['valor']), pd.to_datetime(row['data_vencimento']).date()))
+            st.success(f"Atualizado! ({gravadas} lançamento(s))")
+            time.sleep(0.5)
+            st.rerun()
+        painel_conflitos("conflitos_financeiro", st.rerun)
+            
+    # Lançamento Avulso
+    with st.expander("Novo Lançamento Avulso (Ex: Conta Luz)"):
+        with st.form("avulso"):
+            c1, c2, c3 = st.columns(3)
+            tp = c1.selectbox("Tipo", ["Despesa", "Receita"])
+            cat = c2.text_input("Categoria")
+            val = c3.number_input("Valor")
+            dt = st.date_input("Vencimento")
+            if st.form_submit_button("Lançar"):
+                run_query("INSERT INTO financeiro (tipo, categoria, valor, data_vencimento, status) VALUES (?,?,?,?,?)",
+                          (tp, cat, val, dt, "Aberto"))
+                st.rerun()
+    importador("financeiro", "Importar lançamentos (CSV/Parquet)")
+
+def performance_view():
+    st.title("⏱️ Performance")
+    st.caption(f"Medições em memória deste processo (últimas {metricas.tamanho}); "
+               "leituras servidas pelo cache ficam fora dos percentis.")
+    c1, c2 = st.columns([4, 1])
+    cache = cache_consultas.estatisticas()
+    c1.caption(f"Cache de consultas: {cache['hits']} hits / {cache['misses']} misses ({cache['taxa_hit']:.0%}), "
+               f"{cache['descartes']} descartes")
+    if c2.button("Limpar medições"):
+        metricas.limpar()
+        st.rerun()
+    
+    formato = {c: st.column_config.NumberColumn(c.replace("_ms", " (ms)"), format="%.1f")
+               for c in ("p50_ms", "p95_ms", "max_ms", "total_ms", "ms", "consultas_ms")}
+    # Primeira tela do processo (inclui os imports) e o aquecimento disparado depois dela
+    reruns, inicio = metricas.medicoes("rerun"), metricas.medicoes("inicio")
+    if 'primeiro' in reruns and reruns['primeiro'].eq(True).any():
+        primeiro = reruns[reruns['primeiro'].eq(True)].iloc[0]
+        aquecimento = f"; aquecimento em segundo plano: {inicio['ms'].iloc[0]:.0f} ms" if not inicio.empty else ""
+        st.caption(f"Primeira tela do processo ({primeiro['pagina']}, com imports): {primeiro['ms']:.0f} ms{aquecimento}")
+
+    st.subheader("Reruns mais lentos")
+    st.dataframe(metricas.reruns_lentos(), column_config=formato, use_container_width=True, hide_index=True)
+    
+    t0, t1, t2, t3 = st.tabs(["Páginas", "Telas", "Consultas", "Gráficos"])
+    with t0:
+        # Tempo até a tela: o rerun inteiro de cada página
+        st.dataframe(metricas.percentis("rerun"), column_config=formato, use_container_width=True, hide_index=True)
+    with t1:
+        st.dataframe(metricas.percentis("tela"), column_config=formato, use_container_width=True, hide_index=True)
+    with t2:
+        st.dataframe(metricas.percentis("consulta"), column_config={**formato, "nome": st.column_config.TextColumn("SQL", width="large")},
+                     use_container_width=True, hide_index=True)
+    with t3:
+        st.dataframe(metricas.percentis("grafico"), column_config=formato, use_container_width=True, hide_index=True)
+
+ICONES_BUSCA = {'Cliente': "🏢", 'Projeto': "📁", 'Tarefa': "✅"}
+
+
+def abrir_resultado(tipo, ref, titulo):
+    """Callback de um resultado da busca: leva à tela do cliente ou ao projeto (da tarefa)"""
+    if tipo == "Cliente":
+        st.session_state.update({'menu': "CRM & Contratos", 'crm_aba': "Base de Clientes", 'crm_cli_busca': titulo})
+    else:
+        st.session_state.update({'menu': "Projetos", 'proj_sel': ref})
+    st.session_state['busca_abrir'] = True
+
+@st.fragment
+@metricas.cronometrar("tela")
+def busca_global():
+    """Busca em clientes, projetos e tarefas (FTS5); digitar só reexecuta este painel"""
+    texto = st.text_input("🔎 Buscar", key="busca_global", placeholder="Cliente, CNPJ, projeto, tarefa...")
+    if st.session_state.pop('busca_abrir', False):
+        # O resultado escolhido troca de tela: a página inteira precisa ser reexecutada
+        st.rerun()
+    if not texto.strip():
+        return
+    entidades = ("Cliente", "Projeto", "Tarefa") if st.session_state['role'] == 'admin' else ("Projeto", "Tarefa")
+    res = buscar(texto, entidades, limite=8)
+    if res.empty:
+        st.caption("Nada encontrado.")
+        return
+    if res['corrigido'].all():
+        st.caption("Nada exato; resultados parecidos:")
+    for r in res.itertuples():
+        st.button(f"{ICONES_BUSCA[r.tipo]} {r.titulo}", key=f"busca_{r.tipo}_{r.id}", help=r.detalhe,
+                  on_click=abrir_resultado, args=(r.tipo, int(r.ref), r.titulo), use_container_width=True)
+
+@st.fragment(run_every=2)
+def painel_jobs():
+    """Progresso dos jobs da sessão; atualiza sozinho enquanto houver job ativo"""
+    jobs = jobs_por_id(st.session_state.get('jobs', []))
+    for _, j in jobs.iterrows():
+        st.progress(float(j['progresso']), text=f"{j['tipo']} #{j['id']}: {j['mensagem'] or j['status']}")
+    if jobs['status'].isin([CONCLUIDO, ERRO]).all():
+        # Terminou tudo: avisa, para de acompanhar e atualiza a tela inteira com os dados novos
+        st.session_state['avisos_jobs'] = [(j['status'], f"Job {j['tipo']} #{j['id']}: " +
+                                            ("concluído" if j['status'] == CONCLUIDO else j['erro']))
+                                           for _, j in jobs.iterrows()]
+        st.session_state['jobs'] = []
+        st.rerun()
+
+@st.fragment(run_every=INTERVALO_ATUALIZACAO)
+def vigia_mudancas():
+    """Atualização automática: só consulta a última seq do log e reexecuta a tela quando algo mudou"""
+    if ultima_seq(IDADE_SEQ) > st.session_state.get('seq_vista', 0):
+        st.rerun()
+
+# --- ORQUESTRADOR ---
+
+if 'logged_in' not in st.session_state:
+    st.session_state['logged_in'] = False
+    retomar_sessao()
+
+if 'cookie_sessao' in st.session_state:
+    gravar_cookie(st.session_state.pop('cookie_sessao'))
+
+if not st.session_state['logged_in']:
+    with metricas.rerun("Login", inicio=INICIO_SCRIPT):
+        login_page()
+else:
+    # Tudo o que roda daqui para baixo é medido como um rerun (página Performance)
+    with metricas.rerun(inicio=INICIO_SCRIPT) as rerun:
+        # Mudanças gravadas por outros processos invalidam o cache antes de qualquer leitura
+        st.session_state['seq_vista'] = sincronizar()
+
+        # Sidebar de Navegação
+        with st.sidebar:
+            st.markdown(f"## PeegFlow")
+            st.caption(f"Olá, {st.session_state['user_name']}")
+            busca_global()
+            st.markdown("---")
+        
+            if st.session_state['role'] == 'admin':
+                menu = st.radio("Navegação", ["Dashboard", "CRM & Contratos", "Projetos", "Financeiro", "Performance"],
+                                key="menu")
+            else:
+                menu = st.radio("Navegação", ["Projetos"], key="menu")
+            
+            st.markdown("---")
+            if st.toggle("Atualização automática", key="auto_refresh",
+                         help=f"Verifica novas gravações a cada {INTERVALO_ATUALIZACAO:g}s e atualiza a tela"):
+                vigia_mudancas()
+            if st.session_state.get('jobs'):
+                painel_jobs()
+            for status, aviso in st.session_state.pop('avisos_jobs', []):
+                if status == ERRO:
+                    st.error(aviso)
+                else:
+                    st.success(aviso)
+            if st.session_state['role'] == 'admin':
+                cache = cache_consultas.estatisticas()
+                st.caption(f"Cache de consultas: {cache['hits']} hits / {cache['misses']} misses "
+                           f"({cache['taxa_hit']:.0%}) · {cache['entradas']} entradas")
+            if st.button("Sair"):
+                encerrar_sessao(st.session_state.pop('token_sessao', None))
+                st.session_state['logged_in'] = False
+                st.session_state['cookie_sessao'] = ""
+                st.rerun()
+
+        # Roteamento
+        rerun['pagina'] = menu
+        if menu == "Dashboard": dashboard_view()
+        elif menu == "CRM & Contratos": crm_view()
+        elif menu == "Projetos": projetos_view()
+        elif menu == "Financeiro": financeiro_view()
+        elif menu == "Performance": performance_view()
+
+iniciar_aquecimento()
+get_agendador()
\ No newline at end of file
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from db import executar_lote, transacao
+
+# --- AUTOMAÇÃO E LÓGICA ---
+
+SQL_INSERIR_PARCELAS = ("INSERT INTO financeiro (contrato_id, tipo, categoria, valor, data_vencimento, status) "
+                        "VALUES (?,?,?,?,?,?)")
+
+
+def cronograma_parcelas(contrato_id, valor, parcelas, primeiro_vencimento, dia_vencimento=None, rotulo="Mensalidade"):
+    """Parcelas de um ou vários contratos de uma vez, sem laço em Python (escalares ou arrays).
+
+    A 1ª parcela vence em `primeiro_vencimento`; a k-ésima, k meses depois, no dia
+    `dia_vencimento` (padrão: o dia do primeiro vencimento) limitado ao último dia do mês.
+    O valor é repartido em centavos: as primeiras parcelas levam o centavo que sobra,
+    e a soma bate exatamente com o total. Devolve DataFrame (contrato_id, categoria,
+    valor, data_vencimento ISO), na ordem dos contratos.
+    """
+    contrato_id, centavos, parcelas, primeiro = np.broadcast_arrays(
+        np.asarray(contrato_id), np.round(np.asarray(valor, dtype=float) * 100).astype(np.int64),
+        np.asarray(parcelas, dtype=np.int64), np.asarray(primeiro_vencimento, dtype='datetime64[D]'))
+    contrato_id, centavos, parcelas, primeiro = (a.ravel() for a in (contrato_id, centavos, parcelas, primeiro))
+    mes_primeiro = primeiro.astype('datetime64[M]')
+    dia_primeiro = (primeiro - mes_primeiro.astype('datetime64[D]')).astype(np.int64) + 1
+    dia = dia_primeiro if dia_vencimento is None else np.broadcast_to(np.asarray(dia_vencimento, dtype=np.int64),
+                                                                       dia_primeiro.shape)
+
+    # Uma linha por parcela: índice do contrato e número da parcela (0..n-1) dentro dele
+    ct = np.repeat(np.arange(len(parcelas)), parcelas)
+    k = np.arange(len(ct)) - np.repeat(np.cumsum(parcelas) - parcelas, parcelas)
+
+    mes = mes_primeiro[ct] + k
+    dias_no_mes = ((mes + 1).astype('datetime64[D]') - mes.astype('datetime64[D]')).astype(np.int64)
+    dia_parcela = np.where(k == 0, dia_primeiro[ct], np.minimum(dia[ct], dias_no_mes))
+    vencimento = mes.astype('datetime64[D]') + (dia_parcela - 1)
+
+    base, resto = np.divmod(centavos, parcelas)
+    valor_parcela = (base[ct] + (k < resto[ct])) / 100
+
+    # Textos formatados uma vez por valor distinto (poucos pares k/n e poucas datas) e espalhados por índice
+    largura = k.max(initial=0) + 1
+    pares, i_par = np.unique(parcelas[ct] * largura + k, return_inverse=True)
+    categorias = np.array([f"{rotulo} {p % largura + 1}/{p // largura}" for p in pares], dtype=object)
+    datas, i_data = np.unique(vencimento, return_inverse=True)
+    return pd.DataFrame({'contrato_id': contrato_id[ct], 'categoria': categorias[i_par], 'valor': valor_parcela,
+                         'data_vencimento': np.datetime_as_string(datas, unit='D').astype(object)[i_data]})
+
+
+def gravar_parcelas(agenda, status="Aberto", conn=None):
+    """Insere o cronograma (saída de cronograma_parcelas) como Contas a Receber num único executemany.
+
+    `status` é um texto para todas as parcelas ou um por parcela.
+    """
+    n = len(agenda)
+    status = [status] * n if isinstance(status, str) else np.asarray(status).tolist()
+    linhas = zip(agenda['contrato_id'].tolist(), ["Receita"] * n, agenda['categoria'].tolist(),
+                 agenda['valor'].tolist(), agenda['data_vencimento'].tolist(), status)
+    return executar_lote(SQL_INSERIR_PARCELAS, linhas, conn=conn)
+
+
+def criar_financeiro_contrato(ct_id, valor, parcelas, inicio, conn=None, dia_vencimento=None):
+    """Gera Contas a Receber automaticamente (1ª parcela em `inicio`)"""
+    gravar_parcelas(cronograma_parcelas(ct_id, valor, parcelas, pd.to_datetime(inicio).date(), dia_vencimento),
+                    conn=conn)
+
+def firmar_contrato(cliente_id, tipo, valor, parcelas, inicio, primeiro_vencimento=None, dia_vencimento=None,
+                    conn=None):
+    """Cria o contrato e suas parcelas numa única transação; devolve o id do contrato.
+
+    Com `conn`, grava dentro da transação já aberta pelo chamador.
+    """
+    inicio = pd.to_datetime(inicio).date()
+    primeiro_vencimento = pd.to_datetime(primeiro_vencimento).date() if primeiro_vencimento else inicio
+    fim = inicio + relativedelta(months=parcelas)
+
+    def firmar(conn):
+        ct_id = conn.execute("INSERT INTO contratos (cliente_id, tipo, valor_total, qtd_parcelas, inicio, fim, status) VALUES (?,?,?,?,?,?,?)",
+                             (cliente_id, tipo, valor, parcelas, inicio, fim, "Ativo")).lastrowid
+        criar_financeiro_contrato(ct_id, valor, parcelas, primeiro_vencimento, conn=conn, dia_vencimento=dia_vencimento)
+        return ct_id
+
+    if conn is not None:
+        return firmar(conn)
+    with transacao('contratos', 'financeiro') as conn:
+        return firmar(conn)
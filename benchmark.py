@@ -0,0 +1,500 @@
+"""Benchmark das consultas de cada tela do PeegFlow contra bases sintéticas.
+
+Para cada tamanho de livro financeiro, recria uma base temporária com
+demo.gerar_dados, cronometra as consultas de cada tela e grava um relatório
+JSON para comparar versões.
+
+Uso: python benchmark.py [--linhas 1000 100000 1000000] [--saida benchmark.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+# O banco do benchmark precisa estar definido antes de importar a camada de dados
+os.environ["PEEGFLOW_DB"] = os.path.join(tempfile.mkdtemp(prefix="peegflow-bench-"), "bench.db")
+
+import numpy as np
+import pandas as pd
+
+import consultas
+from db import (INDICES_BUSCA, atualizar_versionado, cache_consultas, conexao, em_paralelo, init_db,
+                run_query, transacao, verificar_resumo_mensal)
+from demo import gerar_dados
+from exportacao import disponivel, exportar
+from automacao import cronograma_parcelas
+from busca import ENTIDADES, buscar
+from importacao import importar
+from inadimplencia import FAIXAS_AGING, atualizar_inadimplencia
+from usuarios import KDF_SIMULTANEOS, SCRYPT_N, autenticar, criar_sessao, encerrar_sessao, hash_senha, sessao
+
+TABELAS = ["tarefas", "projetos", "financeiro", "contratos", "clientes"]
+MESES_CONTRATO = 12
+PROB_CONTRATO = 0.7
+MESES_HISTORICO = 24
+# Pausa entre a tela de login e o dashboard na medição de inicialização (segundos)
+ESPERA_LOGIN = 2.0
+
+
+def popular(linhas, seed=42):
+    """Limpa a base e gera clientes suficientes para ~`linhas` lançamentos financeiros"""
+    with transacao() as conn:
+        for tabela in TABELAS:
+            conn.execute(f"DELETE FROM {tabela}")
+    despesas = (MESES_HISTORICO + 1) * 4
+    n_clientes = max(1, round((linhas - despesas) / (PROB_CONTRATO * MESES_CONTRATO)))
+    t0 = time.perf_counter()
+    totais = gerar_dados(n_clientes=n_clientes, prob_contrato=PROB_CONTRATO, meses_historico=MESES_HISTORICO,
+                         meses_contrato=MESES_CONTRATO, seed=seed)
+    return totais, time.perf_counter() - t0
+
+
+def cronometrar(fn, repeticoes):
+    """Mediana/mín/máx de `fn` sem o cache de leitura (mede o custo real da consulta)"""
+    tempos = []
+    for _ in range(repeticoes):
+        cache_consultas.limpar()
+        t0 = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - t0)
+    return {'mediana_s': statistics.median(tempos), 'min_s': min(tempos), 'max_s': max(tempos)}
+
+# --- CENÁRIOS ---
+
+def dashboard_pandas(dt_ini, dt_fim):
+    """Caminho antigo: SELECT * e agregação em pandas"""
+    df_fin = run_query("SELECT * FROM financeiro", fetch=True)
+    df_proj = run_query("SELECT * FROM projetos", fetch=True)
+    receita = df_fin[df_fin['tipo']=='Receita']['valor'].sum()
+    despesa = df_fin[df_fin['tipo']=='Despesa']['valor'].sum()
+    ativos = len(df_proj[df_proj['status']=='Em Andamento'])
+    df_fin['data_vencimento'] = pd.to_datetime(df_fin['data_vencimento'])
+    mask = (df_fin['data_vencimento'].dt.date >= dt_ini) & (df_fin['data_vencimento'].dt.date <= dt_fim)
+    df_filt = df_fin.loc[mask]
+    df_time = df_filt.groupby([pd.Grouper(key='data_vencimento', freq='M'), 'tipo'])['valor'].sum().reset_index()
+    df_desp = df_filt[df_filt['tipo']=='Despesa']
+    return receita, despesa, ativos, df_time, df_desp.groupby('categoria')['valor'].sum()
+
+
+def dashboard_sql(dt_ini, dt_fim):
+    """Caminho atual: agregação empurrada para o SQLite"""
+    k = consultas.kpis_gerais()
+    df_time = consultas.fluxo_caixa_mensal(dt_ini, dt_fim)
+    df_desp = consultas.despesas_por_categoria(dt_ini, dt_fim)
+    return k['receita'], k['despesa'], k['ativos'], df_time, df_desp.set_index('categoria')['valor']
+
+
+def chamadas_dashboard(dt_ini, dt_fim):
+    """Todas as consultas do dashboard (KPIs e as três visões), no formato de em_paralelo"""
+    return {'kpis': (consultas.kpis_gerais,), 'fluxo': (consultas.fluxo_caixa_mensal, dt_ini, dt_fim),
+            'despesas': (consultas.despesas_por_categoria, dt_ini, dt_fim),
+            'entregas': (consultas.entregas_por_responsavel,), 'setores': (consultas.clientes_por_setor,)}
+
+
+def dashboard_serial(chamadas):
+    """Uma consulta depois da outra, como o dashboard fazia antes do fan-out"""
+    return {nome: fn(*args) for nome, (fn, *args) in chamadas.items()}
+
+
+def conferir(antigo, novo):
+    """Garante que os dois caminhos do dashboard produzem os mesmos números"""
+    assert abs(antigo[0] - novo[0]) < 0.01 and abs(antigo[1] - novo[1]) < 0.01 and antigo[2] == novo[2]
+    pd.testing.assert_frame_equal(antigo[3].reset_index(drop=True), novo[3].reset_index(drop=True),
+                                  check_dtype=False, check_exact=False)
+    pd.testing.assert_series_equal(antigo[4].sort_index(), novo[4].sort_index(), check_exact=False, check_names=False)
+
+
+def cenarios(baseline):
+    """Consultas de cada tela, como as views as executam"""
+    hoje = date.today()
+    dt_ini, dt_fim = hoje - timedelta(days=90), hoje + timedelta(days=30)
+    ultimo_projeto = run_query("SELECT COALESCE(MAX(id), 1) AS m FROM projetos", fetch=True)['m'].iloc[0]
+    projeto = random.Random(0).randint(1, int(ultimo_projeto))
+    lista = {
+        'dashboard_kpis': lambda: dashboard_sql(dt_ini, dt_fim),
+        'dashboard_equipe': consultas.entregas_por_responsavel,
+        'dashboard_serial': lambda: dashboard_serial(chamadas_dashboard(dt_ini, dt_fim)),
+        'dashboard_paralelo': lambda: em_paralelo(chamadas_dashboard(dt_ini, dt_fim)),
+        'dashboard_crm': lambda: (consultas.clientes_por_setor(), consultas.pagina_clientes(tamanho=50)),
+        'financeiro_mes': lambda: (consultas.totais_mes(hoje.year, hoje.month),
+                                   consultas.pagina_lancamentos(hoje.year, hoje.month, tamanho=50)),
+        'crm_clientes': lambda: (consultas.contar_clientes(), consultas.pagina_clientes(tamanho=50)),
+        'crm_busca': lambda: (consultas.contar_clientes("Tech"), consultas.pagina_clientes(tamanho=50, busca="Tech")),
+        'projetos_join': consultas.projetos_com_cliente,
+        'tarefas_projeto': lambda: consultas.tarefas_projeto(projeto),
+    }
+    if baseline:
+        conferir(dashboard_pandas(dt_ini, dt_fim), dashboard_sql(dt_ini, dt_fim))
+        lista['dashboard_pandas'] = lambda: dashboard_pandas(dt_ini, dt_fim)
+    return lista
+
+
+def arquivo_importacao(linhas, pasta, seed=42):
+    """CSV sintético de lançamentos no formato de planilha (pt-BR), gravado em blocos"""
+    caminho = os.path.join(pasta, f"importacao_{linhas}.csv")
+    rnd = np.random.default_rng(seed)
+    for inicio in range(0, linhas, 100_000):
+        n = min(100_000, linhas - inicio)
+        vencimentos = pd.Timestamp(date.today()) + pd.to_timedelta(rnd.integers(-720, 180, n), unit="D")
+        pd.DataFrame({
+            'tipo': rnd.choice(["Receita", "Despesa"], n), 'categoria': rnd.choice(["Serviços", "Aluguel", "Software"], n),
+            'valor': [f"{v:.2f}".replace(".", ",") for v in rnd.uniform(10, 50_000, n)],
+            'vencimento': vencimentos.strftime("%d/%m/%Y"), 'status': rnd.choice(["Aberto", "Pago"], n),
+        }).to_csv(caminho, sep=";", index=False, mode="a" if inicio else "w", header=not inicio)
+    return caminho
+
+
+def medir_importacao(linhas):
+    """Vazão (linhas/s) da importação em blocos e pico de memória alocada durante ela"""
+    pasta = tempfile.mkdtemp(prefix="peegflow-bench-imp-")
+    caminho = arquivo_importacao(linhas, pasta)
+    res = importar(caminho, "financeiro")
+    assert res['importadas'] == linhas, res
+    # Segunda passada só para medir memória (o tracemalloc deixa a importação mais lenta)
+    tracemalloc.start()
+    importar(caminho, "financeiro")
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'linhas': linhas, 'segundos': res['segundos'], 'linhas_s': res['linhas_s'],
+            'arquivo_mb': round(os.path.getsize(caminho) / 2**20, 1), 'pico_memoria_mb': round(pico / 2**20, 1)}
+
+
+def medir_carga():
+    """Tempo e memória para carregar o livro inteiro num DataFrame: objetos vs tipos declarados.
+
+    O caminho antigo inclui o pd.to_datetime que as telas faziam depois da carga.
+    """
+    sql = "SELECT id, contrato_id, tipo, categoria, valor, data_vencimento, status FROM financeiro"
+
+    def antigo():
+        df = run_query(sql, fetch=True)
+        df['data_vencimento'] = pd.to_datetime(df['data_vencimento'])
+        return df
+
+    resultados = {}
+    for nome, fn in (('objetos', antigo), ('tipada', lambda: run_query(sql, fetch=True, tipos=True))):
+        t0 = time.perf_counter()
+        df = fn()
+        segundos = time.perf_counter() - t0
+        memoria = df.memory_usage(deep=True).sum()
+        del df
+        tracemalloc.start()
+        fn()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        resultados[nome] = {'segundos': segundos, 'dataframe_mb': round(memoria / 2**20, 1),
+                            'pico_memoria_mb': round(pico / 2**20, 1)}
+    return resultados
+
+
+def buscar_like(texto, limite=10):
+    """Caminho antigo: LIKE '%texto%' nas mesmas colunas de cada entidade (varredura das tabelas)"""
+    termo = f"%{texto.strip()}%"
+    partes = []
+    for tabela in (fts[:-len("_fts")] for fts, _, _ in ENTIDADES.values()):
+        colunas = INDICES_BUSCA[tabela]
+        filtro = " OR ".join(f"{c} LIKE ?" for c in colunas)
+        partes.append(run_query(f"SELECT id FROM {tabela} WHERE {filtro} LIMIT ?", (*[termo] * len(colunas), limite),
+                                fetch=True))
+    return pd.concat(partes, ignore_index=True)
+
+
+def medir_busca(repeticoes):
+    """Busca global (FTS5) vs LIKE '%...%' para um termo raro, um comum, um documento e um com erro"""
+    cliente = run_query("SELECT nome, cpf_cnpj FROM clientes ORDER BY id DESC LIMIT 1", fetch=True).iloc[0]
+    termos = {'raro': cliente['nome'], 'comum': "Diagnóstico", 'documento': cliente['cpf_cnpj'][:6],
+              'erro_digitacao': cliente['nome'].split()[0][:-1] + "x " + cliente['nome'].split()[-1]}
+    resultados = {}
+    for nome, termo in termos.items():
+        resultados[nome] = {'termo': termo, 'acertos': len(buscar(termo)),
+                            'fts': cronometrar(lambda: buscar(termo), repeticoes),
+                            'like': cronometrar(lambda: buscar_like(termo), repeticoes)}
+    return resultados
+
+
+def medir_cronograma(repeticoes, contratos=5_000, parcelas=12):
+    """Cronograma de parcelas de `contratos` contratos de uma vez (ex.: reprecificação), vetorizado vs laço"""
+    from dateutil.relativedelta import relativedelta
+
+    rnd = np.random.default_rng(0)
+    ids = np.arange(1, contratos + 1)
+    valores = rnd.choice([30000, 60000, 120000, 100000.01], contratos)
+    inicios = np.datetime64(date.today()) - rnd.integers(0, 720, contratos)
+
+    def laco():
+        return [(int(ct), f"Mensalidade {i + 1}/{parcelas}", float(v) / parcelas,
+                 (ini + relativedelta(months=i)).isoformat())
+                for ct, v, ini in zip(ids, valores, inicios.astype(object)) for i in range(parcelas)]
+
+    return {'contratos': contratos, 'parcelas': contratos * parcelas,
+            'vetorizado': cronometrar(lambda: cronograma_parcelas(ids, valores, parcelas, inicios), repeticoes),
+            'laco': cronometrar(laco, repeticoes)}
+
+
+def aging_pandas(referencia):
+    """Caminho antigo: livro de recebíveis em pandas e faixas recalculadas a cada leitura"""
+    df = run_query("SELECT c.cliente_id, f.contrato_id, f.valor, f.data_vencimento, f.status FROM financeiro f "
+                   "LEFT JOIN contratos c ON c.id = f.contrato_id WHERE f.tipo = 'Receita'", fetch=True)
+    dias = (pd.Timestamp(referencia) - pd.to_datetime(df['data_vencimento'])).dt.days
+    vencidos = df[df['status'].isin(["Aberto", "Atrasado"]) & (dias > 0)]
+    faixa = pd.cut(dias[vencidos.index], [0, 30, 60, 90, np.inf], labels=FAIXAS_AGING)
+    return vencidos.groupby([vencidos['cliente_id'].fillna(0), faixa], observed=True)['valor'].sum()
+
+
+def medir_inadimplencia(repeticoes, dias=180):
+    """Lote de inadimplência com referência `dias` à frente (a base gerada não tem atrasos) e leitura do aging"""
+    referencia = date.today() + timedelta(days=dias)
+    t0 = time.perf_counter()
+    res = atualizar_inadimplencia(referencia)
+    resultado = {'lote_s': time.perf_counter() - t0, 'atrasados': res['atrasados'], 'faixas': res['faixas']}
+    resultado['lote_repetido'] = cronometrar(lambda: atualizar_inadimplencia(referencia), repeticoes)
+    resultado['leitura_aging'] = cronometrar(consultas.aging_recebiveis, repeticoes)
+    resultado['aging_pandas'] = cronometrar(lambda: aging_pandas(referencia), repeticoes)
+    return resultado
+
+
+def medir_autenticacao(repeticoes, logins=32, simultaneos=(1, 4, 16)):
+    """Latência do login (scrypt) com `logins` tentativas disparadas por N sessões ao mesmo tempo.
+
+    A p95 com muitas sessões mostra se o custo do scrypt (PEEGFLOW_SCRYPT_N) ou o limite
+    de cálculos simultâneos (PEEGFLOW_KDF_SIMULTANEOS) viraram gargalo. A retomada por
+    token (sessão que reconecta) não paga o scrypt.
+    """
+    def login():
+        t0 = time.perf_counter()
+        if not autenticar("admin", "123"):
+            raise RuntimeError("login do benchmark recusado")
+        return time.perf_counter() - t0
+
+    resultado = {'scrypt_n': SCRYPT_N, 'kdf_simultaneos': KDF_SIMULTANEOS,
+                 'hash': cronometrar(lambda: hash_senha("123"), repeticoes), 'concorrencia': {}}
+    for n in simultaneos:
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            t0 = time.perf_counter()
+            tempos = sorted(pool.map(lambda _: login(), range(logins)))
+            total = time.perf_counter() - t0
+        resultado['concorrencia'][n] = {'p50_s': statistics.median(tempos),
+                                        'p95_s': tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))],
+                                        'logins_s': round(logins / total, 1)}
+    token = criar_sessao(autenticar("admin", "123")[0])
+    resultado['retomada_token'] = cronometrar(lambda: sessao(token), repeticoes)
+    encerrar_sessao(token)
+    return resultado
+
+
+def medir_concorrencia_edicao(editores=8, edicoes=40, linhas=10, seed=0):
+    """Tempo de `editores` threads somando R$ 1 a lançamentos sorteados entre os mesmos `linhas`.
+
+    Cada edição lê o valor e grava valor + 1 pelo UPDATE condicional, como a grade do
+    financeiro; o conflito é relido e refeito. A ausência de edições perdidas e de banco
+    travado é verificada em tests/test_concorrencia.py; aqui fica só o tempo.
+    """
+    with conexao() as conn:
+        ids = [i for (i,) in conn.execute("SELECT id FROM financeiro ORDER BY id LIMIT ?", (linhas,))]
+
+    def ler(i):
+        with conexao() as conn:
+            return conn.execute("SELECT valor, versao FROM financeiro WHERE id=?", (i,)).fetchone()
+
+    def editor(n):
+        rnd = random.Random(seed + n)
+        conflitos = 0
+        for _ in range(edicoes):
+            i = rnd.choice(ids)
+            while True:
+                valor, versao = ler(i)
+                if not atualizar_versionado('financeiro', ['valor'], [(valor + 1, i, versao)]):
+                    break
+                conflitos += 1
+        return conflitos
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=editores) as pool:
+        conflitos = sum(pool.map(editor, range(editores)))
+    return {'editores': editores, 'edicoes': editores * edicoes, 'linhas': len(ids),
+            'segundos': time.perf_counter() - t0, 'conflitos_refeitos': conflitos}
+
+
+def medir_exportacao():
+    """Tempo e pico de memória exportando o livro inteiro em cada formato disponível"""
+    sql, args = "SELECT id, contrato_id, tipo, categoria, valor, data_vencimento, status FROM financeiro ORDER BY id", ()
+    resultados = {}
+    for formato in ("CSV", "Parquet", "XLSX"):
+        if not disponivel(formato):
+            continue
+        t0 = time.perf_counter()
+        arquivo = exportar(sql, args, formato)
+        segundos = time.perf_counter() - t0
+        tamanho = os.fstat(arquivo.fileno()).st_size
+        arquivo.close()
+        tracemalloc.start()
+        exportar(sql, args, formato).close()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        resultados[formato] = {'segundos': segundos, 'arquivo_mb': round(tamanho / 2**20, 1),
+                               'pico_memoria_mb': round(pico / 2**20, 1)}
+    return resultados
+
+
+# Roda num processo novo: a primeira execução do app inclui os imports, como num servidor recém-iniciado
+SCRIPT_INICIALIZACAO = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=300)
+t0 = time.perf_counter()
+app.run()
+login = time.perf_counter() - t0
+time.sleep(float(sys.argv[2]))
+app.session_state['logged_in'] = True
+app.session_state['user_name'], app.session_state['role'] = "Benchmark", "admin"
+t0 = time.perf_counter()
+app.run()
+print(json.dumps({'login_s': login, 'dashboard_s': time.perf_counter() - t0}))
+"""
+
+
+def medir_inicializacao(repeticoes, digitacao=ESPERA_LOGIN):
+    """Tempo até a tela de login num processo novo e até o dashboard logo após o login.
+
+    `digitacao` é a pausa entre as duas telas (o usuário digitando a senha), quando
+    o aquecimento em segundo plano trabalha; com 0 mede o pior caso.
+    """
+    app = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    medidas = []
+    for _ in range(repeticoes):
+        saida = subprocess.run([sys.executable, "-c", SCRIPT_INICIALIZACAO, app, str(digitacao)], capture_output=True,
+                               text=True, check=True).stdout
+        medidas.append(json.loads(saida.strip().splitlines()[-1]))
+    return {'login_s': statistics.median(m['login_s'] for m in medidas),
+            'dashboard_s': statistics.median(m['dashboard_s'] for m in medidas), 'digitacao_s': digitacao}
+
+
+def checar_planos():
+    """Falha se alguma consulta indexada voltou a fazer SCAN de tabela"""
+    problemas = consultas.verificar_planos()
+    for nome, plano in problemas.items():
+        print(f"SCAN em {nome}: {plano}", file=sys.stderr)
+    if problemas:
+        sys.exit(1)
+
+
+def checar_resumo():
+    """Falha se financeiro_mensal divergir do livro depois da carga"""
+    divergencias = verificar_resumo_mensal()
+    if not divergencias.empty:
+        print(divergencias.to_string(index=False), file=sys.stderr)
+        sys.exit(1)
+
+
+def versao_codigo():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", type=int, nargs="+", default=[1_000, 100_000, 1_000_000],
+                        help="tamanhos aproximados do livro financeiro")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--sem-baseline", action="store_true", help="não mede o caminho antigo em pandas")
+    parser.add_argument("--sem-exportacao", action="store_true", help="não mede a exportação do livro")
+    parser.add_argument("--sem-importacao", action="store_true", help="não mede a importação de CSV")
+    parser.add_argument("--sem-busca", action="store_true", help="não mede a busca textual (FTS5 vs LIKE)")
+    parser.add_argument("--sem-cronograma", action="store_true", help="não mede a geração de cronogramas de parcelas")
+    parser.add_argument("--sem-inadimplencia", action="store_true", help="não mede o lote de inadimplência/aging")
+    parser.add_argument("--sem-carga", action="store_true", help="não mede a carga do livro em DataFrame")
+    parser.add_argument("--sem-inicializacao", action="store_true", help="não mede o tempo até a primeira tela")
+    parser.add_argument("--sem-autenticacao", action="store_true", help="não mede o login sob sessões simultâneas")
+    parser.add_argument("--sem-concorrencia", action="store_true",
+                        help="não mede a edição concorrente (controle otimista)")
+    parser.add_argument("--saida", default="benchmark.json", help="arquivo do relatório JSON")
+    args = parser.parse_args()
+
+    init_db()
+    relatorio = {'gerado_em': datetime.now().isoformat(timespec='seconds'), 'versao': versao_codigo(),
+                 'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version, 'cpus': os.cpu_count(),
+                 'repeticoes': args.repeticoes, 'tamanhos': []}
+
+    # O login não depende do tamanho do livro: medido uma vez
+    if not args.sem_autenticacao:
+        relatorio['autenticacao'] = aut = medir_autenticacao(args.repeticoes)
+        print(f"== login com scrypt N={aut['scrypt_n']} (até {aut['kdf_simultaneos']} cálculo(s) simultâneo(s)); "
+              f"hash: {aut['hash']['mediana_s'] * 1000:.2f} ms")
+        for n, r in aut['concorrencia'].items():
+            print(f"{f'login_{n}_sessoes':>18}: {r['p50_s'] * 1000:10.2f} ms p50, {r['p95_s'] * 1000:.2f} ms p95 "
+                  f"({r['logins_s']} logins/s)")
+        print(f"{'retomada_token':>18}: {aut['retomada_token']['mediana_s'] * 1000:10.2f} ms")
+
+    for linhas in args.linhas:
+        totais, t_geracao = popular(linhas)
+        checar_planos()
+        checar_resumo()
+        print(f"\n== {totais['financeiro']} lançamentos ({totais['clientes']} clientes, "
+              f"{totais['tarefas']} tarefas) gerados em {t_geracao:.2f}s")
+        resultados = {}
+        for nome, fn in cenarios(not args.sem_baseline).items():
+            resultados[nome] = cronometrar(fn, args.repeticoes)
+            print(f"{nome:>18}: {resultados[nome]['mediana_s'] * 1000:10.2f} ms")
+        item = {'linhas_alvo': linhas, 'linhas': totais, 'geracao_s': t_geracao, 'cenarios': resultados}
+        if not args.sem_busca:
+            item['busca'] = bus = medir_busca(args.repeticoes)
+            for nome, r in bus.items():
+                print(f"{'busca_' + nome:>18}: {r['fts']['mediana_s'] * 1000:10.2f} ms "
+                      f"({r['acertos']} acerto(s); LIKE: {r['like']['mediana_s'] * 1000:.2f} ms)")
+        if not args.sem_cronograma:
+            item['cronograma'] = cron = medir_cronograma(args.repeticoes)
+            print(f"{'cronograma_parcelas':>18}: {cron['vetorizado']['mediana_s'] * 1000:10.2f} ms "
+                  f"({cron['parcelas']} parcelas de {cron['contratos']} contratos; "
+                  f"laço com relativedelta: {cron['laco']['mediana_s'] * 1000:.2f} ms)")
+        if not args.sem_inadimplencia:
+            item['inadimplencia'] = ina = medir_inadimplencia(args.repeticoes)
+            print(f"{'lote_inadimplencia':>18}: {ina['lote_s'] * 1000:10.2f} ms ({ina['atrasados']} atrasados, "
+                  f"repetido {ina['lote_repetido']['mediana_s'] * 1000:.2f} ms)")
+            print(f"{'aging_leitura':>18}: {ina['leitura_aging']['mediana_s'] * 1000:10.2f} ms "
+                  f"(pandas sobre o livro: {ina['aging_pandas']['mediana_s'] * 1000:.2f} ms)")
+        if not args.sem_concorrencia:
+            item['concorrencia'] = con = medir_concorrencia_edicao()
+            print(f"{'edicao_concorrente':>18}: {con['segundos'] * 1000:10.2f} ms ({con['edicoes']} edições de "
+                  f"{con['editores']} editores; {con['conflitos_refeitos']} conflito(s) refeito(s))")
+        if not args.sem_carga:
+            item['carga'] = carga = medir_carga()
+            for nome, r in carga.items():
+                print(f"{'carga_' + nome:>18}: {r['segundos'] * 1000:10.2f} ms "
+                      f"({r['dataframe_mb']} MB, pico {r['pico_memoria_mb']} MB)")
+        if not args.sem_inicializacao:
+            item['inicializacao'] = ini = medir_inicializacao(args.repeticoes)
+            print(f"{'tela_login':>18}: {ini['login_s'] * 1000:10.2f} ms")
+            print(f"{'tela_dashboard':>18}: {ini['dashboard_s'] * 1000:10.2f} ms ({ini['digitacao_s']}s após o login)")
+        if not args.sem_exportacao:
+            item['exportacao'] = exp = medir_exportacao()
+            for formato, r in exp.items():
+                print(f"{'exportacao_' + formato.lower():>18}: {r['segundos'] * 1000:10.2f} ms "
+                      f"({r['arquivo_mb']} MB, pico {r['pico_memoria_mb']} MB)")
+        # Por último: a importação acrescenta lançamentos à base medida acima
+        if not args.sem_importacao:
+            item['importacao'] = imp = medir_importacao(linhas)
+            checar_resumo()
+            print(f"{'importacao_csv':>18}: {imp['linhas_s']:10,} linhas/s "
+                  f"({imp['arquivo_mb']} MB, pico {imp['pico_memoria_mb']} MB)")
+        relatorio['tamanhos'].append(item)
+
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"\nRelatório gravado em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
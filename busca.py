@@ -0,0 +1,157 @@
+import re
+import unicodedata
+
+from db import conexao, run_query
+
+# --- BUSCA TEXTUAL (FTS5 em clientes, projetos e tarefas) ---
+
+# Candidatos que recebem nota (bm25) por entidade: termos muito comuns não fazem a busca varrer o índice todo
+CANDIDATOS_BUSCA = 2000
+# Termos do vocabulário examinados por palavra na correção de erros de digitação
+TERMOS_CORRECAO = 5000
+# Palavras com menos letras que isto não são corrigidas (qualquer termo curto ficaria "próximo")
+MIN_CORRECAO = 4
+
+# Entidade -> (tabela FTS, SELECT do resultado a partir dos candidatos `f`, pesos bm25 das colunas)
+ENTIDADES = {
+    'Cliente': ("clientes_fts",
+                "SELECT 'Cliente' AS tipo, c.id, c.nome AS titulo, c.setor || ' · ' || c.cpf_cnpj AS detalhe, "
+                "c.id AS ref, f.rank FROM f JOIN clientes c ON c.id = f.rowid", (10.0, 5.0, 2.0, 1.0)),
+    'Projeto': ("projetos_fts",
+                "SELECT 'Projeto' AS tipo, p.id, p.nome AS titulo, p.responsavel || ' · ' || p.status AS detalhe, "
+                "p.id AS ref, f.rank FROM f JOIN projetos p ON p.id = f.rowid", (10.0, 2.0)),
+    'Tarefa': ("tarefas_fts",
+               "SELECT 'Tarefa' AS tipo, t.id, t.descricao AS titulo, p.nome || ' · ' || t.status AS detalhe, "
+               "t.projeto_id AS ref, f.rank FROM f JOIN tarefas t ON t.id = f.rowid "
+               "LEFT JOIN projetos p ON p.id = t.projeto_id", (1.0,)),
+}
+
+
+def palavras(texto):
+    """Palavras da busca; cada uma é uma lista de tokens (ex.: '12.345' -> ['12', '345'])"""
+    return [partes for partes in (re.findall(r"\w+", p) for p in texto.split()) if partes]
+
+
+def _normalizar(token):
+    """Como o tokenizer guarda o termo: minúsculo e sem acento"""
+    return "".join(c for c in unicodedata.normalize("NFKD", token.lower()) if not unicodedata.combining(c))
+
+
+def expressao(palavras):
+    """Expressão MATCH: todas as palavras (E), cada uma como frase, a última como prefixo.
+
+    Uma palavra pode vir como lista de alternativas (correções), unidas por OR.
+    """
+    def frase(tokens, prefixo):
+        return '"' + " ".join(tokens).replace('"', '""') + '"' + ("*" if prefixo else "")
+
+    termos = []
+    for i, palavra in enumerate(palavras):
+        ultima = i == len(palavras) - 1
+        if palavra and isinstance(palavra[0], list):
+            termos.append("(" + " OR ".join(frase(alt, ultima) for alt in palavra) + ")")
+        else:
+            termos.append(frase(palavra, ultima))
+    return " AND ".join(termos)
+
+
+def distancia(a, b, limite):
+    """Distância de edição com transposição (OSA), parando assim que passar de `limite`"""
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    anterior2, anterior = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            atual[j] = min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                atual[j] = min(atual[j], anterior2[j - 2] + 1)
+        if min(atual) > limite:
+            return limite + 1
+        anterior2, anterior = anterior, atual
+    return anterior[-1]
+
+
+def _vocabulario(fts, inicio, fim, minimo, maximo, limite):
+    """Termos de `fts` no intervalo [inicio, fim) com tamanho entre minimo e maximo"""
+    with conexao() as conn:
+        return [t for (t,) in conn.execute(f"SELECT term FROM {fts}_termos WHERE term >= ? AND term < ? "
+                                           "AND length(term) BETWEEN ? AND ? LIMIT ?",
+                                           (inicio, fim, minimo, maximo, limite))]
+
+
+def termos_proximos(termo, fts):
+    """Termos do índice `fts` a até 1 erro (2 em palavras longas) de `termo`, mais próximos primeiro.
+
+    Procura primeiro entre os termos com as mesmas duas letras iniciais e, sem achar,
+    entre os que começam pela mesma letra: cada tentativa é um intervalo do vocabulário.
+    """
+    termo = _normalizar(termo)
+    limite = 1 if len(termo) < 8 else 2
+    for prefixo in (termo[:2], termo[:1]):
+        vocab = _vocabulario(fts, prefixo, prefixo[:-1] + chr(ord(prefixo[-1]) + 1),
+                             len(termo) - limite, len(termo) + limite, TERMOS_CORRECAO)
+        proximos = sorted((d, t) for d, t in ((distancia(termo, t, limite), t) for t in vocab) if d <= limite)
+        if proximos:
+            return [t for _, t in proximos]
+    return []
+
+
+def _conhecido(termo, fts):
+    """Algum termo do índice é `termo` ou começa com ele?"""
+    termo = _normalizar(termo)
+    return bool(_vocabulario(fts, termo, termo + chr(0x10FFFF), 0, 1_000_000, 1))
+
+
+def _corrigir(palavras, fts):
+    """Troca as palavras que o índice não conhece pelas alternativas próximas do vocabulário.
+
+    Palavras compostas (ex.: documentos), curtas ou com dígitos ficam como estão.
+    """
+    corrigidas = []
+    for palavra in palavras:
+        termo = palavra[0]
+        if len(palavra) > 1 or len(termo) < MIN_CORRECAO or any(c.isdigit() for c in termo) or _conhecido(termo, fts):
+            corrigidas.append(palavra)
+            continue
+        alternativas = [[t] for t in termos_proximos(termo, fts)[:5]]
+        if not alternativas:
+            return None
+        corrigidas.append(alternativas)
+    return corrigidas
+
+
+def _consultar(entidade, match, limite):
+    fts, select, pesos = ENTIDADES[entidade]
+    sql = (f"WITH f AS (SELECT rowid, bm25({fts}, {', '.join(map(str, pesos))}) AS rank FROM {fts} "
+           f"WHERE {fts} MATCH ? LIMIT ?) {select} ORDER BY f.rank LIMIT ?")
+    return run_query(sql, (match, CANDIDATOS_BUSCA, limite), fetch=True, cache=True)
+
+
+def buscar(texto, entidades=tuple(ENTIDADES), limite=10):
+    """Resultados ranqueados (tipo, id, titulo, detalhe, ref, rank, corrigido) das `entidades`.
+
+    Primeiro a busca exata (palavras completas ou início da última); a entidade sem
+    nenhum resultado é buscada de novo com as palavras corrigidas pelo vocabulário.
+    `ref` é o que abre o resultado: o próprio id, ou o projeto de uma tarefa.
+    """
+    import pandas as pd
+
+    vazio = pd.DataFrame(columns=['tipo', 'id', 'titulo', 'detalhe', 'ref', 'rank', 'corrigido'])
+    lista = palavras(texto)
+    partes = []
+    for entidade in (entidades if lista else ()):
+        df = _consultar(entidade, expressao(lista), limite)
+        corrigido = False
+        if df.empty:
+            corrigidas = _corrigir(lista, ENTIDADES[entidade][0])
+            if corrigidas and corrigidas != lista:
+                df, corrigido = _consultar(entidade, expressao(corrigidas), limite), True
+        if not df.empty:
+            partes.append(df.assign(corrigido=corrigido))
+    if not partes:
+        return vazio
+    resultado = pd.concat(partes, ignore_index=True)
+    # bm25 é negativo: quanto menor, melhor; resultados exatos antes dos corrigidos
+    return resultado.sort_values(['corrigido', 'rank'], ignore_index=True).head(limite)
+
@@ -0,0 +1,330 @@
+import sqlite3
+from datetime import date, timedelta
+
+from db import get_pool, run_query
+from inadimplencia import FAIXAS_AGING
+from mudancas import FrameIncremental
+
+# --- KPIs E AGREGAÇÕES (calculados no SQLite) ---
+
+def _intervalo(dt_ini, dt_fim):
+    """Converte um período fechado [ini, fim] em intervalo semiaberto de datas ISO"""
+    return dt_ini.isoformat(), (dt_fim + timedelta(days=1)).isoformat()
+
+
+def _intervalo_mes(ano, mes):
+    """Primeiro dia do mês e primeiro dia do mês seguinte (predicado sargável)"""
+    inicio = date(ano, mes, 1)
+    fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+    return inicio.isoformat(), fim.isoformat()
+
+
+def _fatiar_periodo(dt_ini, dt_fim):
+    """Divide [ini, fim] em meses inteiros (lidos do resumo) e bordas parciais (lidas do livro).
+
+    Devolve ((mes_ini, mes_fim) ou None, [(ini, fim_exclusivo), ...]).
+    """
+    primeiro_cheio = dt_ini if dt_ini.day == 1 else (dt_ini.replace(day=1) + timedelta(days=32)).replace(day=1)
+    fim_mais_um = dt_fim + timedelta(days=1)
+    ultimo_cheio_exclusivo = fim_mais_um.replace(day=1)
+    if primeiro_cheio >= ultimo_cheio_exclusivo:
+        return None, [_intervalo(dt_ini, dt_fim)]
+    meses = (primeiro_cheio.strftime('%Y-%m'), (ultimo_cheio_exclusivo - timedelta(days=1)).strftime('%Y-%m'))
+    bordas = []
+    if dt_ini < primeiro_cheio:
+        bordas.append((dt_ini.isoformat(), primeiro_cheio.isoformat()))
+    if ultimo_cheio_exclusivo < fim_mais_um:
+        bordas.append((ultimo_cheio_exclusivo.isoformat(), fim_mais_um.isoformat()))
+    return meses, bordas
+
+
+def _agregar_periodo(dt_ini, dt_fim, grupo, filtro="1", args=()):
+    """SUM(valor) por `grupo` no período combinando financeiro_mensal e as bordas do livro.
+
+    `grupo` são colunas presentes nas duas tabelas ('mes' é calculado no livro).
+    """
+    import pandas as pd
+
+    meses, bordas = _fatiar_periodo(dt_ini, dt_fim)
+    cols = ", ".join(grupo)
+    cols_livro = ", ".join("strftime('%Y-%m', data_vencimento) AS mes" if c == 'mes' else c for c in grupo)
+    partes = []
+    if meses:
+        partes.append(run_query(f"SELECT {cols}, SUM(total) AS valor FROM financeiro_mensal "
+                                f"WHERE mes >= ? AND mes <= ? AND {filtro} GROUP BY {cols}",
+                                meses + tuple(args), fetch=True, cache=True))
+    for ini, fim in bordas:
+        partes.append(run_query(f"SELECT {cols_livro}, SUM(valor) AS valor FROM financeiro "
+                                f"WHERE data_vencimento >= ? AND data_vencimento < ? AND {filtro} GROUP BY {cols}",
+                                (ini, fim) + tuple(args), fetch=True, cache=True))
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return pd.DataFrame({**{c: pd.Series(dtype=object) for c in grupo}, 'valor': pd.Series(dtype=float)})
+    df = pd.concat(partes, ignore_index=True)
+    return df.groupby(list(grupo), as_index=False, sort=True)['valor'].sum()
+
+
+def kpis_gerais():
+    """Saldo, faturamento, despesas acumulados e quantidade de projetos ativos"""
+    fin = run_query("SELECT COALESCE(SUM(CASE WHEN tipo='Receita' THEN total END), 0) AS receita, "
+                    "COALESCE(SUM(CASE WHEN tipo='Despesa' THEN total END), 0) AS despesa FROM financeiro_mensal",
+                    fetch=True, cache=True)
+    ativos = run_query("SELECT COUNT(*) AS ativos FROM projetos WHERE status='Em Andamento'",
+                       fetch=True, cache=True)['ativos'].iloc[0]
+    receita, despesa = fin['receita'].iloc[0], fin['despesa'].iloc[0]
+    return {'receita': receita, 'despesa': despesa, 'saldo': receita - despesa, 'ativos': ativos}
+
+
+def fluxo_caixa_mensal(dt_ini, dt_fim):
+    """Total por mês e tipo no período; o mês é rotulado pelo último dia (como freq='M')"""
+    import pandas as pd
+
+    df = _agregar_periodo(dt_ini, dt_fim, ('mes', 'tipo'))
+    df['data_vencimento'] = pd.to_datetime(df['mes'], format='%Y-%m') + pd.offsets.MonthEnd(0)
+    return df[['data_vencimento', 'tipo', 'valor']]
+
+
+def despesas_por_categoria(dt_ini, dt_fim):
+    df = _agregar_periodo(dt_ini, dt_fim, ('categoria',), "tipo = 'Despesa'")
+    return df.sort_values('valor', ascending=False, ignore_index=True)
+
+
+def entregas_por_responsavel():
+    return run_query("SELECT responsavel, COUNT(*) AS entregas FROM tarefas WHERE status='Concluída' "
+                     "GROUP BY responsavel ORDER BY entregas DESC", fetch=True, cache=True)
+
+
+def clientes_por_setor():
+    return run_query("SELECT setor, COUNT(*) AS qtd FROM clientes GROUP BY setor ORDER BY qtd DESC", fetch=True, cache=True)
+
+
+# --- LANÇAMENTOS ---
+
+def _filtro_mes(ano, mes, tipo):
+    sql = "data_vencimento >= ? AND data_vencimento < ?"
+    args = list(_intervalo_mes(ano, mes))
+    if tipo:
+        sql += " AND tipo = ?"
+        args.append(tipo)
+    return sql, args
+
+
+def totais_mes(ano, mes, tipo=None):
+    """Entradas e saídas do mês (do resumo mensal); tipo=None considera Receitas e Despesas"""
+    sql = ("SELECT COALESCE(SUM(CASE WHEN tipo='Receita' THEN total END), 0) AS receita, "
+           "COALESCE(SUM(CASE WHEN tipo='Despesa' THEN total END), 0) AS despesa, COALESCE(SUM(qtd), 0) AS qtd "
+           "FROM financeiro_mensal WHERE mes = ?")
+    args = [f"{ano:04d}-{mes:02d}"]
+    if tipo:
+        sql += " AND tipo = ?"
+        args.append(tipo)
+    return run_query(sql, tuple(args), fetch=True, cache=True).iloc[0].to_dict()
+
+
+def pagina_lancamentos(ano, mes, tipo=None, cursor=None, tamanho=50):
+    """Uma página dos lançamentos do mês, ordenada por vencimento"""
+    filtro, args = _filtro_mes(ano, mes, tipo)
+    sql = f"SELECT id, versao, tipo, categoria, valor, data_vencimento, status FROM financeiro WHERE {filtro}"
+    return _pagina(sql, args, 'data_vencimento', cursor, tamanho)
+
+# --- INADIMPLÊNCIA (aging materializado pelo lote) ---
+
+def aging_recebiveis(por_contrato=False):
+    """Recebíveis atrasados por faixa de dias, por cliente (ou por contrato), maiores primeiro.
+
+    Lê financeiro_aging, recalculado pelo lote de inadimplência: o custo não depende
+    do tamanho do livro. Sem cache: outro processo (cron) pode ter refeito a tabela.
+    """
+    faixas = ", ".join(f"SUM(CASE WHEN a.faixa = '{f}' THEN a.total ELSE 0.0 END) AS \"{f}\"" for f in FAIXAS_AGING)
+    contrato = "a.contrato_id AS contrato, " if por_contrato else ""
+    grupo = "a.cliente_id, a.contrato_id" if por_contrato else "a.cliente_id"
+    return run_query(f"SELECT COALESCE(cl.nome, '(sem contrato)') AS cliente, {contrato}{faixas}, "
+                     "SUM(a.total) AS total, SUM(a.qtd) AS parcelas FROM financeiro_aging a "
+                     f"LEFT JOIN clientes cl ON cl.id = a.cliente_id GROUP BY {grupo} ORDER BY total DESC",
+                     fetch=True)
+
+
+def referencia_aging():
+    """Data de referência do último lote de inadimplência (None se nunca rodou ou não há atrasos)"""
+    with get_pool().conexao() as conn:
+        return conn.execute("SELECT MAX(referencia) FROM financeiro_aging").fetchone()[0]
+
+# --- PROJETOS E TAREFAS ---
+
+# Gantt: datas já em datetime64 e status como category
+TIPOS_CRONOGRAMA = {'inicio': 'data', 'fim': 'data', 'status': 'categorica'}
+
+def projetos_com_cliente():
+    return run_query("SELECT p.id, p.nome, c.nome as cli, p.inicio, p.fim, p.status, p.responsavel FROM projetos p "
+                     "JOIN contratos ct ON p.contrato_id = ct.id JOIN clientes c ON ct.cliente_id = c.id",
+                     fetch=True, cache=True)
+
+
+def _filtro_cronograma(dt_ini, dt_fim, status):
+    """Projetos que cruzam [ini, fim] (inclusive), opcionalmente só dos status dados"""
+    sql, args = "p.fim >= ? AND p.inicio <= ?", [dt_ini.isoformat(), dt_fim.isoformat()]
+    if status:
+        sql += f" AND p.status IN ({','.join('?' * len(status))})"
+        args += list(status)
+    return sql, args
+
+
+def contar_cronograma(dt_ini, dt_fim, status=()):
+    filtro, args = _filtro_cronograma(dt_ini, dt_fim, status)
+    return int(run_query(f"SELECT COUNT(*) AS n FROM projetos p WHERE {filtro}", tuple(args),
+                         fetch=True, cache=True)['n'].iloc[0])
+
+
+def cronograma_projetos(dt_ini, dt_fim, status=()):
+    """Uma barra por projeto na janela"""
+    filtro, args = _filtro_cronograma(dt_ini, dt_fim, status)
+    return run_query("SELECT p.nome, c.nome AS cli, p.inicio, p.fim, p.status, p.responsavel FROM projetos p "
+                     "JOIN contratos ct ON p.contrato_id = ct.id JOIN clientes c ON ct.cliente_id = c.id "
+                     f"WHERE {filtro} ORDER BY p.inicio", tuple(args), fetch=True, cache=True, tipos=TIPOS_CRONOGRAMA)
+
+
+def cronograma_por_cliente(dt_ini, dt_fim, status=()):
+    """Uma barra por cliente (do primeiro início ao último fim dos projetos na janela)"""
+    filtro, args = _filtro_cronograma(dt_ini, dt_fim, status)
+    return run_query("SELECT c.nome AS cli, MIN(p.inicio) AS inicio, MAX(p.fim) AS fim, COUNT(*) AS projetos, "
+                     "SUM(p.status = 'Em Andamento') AS em_andamento, "
+                     "CASE WHEN SUM(p.status = 'Em Andamento') > 0 THEN 'Em Andamento' ELSE 'Concluído' END AS status "
+                     "FROM projetos p JOIN contratos ct ON p.contrato_id = ct.id JOIN clientes c ON ct.cliente_id = c.id "
+                     f"WHERE {filtro} GROUP BY c.id ORDER BY inicio", tuple(args), fetch=True, cache=True,
+                     tipos=TIPOS_CRONOGRAMA)
+
+
+SQL_TAREFAS = "SELECT id, versao, descricao, data_limite, responsavel, status FROM tarefas WHERE projeto_id=?"
+
+
+def tarefas_projeto(projeto_id):
+    """Tarefas do projeto; data_limite já em datetime64, como o editor espera (status fica texto: é editável)"""
+    return run_query(SQL_TAREFAS, (projeto_id,), fetch=True, cache=True, tipos={'data_limite': 'data'})
+
+
+def frame_tarefas(projeto_id):
+    """Tarefas do projeto num FrameIncremental: a cada rerun só as tarefas alteradas são relidas"""
+    return FrameIncremental('tarefas', SQL_TAREFAS, (projeto_id,), tipos={'data_limite': 'data'})
+
+# --- PAGINAÇÃO (keyset) ---
+
+# Colunas pelas quais a grade de clientes pode ser ordenada/buscada
+ORDENS_CLIENTES = {'Nome': 'nome', 'CNPJ/CPF': 'cpf_cnpj', 'Setor': 'setor'}
+
+
+def _keyset(coluna, cursor, desc):
+    """Predicado e ORDER BY sobre (coluna, id); cursor = (valor, id) da última linha vista.
+
+    NULL vem antes no ASC e depois no DESC, como o SQLite ordena.
+    """
+    ordem = f"{coluna} DESC, id DESC" if desc else f"{coluna}, id"
+    if cursor is None:
+        return "1", (), ordem
+    valor, ultimo_id = cursor
+    if valor is None:
+        if desc:
+            return f"({coluna} IS NULL AND id < ?)", (ultimo_id,), ordem
+        return f"(({coluna} IS NULL AND id > ?) OR {coluna} IS NOT NULL)", (ultimo_id,), ordem
+    if desc:
+        return f"(({coluna}, id) < (?, ?) OR {coluna} IS NULL)", (valor, ultimo_id), ordem
+    return f"({coluna}, id) > (?, ?)", (valor, ultimo_id), ordem
+
+
+def _pagina(sql, args, coluna, cursor, tamanho, desc=False):
+    """Executa `sql` (que já tem WHERE) paginado; devolve (DataFrame, cursor da próxima página)"""
+    import pandas as pd
+
+    pred, args_cursor, ordem = _keyset(coluna, cursor, desc)
+    df = run_query(f"{sql} AND {pred} ORDER BY {ordem} LIMIT ?", tuple(args) + args_cursor + (tamanho + 1,),
+                   fetch=True, cache=True)
+    if len(df) <= tamanho:
+        return df, None
+    df = df.iloc[:tamanho]
+    valor = df[coluna].iloc[-1]
+    return df, (None if pd.isna(valor) else valor, int(df['id'].iloc[-1]))
+
+
+def _filtro_clientes(busca):
+    if not busca:
+        return "1", []
+    termo = f"%{busca}%"
+    return "(nome LIKE ? OR cpf_cnpj LIKE ? OR setor LIKE ?)", [termo, termo, termo]
+
+
+def contar_clientes(busca=""):
+    filtro, args = _filtro_clientes(busca)
+    return int(run_query(f"SELECT COUNT(*) AS n FROM clientes WHERE {filtro}", tuple(args),
+                         fetch=True, cache=True)['n'].iloc[0])
+
+
+def pagina_clientes(cursor=None, tamanho=50, busca="", ordem='nome', desc=False,
+                    colunas="id, nome, cpf_cnpj, setor, email"):
+    """Uma página de clientes com busca por nome/CNPJ/setor; `colunas` deve incluir id e a de ordem"""
+    if ordem not in ORDENS_CLIENTES.values():
+        raise ValueError(f"ordenação inválida: {ordem}")
+    filtro, args = _filtro_clientes(busca)
+    return _pagina(f"SELECT {colunas} FROM clientes WHERE {filtro}", args, ordem, cursor, tamanho, desc)
+
+# --- EXPORTAÇÕES (sql, args para exportacao.exportar) ---
+
+def sql_lancamentos(ano, mes=None, tipo=None):
+    """Lançamentos do mês, ou do ano inteiro com mes=None, por vencimento"""
+    if mes is None:
+        filtro, args = "data_vencimento >= ? AND data_vencimento < ?", [f"{ano:04d}-01-01", f"{ano + 1:04d}-01-01"]
+        if tipo:
+            filtro, args = filtro + " AND tipo = ?", args + [tipo]
+    else:
+        filtro, args = _filtro_mes(ano, mes, tipo)
+    return (f"SELECT id, contrato_id, tipo, categoria, valor, data_vencimento, status FROM financeiro "
+            f"WHERE {filtro} ORDER BY data_vencimento, id", args)
+
+
+def sql_clientes(busca=""):
+    filtro, args = _filtro_clientes(busca)
+    return (f"SELECT id, nome, cpf_cnpj, setor, porte, filiais, endereco, email, data_cadastro FROM clientes "
+            f"WHERE {filtro} ORDER BY nome, id", args)
+
+
+def sql_projetos_tarefas():
+    """Uma linha por tarefa, com projeto e cliente (projetos sem tarefa também aparecem)"""
+    return ("SELECT p.id AS projeto_id, p.nome AS projeto, c.nome AS cliente, p.inicio, p.fim, "
+            "p.status AS status_projeto, p.responsavel AS lider, t.id AS tarefa_id, t.descricao AS tarefa, "
+            "t.data_limite, t.responsavel, t.status AS status_tarefa, t.data_conclusao "
+            "FROM projetos p JOIN contratos ct ON p.contrato_id = ct.id JOIN clientes c ON ct.cliente_id = c.id "
+            "LEFT JOIN tarefas t ON t.projeto_id = p.id ORDER BY p.id, t.id", [])
+
+# --- PLANOS DE CONSULTA ---
+
+# Consultas filtradas que precisam usar índice; um SCAN aqui é regressão
+CONSULTAS_INDEXADAS = {
+    'pagina_lancamentos': ("SELECT id, versao, tipo, categoria, valor, data_vencimento, status FROM financeiro "
+                           "WHERE data_vencimento >= ? AND data_vencimento < ? AND tipo = ? "
+                           "AND (data_vencimento, id) > (?, ?) ORDER BY data_vencimento, id LIMIT ?",
+                           ('2024-01-01', '2024-02-01', 'Receita', '2024-01-10', 10, 51)),
+    'pagina_clientes': ("SELECT id, nome, cpf_cnpj, setor, email FROM clientes "
+                        "WHERE (nome, id) > (?, ?) ORDER BY nome, id LIMIT ?", ('M', 10, 51)),
+    'fluxo_caixa_mensal': ("SELECT strftime('%Y-%m', data_vencimento) AS mes, tipo, SUM(valor) FROM financeiro "
+                           "WHERE data_vencimento >= ? AND data_vencimento < ? GROUP BY mes, tipo",
+                           ('2024-01-01', '2024-04-01')),
+    'financeiro_contrato': ("SELECT id FROM financeiro WHERE contrato_id = ?", (1,)),
+    'financeiro_atrasados': ("SELECT id FROM financeiro WHERE status = ? AND data_vencimento < ?", ('Aberto', '2024-01-01')),
+    'tarefas_projeto': (SQL_TAREFAS, (1,)),
+    'projetos_contrato': ("SELECT id FROM projetos WHERE contrato_id = ?", (1,)),
+    'contratos_cliente': ("SELECT id FROM contratos WHERE cliente_id = ? AND status = ?", (1, 'Ativo')),
+}
+
+
+def verificar_planos():
+    """Roda EXPLAIN QUERY PLAN nas consultas indexadas e devolve as que fazem SCAN de tabela"""
+    problemas = {}
+    # Conexão própria sem cache de statements: um EXPLAIN em cache não enxerga índices novos/removidos
+    conn = sqlite3.connect(get_pool().path, cached_statements=0)
+    try:
+        for nome, (sql, args) in CONSULTAS_INDEXADAS.items():
+            plano = [linha[3] for linha in conn.execute("EXPLAIN QUERY PLAN " + sql, args)]
+            scans = [p for p in plano if p.startswith("SCAN ") and "INDEX" not in p]
+            if scans or not any("USING" in p and "INDEX" in p for p in plano):
+                problemas[nome] = plano
+    finally:
+        conn.close()
+    return problemas
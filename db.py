@@ -0,0 +1,758 @@
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import streamlit as st
+
+from metricas import formato_params, metricas, resumir_sql
+
+# --- CONFIGURAÇÃO DO BANCO ---
+
+DB_PATH = os.environ.get("PEEGFLOW_DB", "peegflow.db")
+POOL_SIZE = int(os.environ.get("PEEGFLOW_POOL_SIZE", "4"))
+BUSY_TIMEOUT_MS = int(os.environ.get("PEEGFLOW_BUSY_TIMEOUT_MS", "5000"))
+# Quantos statements preparados cada conexão mantém em cache
+STMT_CACHE = 256
+# Quantos resultados de leitura o cache de consultas guarda (LRU)
+QUERY_CACHE_SIZE = int(os.environ.get("PEEGFLOW_QUERY_CACHE_SIZE", "256"))
+# Linhas lidas do cursor por vez ao montar um DataFrame com tipos declarados
+LOTE_LEITURA = 50_000
+# Quantas consultas de uma tela rodam ao mesmo tempo (1 = uma depois da outra)
+LEITURAS_PARALELAS = int(os.environ.get("PEEGFLOW_LEITURAS_PARALELAS", str(POOL_SIZE)))
+
+# --- POOL DE CONEXÕES ---
+
+class ConnectionPool:
+    """Pool thread-safe de conexões SQLite de vida longa (WAL)"""
+
+    def __init__(self, path=DB_PATH, size=POOL_SIZE, busy_timeout_ms=BUSY_TIMEOUT_MS):
+        self.path = path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self._livres = queue.LifoQueue(maxsize=size)
+        self._criadas = 0
+        self._lock = threading.Lock()
+
+    def _conectar(self):
+        # isolation_level=None: autocommit; transações são abertas explicitamente em transacao()
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000,
+                               isolation_level=None, check_same_thread=False,
+                               cached_statements=STMT_CACHE)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _adquirir(self):
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._criadas < self.size:
+                self._criadas += 1
+                criar = True
+            else:
+                criar = False
+        if criar:
+            try:
+                return self._conectar()
+            except Exception:
+                with self._lock:
+                    self._criadas -= 1
+                raise
+        try:
+            return self._livres.get(timeout=self.busy_timeout_ms / 1000)
+        except queue.Empty:
+            raise sqlite3.OperationalError("pool de conexões esgotado") from None
+
+    def _devolver(self, conn):
+        # Nunca devolve ao pool uma conexão com transação pendente
+        if conn.in_transaction:
+            conn.rollback()
+        self._livres.put(conn)
+
+    @contextmanager
+    def conexao(self):
+        conn = self._adquirir()
+        try:
+            yield conn
+        finally:
+            self._devolver(conn)
+
+    def aquecer(self):
+        """Abre as conexões que ainda faltam, para nenhuma tela pagar por isso (não espera as ocupadas)"""
+        novas = []
+        while True:
+            with self._lock:
+                if self._criadas >= self.size:
+                    break
+                self._criadas += 1
+            try:
+                novas.append(self._conectar())
+            except Exception:
+                with self._lock:
+                    self._criadas -= 1
+                break
+        for conn in novas:
+            self._livres.put(conn)
+        return len(novas)
+
+    def fechar(self):
+        while True:
+            try:
+                conn = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._criadas -= 1
+
+
+@st.cache_resource
+def get_pool():
+    """Um pool por processo do servidor Streamlit, compartilhado entre sessões"""
+    return ConnectionPool()
+
+
+@contextmanager
+def conexao():
+    with get_pool().conexao() as conn:
+        yield conn
+
+
+@contextmanager
+def transacao(*tabelas):
+    """Conexão do pool dentro de uma transação: commit no fim, rollback em erro.
+
+    `tabelas` são as tabelas escritas, para invalidar o cache de leitura; sem elas,
+    qualquer escrita na transação invalida o cache inteiro.
+    """
+    with conexao() as conn:
+        mudancas = conn.total_changes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        if conn.total_changes != mudancas:
+            invalidar(*tabelas)
+
+# --- CACHE DE LEITURA (invalidado por versão de tabela) ---
+
+_RE_ESCRITA = re.compile(r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(\w+)",
+                         re.IGNORECASE)
+_RE_LEITURA = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)", re.IGNORECASE)
+
+# Versão por tabela; '*' é a versão global, que entra na chave de todas as leituras
+_versoes = Counter()
+_versoes_lock = threading.Lock()
+
+# Tabelas mantidas por triggers: escrever na origem também invalida as derivadas
+DERIVADAS = {
+    'financeiro': ('financeiro_mensal',),
+}
+
+
+def invalidar(*tabelas):
+    """Incrementa a versão das tabelas escritas (sem argumentos: invalida tudo)"""
+    with _versoes_lock:
+        for tabela in (tabelas or ('*',)):
+            tabela = tabela.lower()
+            for t in (tabela,) + DERIVADAS.get(tabela, ()):
+                _versoes[t] += 1
+
+
+def versoes(tabelas):
+    with _versoes_lock:
+        return (_versoes['*'],) + tuple(_versoes[t] for t in tabelas)
+
+
+def tabelas_lidas(query):
+    return tuple(sorted({t.lower() for t in _RE_LEITURA.findall(query)}))
+
+
+def tabela_escrita(query):
+    m = _RE_ESCRITA.match(query)
+    return m.group(1).lower() if m else None
+
+
+class CacheConsultas:
+    """LRU de DataFrames com limite de entradas e contadores de hit/miss"""
+
+    def __init__(self, tamanho=QUERY_CACHE_SIZE):
+        self.tamanho = tamanho
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.descartes = 0
+
+    def obter(self, chave):
+        with self._lock:
+            df = self._dados.get(chave)
+            if df is None:
+                self.misses += 1
+                return None
+            self._dados.move_to_end(chave)
+            self.hits += 1
+        return df.copy()
+
+    def guardar(self, chave, df):
+        with self._lock:
+            self._dados[chave] = df.copy()
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.tamanho:
+                self._dados.popitem(last=False)
+                self.descartes += 1
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'descartes': self.descartes,
+                    'entradas': len(self._dados), 'taxa_hit': self.hits / total if total else 0.0}
+
+
+cache_consultas = CacheConsultas()
+
+# --- CARGA TIPADA (DataFrame coluna a coluna) ---
+
+# Tipo de cada coluna conhecida quando a consulta pede tipos=True
+TIPOS_COLUNAS = {
+    **dict.fromkeys(("data_vencimento", "data_limite", "data_conclusao", "data_cadastro", "inicio", "fim"), 'data'),
+    **dict.fromkeys(("tipo", "categoria", "status", "setor", "porte", "responsavel", "perfil"), 'categorica'),
+    **dict.fromkeys(("id", "contrato_id", "cliente_id", "projeto_id", "filiais", "qtd_parcelas", "qtd"), 'inteiro'),
+    **dict.fromkeys(("valor", "valor_total", "total"), 'decimal'),
+}
+
+
+def _converter_bloco(especie, coluna, mapa):
+    """Uma coluna (array de objetos) de um bloco de linhas no tipo declarado"""
+    import numpy as np
+    import pandas as pd
+
+    if especie in ('inteiro', 'decimal'):
+        nulos = pd.isna(coluna)
+        if especie == 'inteiro' and not nulos.any():
+            return coluna.astype(np.int64)
+        # NULL vira NaN (uma coluna inteira com NULL fica em float64, como no pandas)
+        numeros = np.full(len(coluna), np.nan)
+        numeros[~nulos] = coluna[~nulos].astype(np.float64)
+        return numeros
+    if especie not in ('data', 'categorica'):
+        return coluna
+    # Poucos valores distintos: converte só os distintos do bloco e espalha pelos códigos
+    codigos, distintos = pd.factorize(coluna)
+    if especie == 'data':
+        # ISO8601 aceita 'AAAA-MM-DD' e 'AAAA-MM-DD HH:MM:SS'; texto inválido vira NaT
+        datas = pd.to_datetime(pd.Series(distintos, dtype=object), format="ISO8601", errors="coerce").to_numpy()
+        return np.append(datas, np.datetime64("NaT", "ns"))[codigos]
+    # Códigos do bloco -> códigos globais da coluna (NULL fica -1)
+    globais = np.fromiter((mapa.setdefault(v, len(mapa)) for v in distintos), dtype=np.int32, count=len(distintos))
+    return np.append(globais, np.int32(-1))[codigos]
+
+def _finalizar_coluna(especie, partes, mapa):
+    import numpy as np
+    import pandas as pd
+
+    coluna = np.concatenate(partes) if partes else _converter_bloco(especie, np.empty(0, dtype=object), mapa)
+    if especie == 'categorica':
+        return pd.Categorical.from_codes(coluna, categories=list(mapa))
+    if especie == 'inteiro' and coluna.dtype == np.int64:
+        info = np.iinfo(np.int32)
+        if not len(coluna) or (coluna.min() >= info.min and coluna.max() <= info.max):
+            return coluna.astype(np.int32)
+    return coluna
+
+
+def carregar_tipado(cur, tipos, tamanho=LOTE_LEITURA):
+    """Monta o DataFrame do cursor coluna a coluna, `tamanho` linhas por vez, já nos tipos declarados.
+
+    `tipos` mapeia coluna -> 'data' (datetime64, convertida uma vez aqui), 'categorica'
+    (category: códigos int32 + valores distintos), 'inteiro' (int32 quando cabe e não
+    há NULL) ou 'decimal' (float64: são valores em reais, float32 perderia centavos).
+    As demais colunas ficam como objetos Python. Nunca existe a lista com todas as tuplas.
+    """
+    import numpy as np
+    import pandas as pd
+
+    nomes = [d[0] for d in cur.description]
+    especies = [tipos.get(n) for n in nomes]
+    mapas = [{} for _ in nomes]
+    partes = [[] for _ in nomes]
+    while True:
+        linhas = cur.fetchmany(tamanho)
+        if not linhas:
+            break
+        # Tuplas -> matriz de objetos: cada coluna sai como uma fatia, sem transpor em Python
+        bloco = np.empty((len(linhas), len(nomes)), dtype=object)
+        bloco[:] = linhas
+        for i, (especie, mapa, lista) in enumerate(zip(especies, mapas, partes)):
+            lista.append(_converter_bloco(especie, bloco[:, i], mapa))
+    # Pelas posições: a consulta pode repetir nomes de coluna
+    df = pd.DataFrame({i: _finalizar_coluna(e, p, m) for i, (e, p, m) in enumerate(zip(especies, partes, mapas))})
+    df.columns = nomes
+    return df
+
+# --- CONSULTAS ---
+
+def run_query(query, params=(), fetch=False, cache=False, tipos=None):
+    """Executa uma instrução; com fetch=True devolve DataFrame, senão o lastrowid.
+
+    cache=True reaproveita o resultado enquanto nenhuma tabela lida pela consulta
+    for escrita pela camada de dados. `tipos` (dict coluna -> tipo, ou True para
+    TIPOS_COLUNAS) carrega o resultado já tipado; sem ele as colunas vêm como objetos.
+    """
+    if tipos is True:
+        tipos = TIPOS_COLUNAS
+    if fetch and cache:
+        tabelas = tabelas_lidas(query)
+        chave = (query, tuple(params), tabelas, versoes(tabelas), tuple(sorted(tipos.items())) if tipos else None)
+        t0 = time.perf_counter()
+        df = cache_consultas.obter(chave)
+        if df is None:
+            df = run_query(query, params, fetch=True, tipos=tipos)
+            cache_consultas.guardar(chave, df)
+        else:
+            metricas.registrar("consulta", resumir_sql(query), time.perf_counter() - t0,
+                               params=formato_params(params), linhas=len(df), cache=True)
+        return df
+
+    with conexao() as conn, metricas.medir("consulta", resumir_sql(query), params=formato_params(params)) as m:
+        mudancas = conn.total_changes
+        c = conn.execute(query, params)
+        if fetch and tipos:
+            df = carregar_tipado(c, tipos)
+            m['linhas'] = len(df)
+            return df
+        if fetch:
+            data = c.fetchall()
+            cols = [description[0] for description in c.description]
+            m['linhas'] = len(data)
+            # pandas só é carregado na primeira leitura (a tela de login não precisa dele)
+            import pandas as pd
+            return pd.DataFrame(data, columns=cols)
+        m['linhas'] = c.rowcount
+        tabela = tabela_escrita(query)
+        if tabela:
+            invalidar(tabela)
+        elif conn.total_changes != mudancas:
+            invalidar()
+        return c.lastrowid
+
+
+def executar_lote(query, linhas, conn=None):
+    """executemany de todas as linhas numa única transação (rollback se alguma falhar).
+
+    Com `conn`, roda dentro da transação já aberta pelo chamador.
+    """
+    linhas = list(linhas)
+    if not linhas:
+        return 0
+    tabela = tabela_escrita(query)
+    with metricas.medir("consulta", resumir_sql(query), params=formato_params(linhas), linhas=len(linhas)):
+        if conn is not None:
+            conn.executemany(query, linhas)
+            return len(linhas)
+        with transacao(*((tabela,) if tabela else ())) as conn:
+            conn.executemany(query, linhas)
+    return len(linhas)
+
+def atualizar_versionado(tabela, colunas, linhas):
+    """UPDATE condicional (controle otimista) de `colunas` numa transação curta.
+
+    Cada linha é (valores..., id, versao lida). Só grava a linha cuja versão ainda é a
+    lida, incrementando-a; as demais foram alteradas por outra pessoa desde a leitura
+    e ficam como estão. Devolve os ids dessas linhas em conflito.
+    """
+    linhas = list(linhas)
+    if not linhas:
+        return []
+    sql = (f"UPDATE {tabela} SET {', '.join(f'{c}=?' for c in colunas)}, versao = versao + 1 "
+           "WHERE id=? AND versao=?")
+    conflitos = []
+    with metricas.medir("consulta", resumir_sql(sql), params=formato_params(linhas), linhas=len(linhas)):
+        with transacao(tabela) as conn:
+            for linha in linhas:
+                if conn.execute(sql, linha).rowcount == 0:
+                    conflitos.append(linha[-2])
+    return conflitos
+
+# --- LEITURAS EM PARALELO ---
+
+@st.cache_resource
+def get_leitores():
+    """Threads de leitura do processo, compartilhadas pelas telas de todas as sessões"""
+    return ThreadPoolExecutor(max_workers=max(1, LEITURAS_PARALELAS), thread_name_prefix="peegflow-leitura")
+
+
+def em_paralelo(chamadas):
+    """Executa `{nome: (fn, *args)}` ao mesmo tempo; devolve `{nome: resultado}` quando todas terminam.
+
+    Cada chamada pega sua própria conexão do pool e, em WAL, leituras não se
+    bloqueiam: a tela espera pela consulta mais lenta e não pela soma delas.
+    As medições continuam ligadas ao rerun de quem chamou; um erro em qualquer
+    chamada é relançado aqui.
+    """
+    if LEITURAS_PARALELAS <= 1 or len(chamadas) <= 1:
+        return {nome: fn(*args) for nome, (fn, *args) in chamadas.items()}
+    rerun = metricas.rerun_atual()
+
+    def executar(fn, args):
+        with metricas.no_rerun(rerun):
+            return fn(*args)
+
+    leitores = get_leitores()
+    futuros = {nome: leitores.submit(executar, fn, args) for nome, (fn, *args) in chamadas.items()}
+    return {nome: futuro.result() for nome, futuro in futuros.items()}
+
+# --- ESQUEMA ---
+
+# Chave do resumo mensal a partir de uma linha de financeiro (NEW/OLD nos triggers)
+def _chave_resumo(linha):
+    return (f"COALESCE(strftime('%Y-%m', {linha}.data_vencimento), ''), COALESCE({linha}.tipo, ''), "
+            f"COALESCE({linha}.categoria, ''), COALESCE({linha}.status, '')")
+
+
+def _somar_resumo(linha):
+    return (f"INSERT INTO financeiro_mensal (mes, tipo, categoria, status, total, qtd) "
+            f"VALUES ({_chave_resumo(linha)}, COALESCE({linha}.valor, 0), 1) "
+            f"ON CONFLICT(mes, tipo, categoria, status) DO UPDATE SET total = total + excluded.total, qtd = qtd + 1;")
+
+
+def _subtrair_resumo(linha):
+    return (f"UPDATE financeiro_mensal SET total = total - COALESCE({linha}.valor, 0), qtd = qtd - 1 "
+            f"WHERE (mes, tipo, categoria, status) = ({_chave_resumo(linha)}); "
+            f"DELETE FROM financeiro_mensal WHERE qtd <= 0;")
+
+
+SQL_RECALCULAR_RESUMO = ("INSERT INTO financeiro_mensal (mes, tipo, categoria, status, total, qtd) "
+                         "SELECT COALESCE(strftime('%Y-%m', data_vencimento), ''), COALESCE(tipo, ''), "
+                         "COALESCE(categoria, ''), COALESCE(status, ''), SUM(COALESCE(valor, 0)), COUNT(*) "
+                         "FROM financeiro GROUP BY 1, 2, 3, 4")
+
+# Soma ao resumo os lançamentos com id acima de ? (cargas em massa sem os triggers)
+SQL_SOMAR_NOVOS_RESUMO = ("INSERT INTO financeiro_mensal (mes, tipo, categoria, status, total, qtd) "
+                          "SELECT COALESCE(strftime('%Y-%m', data_vencimento), ''), COALESCE(tipo, ''), "
+                          "COALESCE(categoria, ''), COALESCE(status, ''), SUM(COALESCE(valor, 0)), COUNT(*) "
+                          "FROM financeiro WHERE id > ? GROUP BY 1, 2, 3, 4 "
+                          "ON CONFLICT(mes, tipo, categoria, status) DO UPDATE SET "
+                          "total = total + excluded.total, qtd = qtd + excluded.qtd")
+
+# Tabelas cujas escritas vão para o log de mudanças (mudancas)
+TABELAS_MUDANCAS = ('tarefas', 'financeiro', 'projetos', 'contratos', 'clientes')
+
+
+def _gatilhos_mudancas(tabela):
+    """Triggers que registram cada linha inserida/alterada/apagada de `tabela` em mudancas"""
+    registrar = "INSERT INTO mudancas (tabela, linha, operacao) VALUES ('{t}', {lado}.id, '{op}');"
+    return [f"CREATE TRIGGER IF NOT EXISTS trg_mudancas_{tabela}_{nome} AFTER {evento} ON {tabela} "
+            f"BEGIN {registrar.format(t=tabela, lado=lado, op=op)} END"
+            for nome, evento, lado, op in (('ins', 'INSERT', 'NEW', 'I'), ('upd', 'UPDATE', 'NEW', 'U'),
+                                           ('del', 'DELETE', 'OLD', 'D'))]
+
+
+# Tabelas editadas em grade com controle otimista: cada linha tem uma versão (versao)
+TABELAS_VERSIONADAS = ('tarefas', 'financeiro')
+
+
+def _versionamento(tabela):
+    """Coluna versao e o trigger que a incrementa quando um UPDATE não a incrementou.
+
+    Quem edita pela grade grava com "versao = versao + 1 WHERE id=? AND versao=?";
+    o trigger cobre as demais escritas (lotes, importação, SQL avulso), para que elas
+    também invalidem a versão que uma grade aberta tem em mãos.
+    """
+    return [
+        f"ALTER TABLE {tabela} ADD COLUMN versao INTEGER NOT NULL DEFAULT 0",
+        f"CREATE TRIGGER IF NOT EXISTS trg_versao_{tabela} AFTER UPDATE ON {tabela} WHEN NEW.versao = OLD.versao "
+        f"BEGIN UPDATE {tabela} SET versao = OLD.versao + 1 WHERE id = NEW.id; END",
+    ]
+
+
+def _log_versionado(tabela):
+    """Log de UPDATE de `tabela` só quando a versão muda: uma entrada em mudancas por escrita.
+
+    O UPDATE que não incrementa a versão dispara trg_versao_<tabela>, que faz o
+    incremento num segundo UPDATE; registrar os dois duplicaria a mudança.
+    """
+    return [
+        f"DROP TRIGGER IF EXISTS trg_mudancas_{tabela}_upd",
+        f"CREATE TRIGGER trg_mudancas_{tabela}_upd AFTER UPDATE ON {tabela} WHEN NEW.versao <> OLD.versao "
+        f"BEGIN INSERT INTO mudancas (tabela, linha, operacao) VALUES ('{tabela}', NEW.id, 'U'); END",
+    ]
+
+
+def _renomear_logins_duplicados(conn):
+    """Antes do índice único em usuarios(usuario): o login repetido ganha '#id' (o mais antigo fica como está).
+
+    Nenhuma conta é apagada; cada renomeação vai para o log do servidor para o
+    administrador avisar o dono ou mesclar as contas.
+    """
+    duplicados = conn.execute("SELECT id, usuario FROM usuarios WHERE id NOT IN "
+                              "(SELECT MIN(id) FROM usuarios GROUP BY usuario) ORDER BY id").fetchall()
+    for id_, usuario in duplicados:
+        conn.execute("UPDATE usuarios SET usuario = ? WHERE id = ?", (f"{usuario}#{id_}", id_))
+        logging.getLogger("peegflow").warning("Login duplicado %r (usuário id %s) renomeado para %r",
+                                              usuario, id_, f"{usuario}#{id_}")
+
+
+# Índices de busca (FTS5 com conteúdo externo): tabela -> colunas indexadas
+INDICES_BUSCA = {
+    'clientes': ('nome', 'cpf_cnpj', 'email', 'setor'),
+    'projetos': ('nome', 'responsavel'),
+    'tarefas': ('descricao',),
+}
+
+
+def _indice_busca(tabela, colunas):
+    """Tabela FTS5 de `tabela` (rowid = id), seu vocabulário e os triggers que a mantêm em dia"""
+    fts, lista = f"{tabela}_fts", ", ".join(colunas)
+    novos, antigos = (", ".join(f"{lado}.{c}" for c in colunas) for lado in ('NEW', 'OLD'))
+    apagar = f"INSERT INTO {fts} ({fts}, rowid, {lista}) VALUES ('delete', OLD.id, {antigos});"
+    inserir = f"INSERT INTO {fts} (rowid, {lista}) VALUES (NEW.id, {novos});"
+    return [
+        # remove_diacritics: "diagnostico" acha "Diagnóstico"; prefixos de 2 e 3 letras indexados
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({lista}, content='{tabela}', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts}_termos USING fts5vocab({fts}, 'row')",
+        f"CREATE TRIGGER IF NOT EXISTS trg_busca_{tabela}_ins AFTER INSERT ON {tabela} BEGIN {inserir} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_busca_{tabela}_del AFTER DELETE ON {tabela} BEGIN {apagar} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_busca_{tabela}_upd AFTER UPDATE OF {lista} ON {tabela} "
+        f"BEGIN {apagar} {inserir} END",
+        f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+    ]
+
+
+# Migrações versionadas pelo PRAGMA user_version: a posição na lista é a versão.
+# Nunca altere uma migração já publicada; acrescente uma nova ao final.
+# Cada passo é um SQL ou uma função(conn), para o que precisa de Python.
+MIGRACOES = [
+    # 1: índices das consultas quentes (dashboard, mês financeiro, tarefas, joins)
+    [
+        "CREATE INDEX IF NOT EXISTS idx_financeiro_venc_tipo ON financeiro(data_vencimento, tipo, valor)",
+        "CREATE INDEX IF NOT EXISTS idx_financeiro_contrato ON financeiro(contrato_id)",
+        "CREATE INDEX IF NOT EXISTS idx_tarefas_projeto ON tarefas(projeto_id)",
+        "CREATE INDEX IF NOT EXISTS idx_projetos_contrato ON projetos(contrato_id)",
+        "CREATE INDEX IF NOT EXISTS idx_contratos_cliente_status ON contratos(cliente_id, status)",
+    ],
+    # 2: ordenação/paginação da base de clientes
+    [
+        "CREATE INDEX IF NOT EXISTS idx_clientes_nome ON clientes(nome)",
+        "CREATE INDEX IF NOT EXISTS idx_clientes_cpf_cnpj ON clientes(cpf_cnpj)",
+        "CREATE INDEX IF NOT EXISTS idx_clientes_setor ON clientes(setor)",
+    ],
+    # 3: resumo mensal do financeiro mantido por triggers
+    [
+        """CREATE TABLE IF NOT EXISTS financeiro_mensal (
+               mes TEXT NOT NULL, tipo TEXT NOT NULL, categoria TEXT NOT NULL, status TEXT NOT NULL,
+               total REAL NOT NULL, qtd INTEGER NOT NULL,
+               PRIMARY KEY (mes, tipo, categoria, status)) WITHOUT ROWID""",
+        f"CREATE TRIGGER IF NOT EXISTS trg_financeiro_mensal_ins AFTER INSERT ON financeiro BEGIN {_somar_resumo('NEW')} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_financeiro_mensal_del AFTER DELETE ON financeiro BEGIN {_subtrair_resumo('OLD')} END",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_financeiro_mensal_upd
+               AFTER UPDATE OF data_vencimento, tipo, categoria, status, valor ON financeiro
+               BEGIN {_subtrair_resumo('OLD')} {_somar_resumo('NEW')} END""",
+        "DELETE FROM financeiro_mensal",
+        SQL_RECALCULAR_RESUMO,
+    ],
+    # 4: fila de jobs em segundo plano
+    [
+        """CREATE TABLE IF NOT EXISTS jobs (
+               id INTEGER PRIMARY KEY, tipo TEXT NOT NULL, params TEXT, status TEXT NOT NULL,
+               tentativas INTEGER NOT NULL DEFAULT 0, mensagem TEXT, erro TEXT, resultado TEXT,
+               usuario TEXT, criado_em TEXT, iniciado_em TEXT, concluido_em TEXT)""",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)",
+    ],
+    # 5: log de mudanças (seq monotônica; AUTOINCREMENT nunca reaproveita um número)
+    [
+        """CREATE TABLE IF NOT EXISTS mudancas (
+               seq INTEGER PRIMARY KEY AUTOINCREMENT, tabela TEXT NOT NULL, linha INTEGER NOT NULL,
+               operacao TEXT NOT NULL)""",
+        *[sql for tabela in TABELAS_MUDANCAS for sql in _gatilhos_mudancas(tabela)],
+    ],
+    # 6: atrasos por status + vencimento (lote de inadimplência) e aging materializado
+    [
+        "CREATE INDEX IF NOT EXISTS idx_financeiro_status_venc ON financeiro(status, data_vencimento)",
+        """CREATE TABLE IF NOT EXISTS financeiro_aging (
+               cliente_id INTEGER NOT NULL, contrato_id INTEGER NOT NULL, faixa TEXT NOT NULL,
+               total REAL NOT NULL, qtd INTEGER NOT NULL, referencia DATE NOT NULL,
+               PRIMARY KEY (cliente_id, contrato_id, faixa))""",
+    ],
+    # 7: busca textual (FTS5) em clientes, projetos e tarefas
+    [sql for tabela, colunas in INDICES_BUSCA.items() for sql in _indice_busca(tabela, colunas)],
+    # 8: login único por usuário, sessões por token e trocas de usuário no log (cache de perfis)
+    [
+        _renomear_logins_duplicados,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_usuarios_usuario ON usuarios(usuario)",
+        """CREATE TABLE IF NOT EXISTS sessoes (
+               token TEXT PRIMARY KEY, usuario_id INTEGER NOT NULL, criada_em TEXT NOT NULL,
+               expira_em TEXT NOT NULL) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS idx_sessoes_usuario ON sessoes(usuario_id)",
+        "CREATE INDEX IF NOT EXISTS idx_sessoes_expira ON sessoes(expira_em)",
+        *_gatilhos_mudancas('usuarios'),
+    ],
+    # 9: versão por linha para as grades editáveis (controle otimista de concorrência)
+    [sql for tabela in TABELAS_VERSIONADAS for sql in _versionamento(tabela)],
+    # 10: o incremento feito pelo trigger de versão não entra como segunda mudança no log
+    [sql for tabela in TABELAS_VERSIONADAS for sql in _log_versionado(tabela)],
+    # 11: dono e batimento dos jobs em andamento (só o job abandonado é retomado)
+    [
+        "ALTER TABLE jobs ADD COLUMN dono TEXT",
+        "ALTER TABLE jobs ADD COLUMN batimento TEXT",
+    ],
+]
+
+
+def migrar(conn):
+    """Aplica as migrações pendentes na conexão (dentro da transação do chamador)"""
+    versao = conn.execute("PRAGMA user_version").fetchone()[0]
+    for numero, comandos in enumerate(MIGRACOES[versao:], start=versao + 1):
+        for passo in comandos:
+            if callable(passo):
+                passo(conn)
+            else:
+                conn.execute(passo)
+        conn.execute(f"PRAGMA user_version = {numero}")
+
+
+def reconstruir_resumo_mensal():
+    """Recalcula financeiro_mensal a partir do livro (backfill ou correção de divergências)"""
+    with transacao('financeiro_mensal') as conn:
+        conn.execute("DELETE FROM financeiro_mensal")
+        conn.execute(SQL_RECALCULAR_RESUMO)
+
+
+@contextmanager
+def sem_log_mudancas(conn, *tabelas):
+    """Suspende o log linha a linha de `tabelas` durante uma carga na transação `conn`.
+
+    No fim os triggers voltam e cada tabela ganha uma única mudança 'R' (recarregar):
+    quem acompanha o log relê a tabela em vez de receber milhões de linhas. Como o
+    DDL é transacional, um rollback restaura os triggers.
+    """
+    gatilhos = conn.execute("SELECT name, sql FROM sqlite_master WHERE type='trigger' AND "
+                            f"tbl_name IN ({','.join('?' * len(tabelas))}) AND name LIKE 'trg_mudancas_%'",
+                            tabelas).fetchall()
+    for nome, _ in gatilhos:
+        conn.execute(f"DROP TRIGGER {nome}")
+    yield conn
+    for _, sql in gatilhos:
+        conn.execute(sql)
+    conn.executemany("INSERT INTO mudancas (tabela, linha, operacao) VALUES (?, 0, 'R')",
+                     [(t,) for t in tabelas if t in TABELAS_MUDANCAS])
+
+
+@contextmanager
+def carga_em_massa(conn, tabela):
+    """Prepara a transação `conn` para um INSERT em massa em `tabela`.
+
+    Aumenta o cache de páginas, troca o log de mudanças linha a linha por uma recarga
+    (sem_log_mudancas) e, em `financeiro`, suspende os triggers do resumo: as linhas
+    novas (id acima do maior anterior) são somadas a financeiro_mensal de uma vez no fim.
+    """
+    cache_anterior = conn.execute("PRAGMA cache_size").fetchone()[0]
+    conn.execute("PRAGMA cache_size = -262144")
+    gatilhos, ultimo = [], 0
+    if tabela == 'financeiro':
+        ultimo = conn.execute("SELECT COALESCE(MAX(id), 0) FROM financeiro").fetchone()[0]
+        gatilhos = conn.execute("SELECT name, sql FROM sqlite_master WHERE type='trigger' "
+                                "AND name LIKE 'trg_financeiro_mensal_%'").fetchall()
+        for nome, _ in gatilhos:
+            conn.execute(f"DROP TRIGGER {nome}")
+    try:
+        with sem_log_mudancas(conn, tabela):
+            yield conn
+        if gatilhos:
+            conn.execute(SQL_SOMAR_NOVOS_RESUMO, (ultimo,))
+            for _, sql in gatilhos:
+                conn.execute(sql)
+    finally:
+        conn.execute(f"PRAGMA cache_size = {cache_anterior}")
+
+
+def verificar_resumo_mensal(tolerancia=0.005):
+    """Compara o resumo com o livro; devolve as chaves divergentes (vazio = consistente)"""
+    return run_query(
+        "WITH bruto AS (SELECT COALESCE(strftime('%Y-%m', data_vencimento), '') AS mes, COALESCE(tipo, '') AS tipo, "
+        "COALESCE(categoria, '') AS categoria, COALESCE(status, '') AS status, "
+        "SUM(COALESCE(valor, 0)) AS total, COUNT(*) AS qtd FROM financeiro GROUP BY 1, 2, 3, 4), "
+        "chaves AS (SELECT mes, tipo, categoria, status FROM bruto UNION SELECT mes, tipo, categoria, status FROM financeiro_mensal) "
+        "SELECT k.mes, k.tipo, k.categoria, k.status, b.total AS total_livro, r.total AS total_resumo, "
+        "b.qtd AS qtd_livro, r.qtd AS qtd_resumo FROM chaves k "
+        "LEFT JOIN bruto b USING (mes, tipo, categoria, status) "
+        "LEFT JOIN financeiro_mensal r USING (mes, tipo, categoria, status) "
+        "WHERE b.qtd IS NOT r.qtd OR ABS(COALESCE(b.total, 0) - COALESCE(r.total, 0)) > ?",
+        (tolerancia,), fetch=True)
+
+
+def init_db():
+    """Cria a estrutura do banco se não existir e aplica as migrações pendentes.
+
+    Com o banco já na última versão é só uma leitura de PRAGMA user_version,
+    sem abrir transação de escrita.
+    """
+    with conexao() as conn:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRACOES):
+            return
+    # usuarios importa db: importado aqui para não haver ciclo
+    from usuarios import hash_senha, proteger_senhas
+
+    with transacao() as conn:
+        c = conn.cursor()
+
+        # Tabelas
+        c.execute('''CREATE TABLE IF NOT EXISTS usuarios (
+                        id INTEGER PRIMARY KEY, usuario TEXT, senha TEXT, nome TEXT, cargo TEXT, perfil TEXT)''')
+
+        c.execute('''CREATE TABLE IF NOT EXISTS clientes (
+                        id INTEGER PRIMARY KEY, nome TEXT, cpf_cnpj TEXT, setor TEXT,
+                        porte TEXT, filiais INTEGER, endereco TEXT, email TEXT, data_cadastro DATE)''')
+
+        c.execute('''CREATE TABLE IF NOT EXISTS contratos (
+                        id INTEGER PRIMARY KEY, cliente_id INTEGER, tipo TEXT, valor_total REAL,
+                        qtd_parcelas INTEGER, inicio DATE, fim DATE, status TEXT,
+                        FOREIGN KEY(cliente_id) REFERENCES clientes(id))''')
+
+        c.execute('''CREATE TABLE IF NOT EXISTS projetos (
+                        id INTEGER PRIMARY KEY, contrato_id INTEGER, nome TEXT,
+                        inicio DATE, fim DATE, status TEXT, responsavel TEXT,
+                        FOREIGN KEY(contrato_id) REFERENCES contratos(id))''')
+
+        c.execute('''CREATE TABLE IF NOT EXISTS tarefas (
+                        id INTEGER PRIMARY KEY, projeto_id INTEGER, descricao TEXT, tipo TEXT,
+                        data_limite DATE, responsavel TEXT, status TEXT, data_conclusao DATE,
+                        FOREIGN KEY(projeto_id) REFERENCES projetos(id))''')
+
+        c.execute('''CREATE TABLE IF NOT EXISTS financeiro (
+                        id INTEGER PRIMARY KEY, contrato_id INTEGER, tipo TEXT, categoria TEXT,
+                        valor REAL, data_vencimento DATE, status TEXT,
+                        FOREIGN KEY(contrato_id) REFERENCES contratos(id))''')
+
+        # Cria admin padrão se vazio
+        c.execute("SELECT count(*) FROM usuarios")
+        if c.fetchone()[0] == 0:
+            c.execute("INSERT INTO usuarios (usuario, senha, nome, cargo, perfil) VALUES (?,?,?,?,?)",
+                      ("admin", hash_senha("123"), "Carlos Gestor", "CEO", "admin"))
+
+        migrar(conn)
+        # Bancos antigos guardavam as senhas em texto puro
+        proteger_senhas(conn)
+
+
+@st.cache_resource(show_spinner=False)
+def preparar_banco():
+    """init_db uma vez por processo do servidor (e não a cada clique em Entrar)"""
+    init_db()
+    return True
@@ -0,0 +1,176 @@
+import calendar
+import random
+from datetime import date, timedelta
+
+import numpy as np
+
+from automacao import cronograma_parcelas, gravar_parcelas
+from db import INDICES_BUSCA, carga_em_massa, sem_log_mudancas, transacao
+from usuarios import hash_senha
+
+# --- DADOS DE DEMONSTRAÇÃO / CARGA SINTÉTICA ---
+
+EQUIPE = [
+    ("ana", "123", "Ana Silva", "Consultora Pleno", "user"),
+    ("bruno", "123", "Bruno Souza", "Consultor Jr", "user"),
+    ("roberto", "123", "Roberto TI", "Tech Lead", "user"),
+    ("julia", "123", "Julia Financeiro", "Analista", "user")
+]
+CONSULTORES = ["Ana Silva", "Bruno Souza", "Roberto TI"]
+
+NOMES = ["Inova", "Agro", "Tech", "Log", "Construtora", "Hospital", "Escola", "Varejo", "Consultoria", "Indústria"]
+SUFIXOS = ["Solutions", "Corp", "Brasil", "S.A.", "Global", "Systems", "Partners", "Ltda"]
+SETORES = ["Tecnologia", "Agronegócio", "Saúde", "Educação", "Varejo", "Indústria"]
+TIPOS_CONTRATO = ["Estratégia", "Financeira", "TI", "RH"]
+ETAPAS = ["Kickoff", "Diagnóstico", "Desenvolvimento", "Treinamento", "Entrega Final"]
+DESPESAS_FIXAS = [("Salários", 40000), ("Aluguel", 5000), ("Impostos", 8000), ("Software", 2000)]
+
+# Lançamentos acumulados em memória antes de cada executemany
+LOTE_GERACAO = 100_000
+
+
+def somar_meses(d, meses):
+    """d + N meses, limitando o dia ao último dia do mês de destino"""
+    total = d.month - 1 + meses
+    ano, mes = d.year + total // 12, total % 12 + 1
+    return d.replace(year=ano, month=mes, day=min(d.day, calendar.monthrange(ano, mes)[1]))
+
+
+def _agenda(inicio, meses):
+    """Vencimentos ISO de `meses` parcelas a partir de `inicio`"""
+    return tuple(somar_meses(inicio, m).isoformat() for m in range(meses + 1))
+
+
+def _proximo_id(c, tabela):
+    return c.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {tabela}").fetchone()[0]
+
+
+def gerar_dados(n_clientes=20, prob_contrato=0.7, meses_historico=6, meses_contrato=6,
+                tarefas_por_projeto=5, seed=None, hoje=None, progresso=None, somente_base_vazia=False):
+    """Gera clientes, contratos, parcelas, projetos, tarefas e despesas recorrentes.
+
+    As linhas são montadas com ids explícitos e gravadas com executemany em blocos
+    de LOTE_GERACAO lançamentos, tudo numa única transação. Devolve a quantidade de
+    linhas inseridas por tabela. `progresso(fração)` é chamado a cada bloco gravado.
+    Com `somente_base_vazia`, não grava nada (devolve None) se já houver clientes; a
+    conferência roda dentro da transação de escrita, então duas gerações não se somam.
+    """
+    rnd = random.Random(seed)
+    hoje = hoje or date.today()
+    hoje_iso = hoje.isoformat()
+    dias_hist = max(meses_historico * 30, 31)
+
+    clientes, contratos, financeiro, projetos, tarefas = [], [], [], [], []
+    # Vencimentos por data de início, memoizados só nesta geração (um início por dia de histórico)
+    agendas = {}
+    totais = dict.fromkeys(('clientes', 'contratos', 'financeiro', 'projetos', 'tarefas'), 0)
+
+    def gravar():
+        c.executemany("INSERT INTO clientes (id, nome, cpf_cnpj, setor, porte, filiais, endereco, email, data_cadastro) "
+                      "VALUES (?,?,?,?,?,?,?,?,?)", clientes)
+        c.executemany("INSERT INTO contratos (id, cliente_id, tipo, valor_total, qtd_parcelas, inicio, fim, status) "
+                      "VALUES (?,?,?,?,?,?,?,?)", contratos)
+        c.executemany("INSERT INTO financeiro (contrato_id, tipo, categoria, valor, data_vencimento, status) "
+                      "VALUES (?,?,?,?,?,?)", financeiro)
+        c.executemany("INSERT INTO projetos (id, contrato_id, nome, inicio, fim, status, responsavel) "
+                      "VALUES (?,?,?,?,?,?,?)", projetos)
+        c.executemany("INSERT INTO tarefas (projeto_id, descricao, tipo, data_limite, responsavel, status, data_conclusao) "
+                      "VALUES (?,?,?,?,?,?,?)", tarefas)
+        # Parcelas dos contratos do bloco num cronograma vetorizado (centavos exatos)
+        if contratos:
+            ids, valores, inicios = zip(*((ct[0], ct[3], ct[5]) for ct in contratos))
+            agenda = cronograma_parcelas(ids, valores, meses_contrato, inicios, rotulo="Parcela")
+            status = np.where(agenda['data_vencimento'] < hoje_iso, "Pago", "Aberto")
+            totais['financeiro'] += gravar_parcelas(agenda, status, conn=conn)
+        for nome, linhas in (('clientes', clientes), ('contratos', contratos), ('financeiro', financeiro),
+                             ('projetos', projetos), ('tarefas', tarefas)):
+            totais[nome] += len(linhas)
+            linhas.clear()
+
+    # Carga em massa: cache de páginas maior, resumo mensal somado uma vez no fim e uma
+    # recarga por tabela no log de mudanças em vez de uma linha por registro gerado
+    with transacao() as conn:
+        if somente_base_vazia and conn.execute("SELECT 1 FROM clientes LIMIT 1").fetchone():
+            return None
+        with carga_em_massa(conn, 'financeiro'), sem_log_mudancas(conn, *(t for t in totais if t != 'financeiro')):
+            c = conn.cursor()
+
+            # 1. Equipe (só quem ainda não existe)
+            existentes = {u for (u,) in c.execute("SELECT usuario FROM usuarios")}
+            c.executemany("INSERT INTO usuarios (usuario, senha, nome, cargo, perfil) VALUES (?,?,?,?,?)",
+                          [(u, hash_senha(s), *resto) for u, s, *resto in EQUIPE if u not in existentes])
+
+            cli_id, ct_id, pj_id = (_proximo_id(c, t) for t in ("clientes", "contratos", "projetos"))
+
+            # Base vazia: recriar os índices depois da carga (ordenação em lote) é bem mais rápido
+            # que mantê-los linha a linha; o mesmo vale para os índices de busca (FTS5)
+            indices, gatilhos_busca = [], []
+            if (cli_id, ct_id, pj_id) == (1, 1, 1) and not c.execute("SELECT 1 FROM financeiro LIMIT 1").fetchone():
+                indices = c.execute("SELECT name, sql FROM sqlite_master WHERE type='index' AND sql IS NOT NULL "
+                                    "AND tbl_name IN ('clientes','contratos','financeiro','projetos','tarefas')").fetchall()
+                for nome, _ in indices:
+                    c.execute(f"DROP INDEX {nome}")
+                gatilhos_busca = c.execute("SELECT name, sql FROM sqlite_master WHERE type='trigger' "
+                                           "AND name LIKE 'trg_busca_%'").fetchall()
+                for nome, _ in gatilhos_busca:
+                    c.execute(f"DROP TRIGGER {nome}")
+
+            # 2. Clientes
+            for _ in range(n_clientes):
+                nome = f"{rnd.choice(NOMES)} {rnd.choice(SUFIXOS)} {cli_id}"
+                cnpj = f"{rnd.randint(10,99)}.456.789/0001-{rnd.randint(10,99)}"
+                cadastro = hoje - timedelta(days=rnd.randint(100, 100 + dias_hist))
+                clientes.append((cli_id, nome, cnpj, rnd.choice(SETORES), rnd.choice(["Médio", "Grande"]),
+                                 rnd.randint(1, 5), "Av. Central, 1000", f"contato@cli{cli_id}.com", cadastro.isoformat()))
+
+                # 3. Contratos, parcelas, projeto e tarefas
+                if rnd.random() < prob_contrato:
+                    valor = rnd.choice([30000, 60000, 120000])
+                    inicio = hoje - timedelta(days=rnd.randint(30, dias_hist))
+                    agenda = agendas.get(inicio)
+                    if agenda is None:
+                        agenda = agendas[inicio] = _agenda(inicio, meses_contrato)
+                    ini_iso, fim_iso = agenda[0], agenda[-1]
+                    ativo = fim_iso > hoje_iso
+                    contratos.append((ct_id, cli_id, rnd.choice(TIPOS_CONTRATO), valor, meses_contrato,
+                                      ini_iso, fim_iso, "Ativo" if ativo else "Encerrado"))
+
+                    resp = rnd.choice(CONSULTORES)
+                    projetos.append((pj_id, ct_id, f"Projeto {nome}", ini_iso, fim_iso,
+                                     "Em Andamento" if ativo else "Concluído", resp))
+                    for t in range(tarefas_por_projeto):
+                        desc = ETAPAS[t] if t < len(ETAPAS) else f"Etapa {t+1}"
+                        d_lim = inicio + timedelta(days=rnd.randint(10, 150))
+                        concluida = d_lim < hoje and rnd.random() > 0.2
+                        tarefas.append((pj_id, desc, "Etapa", d_lim.isoformat(), resp,
+                                        "Concluída" if concluida else "Pendente", d_lim.isoformat() if concluida else None))
+                    ct_id += 1
+                    pj_id += 1
+                cli_id += 1
+                if len(contratos) * meses_contrato >= LOTE_GERACAO:
+                    gravar()
+                    if progresso:
+                        progresso(totais['clientes'] / max(n_clientes, 1))
+
+            # 4. Despesas recorrentes (histórico + próximo mês)
+            for m in range(-(meses_historico - 1), 2):
+                venc = somar_meses(hoje, m).replace(day=10)
+                for cat, val in DESPESAS_FIXAS:
+                    financeiro.append((None, "Despesa", cat, val * rnd.uniform(0.95, 1.05), venc.isoformat(),
+                                       "Pago" if venc < hoje else "Aberto"))
+            gravar()
+            for _, sql in indices:
+                c.execute(sql)
+            if gatilhos_busca:
+                for tabela in INDICES_BUSCA:
+                    c.execute(f"INSERT INTO {tabela}_fts ({tabela}_fts) VALUES ('rebuild')")
+                for _, sql in gatilhos_busca:
+                    c.execute(sql)
+
+    return totais
+
+
+def gerar_demo_robusta(progresso=None):
+    """Popula o banco com 20 clientes, histórico financeiro e tarefas"""
+    # Evita duplicidade se já rodou (ou se outra geração gravou antes desta)
+    return gerar_dados(n_clientes=20, progresso=progresso, somente_base_vazia=True)
@@ -0,0 +1,120 @@
+import csv
+import io
+import os
+import tempfile
+
+from db import conexao
+
+# --- EXPORTAÇÃO EM FLUXO (CSV / XLSX / PARQUET) ---
+
+# Linhas buscadas do cursor e gravadas no arquivo por vez
+LOTE_EXPORTACAO = int(os.environ.get("PEEGFLOW_LOTE_EXPORTACAO", "20000"))
+# Limite de linhas de uma planilha do Excel (o cabeçalho ocupa uma)
+LINHAS_XLSX = 1_048_575
+
+# Tipo de cada coluna no Parquet (as demais viram texto)
+INTEIRAS = {"id", "contrato_id", "cliente_id", "projeto_id", "tarefa_id", "filiais", "qtd_parcelas"}
+DECIMAIS = {"valor", "valor_total"}
+
+FORMATOS_EXPORTACAO = {
+    'CSV': ("csv", "text/csv"),
+    'XLSX': ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    'Parquet': ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def blocos(sql, args=(), tamanho=LOTE_EXPORTACAO):
+    """Gera listas de linhas direto do cursor, `tamanho` por vez"""
+    with conexao() as conn:
+        cur = conn.execute(sql, tuple(args))
+        try:
+            while True:
+                linhas = cur.fetchmany(tamanho)
+                if not linhas:
+                    break
+                yield linhas
+        finally:
+            cur.close()
+
+
+def _colunas(sql, args):
+    with conexao() as conn:
+        cur = conn.execute(f"SELECT * FROM ({sql}) LIMIT 0", tuple(args))
+        colunas = [d[0] for d in cur.description]
+        cur.close()
+    return colunas
+
+# --- ESCRITORES ---
+
+def _gravar_csv(arquivo, colunas, fluxo):
+    # ';' e BOM: abre direto no Excel em pt-BR (e é o formato que a importação aceita)
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    escritor = csv.writer(texto, delimiter=";")
+    escritor.writerow(colunas)
+    for linhas in fluxo:
+        escritor.writerows(linhas)
+    texto.flush()
+    texto.detach()
+
+
+def _gravar_xlsx(arquivo, colunas, fluxo):
+    from openpyxl import Workbook
+
+    # write_only grava as linhas em disco conforme chegam, sem montar a planilha em memória
+    livro = Workbook(write_only=True)
+    planilha, usadas = None, LINHAS_XLSX
+    for linhas in fluxo:
+        for linha in linhas:
+            if usadas == LINHAS_XLSX:
+                planilha = livro.create_sheet(f"Dados {len(livro.worksheets) + 1}")
+                planilha.append(colunas)
+                usadas = 0
+            planilha.append(linha)
+            usadas += 1
+    if planilha is None:
+        livro.create_sheet("Dados 1").append(colunas)
+    livro.save(arquivo)
+
+
+def _gravar_parquet(arquivo, colunas, fluxo):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = pa.schema([(c, pa.int64() if c in INTEIRAS else pa.float64() if c in DECIMAIS else pa.string())
+                         for c in colunas])
+    with pq.ParquetWriter(arquivo, esquema) as escritor:
+        for linhas in fluxo:
+            dados = list(zip(*linhas))
+            escritor.write_table(pa.Table.from_arrays(
+                [pa.array([v if v is None else str(v) for v in col] if tipo.type == pa.string() else col,
+                          type=tipo.type) for col, tipo in zip(dados, esquema)], schema=esquema))
+
+
+ESCRITORES = {'CSV': _gravar_csv, 'XLSX': _gravar_xlsx, 'Parquet': _gravar_parquet}
+DEPENDENCIAS = {'XLSX': "openpyxl", 'Parquet': "pyarrow"}
+
+
+def disponivel(formato):
+    """O formato pode ser gerado neste ambiente? (XLSX e Parquet dependem de pacotes opcionais)"""
+    modulo = DEPENDENCIAS.get(formato)
+    if modulo is None:
+        return True
+    try:
+        __import__(modulo)
+    except ImportError:
+        return False
+    return True
+
+
+def exportar(sql, args=(), formato='CSV', tamanho=LOTE_EXPORTACAO):
+    """Grava o resultado de `sql` num arquivo temporário, bloco a bloco; devolve o arquivo aberto no início.
+
+    O DataFrame nunca é montado: as linhas vão do cursor para o escritor em blocos
+    de `tamanho`, então a memória não cresce com o tamanho do relatório.
+    """
+    if not disponivel(formato):
+        raise RuntimeError(f"Exportar {formato} requer o pacote {DEPENDENCIAS[formato]}.")
+    arquivo = tempfile.TemporaryFile()
+    ESCRITORES[formato](arquivo, _colunas(sql, args), blocos(sql, args, tamanho))
+    arquivo.seek(0)
+    return arquivo
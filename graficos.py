@@ -0,0 +1,76 @@
+import os
+
+import streamlit as st
+
+# --- GRÁFICOS (figuras memoizadas pelo conteúdo dos dados) ---
+# plotly é importado dentro de cada figura: o login e as telas sem gráfico não o carregam
+
+# Paleta PeegFlow
+CORES = {
+    'Azul': '#4169E1', 'Vermelho': '#D50000', 'Amarelo': '#FFD700',
+    'Cinza': '#E0E0E0', 'Verde': '#2E7D32', 'Roxo': '#6A1B9A',
+    'Fundo': '#F0F2F6'
+}
+CORES_STATUS = {"Em Andamento": CORES['Azul'], "Concluído": CORES['Verde']}
+
+# Acima de tantas barras o Gantt passa a mostrar uma barra por cliente
+GANTT_MAX_BARRAS = int(os.environ.get("PEEGFLOW_GANTT_MAX_BARRAS", "150"))
+# Quantas figuras ficam guardadas (compartilhadas entre sessões)
+FIGURAS_CACHE = int(os.environ.get("PEEGFLOW_FIGURAS_CACHE", "64"))
+
+# st.cache_data faz o hash do DataFrame de entrada: o mesmo dado reaproveita a figura
+# em qualquer rerun ou sessão, e um dado novo gera uma figura nova
+memoizar = st.cache_data(max_entries=FIGURAS_CACHE, show_spinner=False)
+
+
+@memoizar
+def fluxo_caixa(df_time):
+    import plotly.express as px
+
+    return px.bar(df_time, x='data_vencimento', y='valor', color='tipo', barmode='group',
+                  title="Fluxo de Caixa Mensal",
+                  color_discrete_map={'Receita': CORES['Azul'], 'Despesa': CORES['Vermelho']})
+
+
+@memoizar
+def despesas(df_desp):
+    import plotly.express as px
+
+    return px.pie(df_desp, values='valor', names='categoria', title="Share de Despesas", hole=0.4,
+                  color_discrete_sequence=px.colors.sequential.RdBu)
+
+
+@memoizar
+def entregas(df_rank):
+    import plotly.express as px
+
+    return px.bar(df_rank, x='responsavel', y='entregas', title="Tarefas Concluídas por Consultor",
+                  labels={'entregas': 'Entregas'}, color='entregas', color_continuous_scale='Blues')
+
+
+@memoizar
+def setores(df_setor):
+    import plotly.express as px
+
+    return px.pie(df_setor, values='qtd', names='setor', title="Carteira por Setor")
+
+
+@memoizar
+def gantt(df, por_cliente=False):
+    """Linha do tempo: uma barra por projeto, ou por cliente (df de cronograma_por_cliente).
+
+    inicio/fim chegam em datetime64 (consultas.TIPOS_CRONOGRAMA).
+    """
+    import plotly.express as px
+
+    if por_cliente:
+        fig = px.timeline(df, x_start="inicio", x_end="fim", y="cli", color="status",
+                          hover_data=["projetos", "em_andamento"], labels={'cli': "Cliente"},
+                          title="Linha do Tempo por Cliente", color_discrete_map=CORES_STATUS)
+    else:
+        fig = px.timeline(df, x_start="inicio", x_end="fim", y="nome", color="status",
+                          hover_data=["cli", "responsavel"],
+                          title="Linha do Tempo dos Projetos", color_discrete_map=CORES_STATUS)
+    # Mais antigo no topo
+    fig.update_yaxes(autorange="reversed")
+    return fig
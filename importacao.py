@@ -0,0 +1,255 @@
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from db import carga_em_massa, transacao
+
+# --- IMPORTAÇÃO EM LOTE (CSV / PARQUET) ---
+
+# Linhas lidas, validadas e gravadas por vez: limita a memória em arquivos grandes
+LOTE_IMPORTACAO = int(os.environ.get("PEEGFLOW_LOTE_IMPORTACAO", "50000"))
+PASTA_UPLOADS = os.path.join(tempfile.gettempdir(), "peegflow-importacao")
+FORMATOS = ["csv", "parquet"]
+
+TIPOS_FINANCEIRO = ("Receita", "Despesa")
+STATUS_FINANCEIRO = ("Aberto", "Pago", "Atrasado")
+
+COLUNAS = {
+    'clientes': ["nome", "cpf_cnpj", "setor", "porte", "filiais", "endereco", "email", "data_cadastro"],
+    'financeiro': ["contrato_id", "tipo", "categoria", "valor", "data_vencimento", "status"],
+}
+OBRIGATORIAS = {
+    'clientes': ["nome", "cpf_cnpj"],
+    'financeiro': ["tipo", "valor", "data_vencimento"],
+}
+# Cabeçalhos comuns em planilhas exportadas de outros sistemas
+SINONIMOS = {
+    "razao_social": "nome", "cliente": "nome", "cnpj": "cpf_cnpj", "cpf": "cpf_cnpj", "documento": "cpf_cnpj",
+    "cadastro": "data_cadastro", "contrato": "contrato_id", "vencimento": "data_vencimento",
+    "data": "data_vencimento", "situacao": "status",
+}
+
+# --- LEITURA EM BLOCOS ---
+
+def _separador(caminho, encoding):
+    """';' é o padrão do Excel em pt-BR; decide pela primeira linha"""
+    with open(caminho, encoding=encoding, errors="replace") as f:
+        cabecalho = f.readline()
+    return ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+
+
+def ler_blocos(caminho, lote=LOTE_IMPORTACAO, encoding="utf-8-sig"):
+    """Gera (bloco, fração lida do arquivo) sem carregar o arquivo inteiro"""
+    if caminho.lower().endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Importar Parquet requer o pacote pyarrow (pip install pyarrow).")
+        arquivo = pq.ParquetFile(caminho)
+        total, lidas = max(arquivo.metadata.num_rows, 1), 0
+        for batch in arquivo.iter_batches(batch_size=lote):
+            bloco = batch.to_pandas()
+            bloco.index = pd.RangeIndex(lidas, lidas + len(bloco))
+            lidas += len(bloco)
+            yield bloco, lidas / total
+        return
+
+    tamanho = max(os.path.getsize(caminho), 1)
+    with open(caminho, "rb") as f:
+        leitor = pd.read_csv(f, sep=_separador(caminho, encoding), encoding=encoding, dtype=str,
+                             keep_default_na=False, na_values=[""], chunksize=lote)
+        for bloco in leitor:
+            yield bloco, min(f.tell() / tamanho, 1.0)
+
+
+def _normalizar_cabecalho(df):
+    nomes = df.columns.astype(str).str.strip().str.lower().str.replace(r"[\s/-]+", "_", regex=True)
+    return df.set_axis([SINONIMOS.get(n, n) for n in nomes], axis=1)
+
+# --- NORMALIZAÇÃO (vetorizada por bloco) ---
+
+def _texto(s):
+    s = s.astype("string").str.strip()
+    return s.mask(s == "")
+
+
+def normalizar_documento(s):
+    """CNPJ (14 dígitos) ou CPF (11) no formato com pontuação; NA se inválido"""
+    digitos = _texto(s).str.replace(r"\D", "", regex=True)
+    cnpj = digitos.str.replace(r"^(\d{2})(\d{3})(\d{3})(\d{4})(\d{2})$", r"\1.\2.\3/\4-\5", regex=True)
+    cpf = digitos.str.replace(r"^(\d{3})(\d{3})(\d{3})(\d{2})$", r"\1.\2.\3-\4", regex=True)
+    n = digitos.str.len()
+    return cnpj.where(n == 14, cpf.where(n == 11))
+
+
+# Cada normalização tenta primeiro o formato canônico (caminho rápido, em C) e só
+# trata com operações de texto as linhas que falharam
+
+def normalizar_data(s):
+    """ISO (AAAA-MM-DD) ou dd/mm/aaaa -> 'AAAA-MM-DD'; NA se inválida"""
+    if pd.api.types.is_datetime64_any_dtype(s):
+        datas = s
+    else:
+        datas = pd.to_datetime(s, format="%Y-%m-%d", errors="coerce")
+        falhas = datas.isna() & s.notna()
+        if falhas.any():
+            texto = _texto(s[falhas]).str.slice(0, 10)
+            datas[falhas] = pd.to_datetime(texto, format="%Y-%m-%d", errors="coerce").fillna(
+                pd.to_datetime(texto, format="%d/%m/%Y", errors="coerce"))
+    return datas.dt.strftime("%Y-%m-%d").astype("string")
+
+
+def normalizar_valor(s):
+    """Aceita número ou texto em formato brasileiro ('R$ 1.234,56'); NA se inválido"""
+    valores = pd.to_numeric(s, errors="coerce").astype(float)
+    falhas = valores.isna() & s.notna()
+    if falhas.any():
+        texto = _texto(s[falhas]).str.replace(r"R\$|\s", "", regex=True)
+        br = texto.str.contains(",", regex=False, na=False)
+        texto = texto.where(~br, texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+        valores[falhas] = pd.to_numeric(texto, errors="coerce").astype(float)
+    return valores
+
+
+def _opcoes(s, validas, padrao=None):
+    """Casa o texto com uma das opções sem diferenciar maiúsculas"""
+    saida = s.map(dict(zip(validas, validas)))
+    falhas = saida.isna()
+    if falhas.any():
+        texto = _texto(s[falhas]).str.lower()
+        if padrao is not None:
+            texto = texto.fillna(padrao.lower())
+        saida[falhas] = texto.map({v.lower(): v for v in validas})
+    return saida.astype("string")
+
+
+def _existentes(conn, tabela, coluna, valores):
+    """Valores de `coluna` que já estão em `tabela` (consulta em fatias pelo índice)"""
+    valores = list(dict.fromkeys(v for v in valores if v is not None))
+    achados = set()
+    for i in range(0, len(valores), 900):
+        fatia = valores[i:i + 900]
+        achados.update(v for (v,) in conn.execute(
+            f"SELECT {coluna} FROM {tabela} WHERE {coluna} IN ({','.join('?' * len(fatia))})", fatia))
+    return achados
+
+
+def _preparar_clientes(df, conn):
+    out = pd.DataFrame(index=df.index)
+    out['nome'] = _texto(df['nome'])
+    out['cpf_cnpj'] = normalizar_documento(df['cpf_cnpj'])
+    for col in ("setor", "porte", "endereco", "email"):
+        out[col] = _texto(df[col]) if col in df else pd.NA
+    out['filiais'] = (pd.to_numeric(df['filiais'], errors="coerce") if 'filiais' in df
+                      else pd.Series(np.nan, index=df.index)).fillna(1).astype(int)
+    cadastro = normalizar_data(df['data_cadastro']) if 'data_cadastro' in df else pd.Series(pd.NA, index=df.index)
+    out['data_cadastro'] = cadastro.fillna(date.today().isoformat())
+
+    ja_existe = out['cpf_cnpj'].isin(_existentes(conn, "clientes", "cpf_cnpj", out['cpf_cnpj'].dropna()))
+    # Repetição só conta entre linhas que seriam importadas
+    candidata = out['nome'].notna() & out['cpf_cnpj'].notna() & ~ja_existe
+    erros = [
+        (out['nome'].isna(), "nome vazio"),
+        (out['cpf_cnpj'].isna(), "CPF/CNPJ inválido"),
+        (ja_existe, "CPF/CNPJ já cadastrado"),
+        (candidata & out['cpf_cnpj'].where(candidata).duplicated(), "CPF/CNPJ repetido no arquivo"),
+    ]
+    if 'data_cadastro' in df:
+        erros.append((df['data_cadastro'].notna() & cadastro.isna(), "data de cadastro inválida"))
+    return out, erros
+
+
+def _preparar_financeiro(df, conn):
+    out = pd.DataFrame(index=df.index)
+    contrato = pd.to_numeric(df['contrato_id'], errors="coerce") if 'contrato_id' in df else None
+    if contrato is not None:
+        contrato = contrato.where(contrato % 1 == 0)
+    out['contrato_id'] = contrato.astype("Int64") if contrato is not None else pd.NA
+    out['tipo'] = _opcoes(df['tipo'], TIPOS_FINANCEIRO)
+    out['categoria'] = _texto(df['categoria']) if 'categoria' in df else pd.NA
+    out['valor'] = normalizar_valor(df['valor'])
+    out['data_vencimento'] = normalizar_data(df['data_vencimento'])
+    out['status'] = _opcoes(df['status'], STATUS_FINANCEIRO, "Aberto") if 'status' in df else "Aberto"
+
+    erros = [
+        (out['tipo'].isna(), "tipo deve ser Receita ou Despesa"),
+        (out['valor'].isna() | (out['valor'] < 0), "valor inválido"),
+        (out['data_vencimento'].isna(), "data de vencimento inválida"),
+        (pd.Series(out['status']).isna(), "status inválido"),
+    ]
+    if contrato is not None:
+        informado = _texto(df['contrato_id']).notna()
+        conhecidos = _existentes(conn, "contratos", "id", [int(v) for v in contrato.dropna()])
+        erros.append((informado & ~contrato.isin(conhecidos), "contrato inexistente"))
+    return out, erros
+
+
+PREPARAR = {'clientes': _preparar_clientes, 'financeiro': _preparar_financeiro}
+
+# --- IMPORTAÇÃO ---
+
+def _linhas(df):
+    """Tuplas prontas para o sqlite3: NA vira None e numpy vira tipo nativo"""
+    return list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+
+
+def importar(caminho, tabela, progresso=None, rejeitados=None, lote=LOTE_IMPORTACAO):
+    """Importa um CSV/Parquet para `clientes` ou `financeiro`, bloco a bloco.
+
+    Cada bloco é validado e gravado com executemany na sua própria transação, então
+    a memória fica limitada ao tamanho do lote. Linhas recusadas vão, com o motivo,
+    para o CSV `rejeitados` (padrão: ao lado do arquivo). Devolve as contagens.
+    """
+    if tabela not in PREPARAR:
+        raise ValueError(f"importação não suportada para a tabela {tabela}")
+    rejeitados = rejeitados or os.path.splitext(caminho)[0] + ".rejeitados.csv"
+    if os.path.exists(rejeitados):
+        os.remove(rejeitados)
+    colunas = COLUNAS[tabela]
+    insert = f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({','.join('?' * len(colunas))})"
+
+    lidas = importadas = recusadas = 0
+    t0 = time.perf_counter()
+    for bloco, fracao in ler_blocos(caminho, lote):
+        bloco = _normalizar_cabecalho(bloco)
+        faltando = [c for c in OBRIGATORIAS[tabela] if c not in bloco]
+        if faltando:
+            raise ValueError(f"colunas obrigatórias ausentes: {', '.join(faltando)}")
+
+        with transacao(tabela) as conn, carga_em_massa(conn, tabela):
+            dados, erros = PREPARAR[tabela](bloco, conn)
+            motivo = pd.Series("", index=bloco.index)
+            for invalida, texto in erros:
+                invalida = invalida.fillna(False).astype(bool)
+                motivo = motivo.where(~invalida, motivo + np.where(motivo == "", "", "; ") + texto)
+            ok = motivo == ""
+            conn.executemany(insert, _linhas(dados.loc[ok, colunas]))
+
+        if not ok.all():
+            ruins = bloco.loc[~ok].assign(linha=bloco.index[~ok] + 2, motivo=motivo[~ok])
+            ruins.to_csv(rejeitados, mode="a", header=not os.path.exists(rejeitados), index=False)
+        lidas += len(bloco)
+        importadas += int(ok.sum())
+        recusadas += int((~ok).sum())
+        if progresso:
+            progresso(fracao, f"{importadas} linha(s) importada(s), {recusadas} recusada(s)")
+
+    segundos = time.perf_counter() - t0
+    return {'lidas': lidas, 'importadas': importadas, 'rejeitadas': recusadas,
+            'rejeitados': rejeitados if recusadas else None,
+            'segundos': round(segundos, 3), 'linhas_s': round(lidas / segundos) if segundos else None}
+
+
+def guardar_upload(arquivo):
+    """Copia o upload do Streamlit para disco em blocos; devolve o caminho"""
+    os.makedirs(PASTA_UPLOADS, exist_ok=True)
+    caminho = os.path.join(PASTA_UPLOADS, f"{uuid.uuid4().hex}{os.path.splitext(arquivo.name)[1].lower()}")
+    with open(caminho, "wb") as f:
+        shutil.copyfileobj(arquivo, f, 1 << 20)
+    return caminho
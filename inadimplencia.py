@@ -0,0 +1,41 @@
+import os
+from datetime import date
+
+from db import transacao
+
+# --- INADIMPLÊNCIA (atrasos e aging de recebíveis, calculados em lote) ---
+
+# Intervalo (s) entre execuções do lote pelo agendador do servidor; 0 = só via cron (manutencao.py)
+INTERVALO_INADIMPLENCIA = int(os.environ.get("PEEGFLOW_INTERVALO_INADIMPLENCIA", "21600"))
+
+# Faixas de dias em atraso, da mais recente para a mais antiga
+FAIXAS_AGING = ('0-30', '31-60', '61-90', '90+')
+
+# Um único UPDATE pelo índice (status, data_vencimento): só as parcelas em aberto já vencidas.
+# Incrementa a versão (uma grade aberta nessas parcelas verá o conflito) sem depender do trigger
+SQL_MARCAR_ATRASADOS = ("UPDATE financeiro SET status = 'Atrasado', versao = versao + 1 "
+                        "WHERE status = 'Aberto' AND data_vencimento < ?")
+
+# Recebíveis atrasados somados por cliente, contrato e faixa (0 = lançamento sem contrato)
+SQL_AGING = ("INSERT INTO financeiro_aging (cliente_id, contrato_id, faixa, total, qtd, referencia) "
+             "SELECT COALESCE(c.cliente_id, 0), COALESCE(f.contrato_id, 0), "
+             "CASE WHEN julianday(:ref) - julianday(f.data_vencimento) <= 30 THEN '0-30' "
+             "WHEN julianday(:ref) - julianday(f.data_vencimento) <= 60 THEN '31-60' "
+             "WHEN julianday(:ref) - julianday(f.data_vencimento) <= 90 THEN '61-90' ELSE '90+' END, "
+             "SUM(COALESCE(f.valor, 0)), COUNT(*), :ref "
+             "FROM financeiro f LEFT JOIN contratos c ON c.id = f.contrato_id "
+             "WHERE f.status = 'Atrasado' AND f.data_vencimento < :ref AND f.tipo = 'Receita' "
+             "GROUP BY 1, 2, 3")
+
+
+def atualizar_inadimplencia(referencia=None):
+    """Marca como Atrasado o que venceu em aberto e refaz o aging, numa transação; devolve os totais.
+
+    `referencia` (date, padrão hoje) é o primeiro dia em que uma parcela ainda não está vencida.
+    """
+    ref = (referencia or date.today()).isoformat()
+    with transacao('financeiro', 'financeiro_aging') as conn:
+        atrasados = conn.execute(SQL_MARCAR_ATRASADOS, (ref,)).rowcount
+        conn.execute("DELETE FROM financeiro_aging")
+        faixas = conn.execute(SQL_AGING, {'ref': ref}).rowcount
+    return {'referencia': ref, 'atrasados': atrasados, 'faixas': faixas}
@@ -0,0 +1,316 @@
+import json
+import os
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from db import run_query, transacao
+from inadimplencia import INTERVALO_INADIMPLENCIA, atualizar_inadimplencia
+
+# --- FILA DE JOBS EM SEGUNDO PLANO ---
+
+JOB_WORKERS = int(os.environ.get("PEEGFLOW_JOB_WORKERS", "2"))
+# Tentativas quando o banco está bloqueado por outra escrita, com espera exponencial
+MAX_TENTATIVAS = 5
+ESPERA_INICIAL_S = 0.5
+# O processo grava um batimento (s) nos jobs que executa; o job em andamento sem batimento há
+# JOB_ABANDONADO_S é de um processo que parou e volta à fila. Deve passar com folga da escrita
+# mais longa de um job (o batimento espera a trava de escrita como qualquer outro)
+BATIMENTO_S = 30
+JOB_ABANDONADO_S = int(os.environ.get("PEEGFLOW_JOB_ABANDONADO_S", "600"))
+
+PENDENTE, EXECUTANDO, CONCLUIDO, ERRO = "Pendente", "Em Andamento", "Concluído", "Erro"
+
+# Jobs periódicos do servidor: tipo -> intervalo (s) entre execuções (0 = desligado)
+AGENDA = {'inadimplencia': INTERVALO_INADIMPLENCIA}
+# De quanto em quanto tempo (s) o agendador confere a agenda
+VERIFICACAO_AGENDA_S = 60
+
+# tipo do job -> função(params, progresso) que devolve um resultado serializável em JSON
+HANDLERS = {}
+# Tipos que não podem ser repetidos do zero (já gravaram parte do trabalho)
+SEM_REPETICAO = set()
+# Tipos com no máximo um job pendente/em andamento: enfileirar de novo devolve o que já existe
+UNICOS = set()
+# tipo -> tabelas escritas pelos jobs que gravam na transação que os conclui: o handler recebe
+# a conexão (params, progresso, conn) e o job só fica Concluído se as escritas forem gravadas
+TRANSACIONAIS = {}
+
+
+def job(tipo, repetir=True, unico=False, tabelas=None):
+    """Registra a função como executora dos jobs de `tipo`"""
+    def registrar(fn):
+        HANDLERS[tipo] = fn
+        if not repetir:
+            SEM_REPETICAO.add(tipo)
+        if unico:
+            UNICOS.add(tipo)
+        if tabelas:
+            TRANSACIONAIS[tipo] = tabelas
+        return fn
+    return registrar
+
+
+def _agora():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _bloqueado(erro):
+    msg = str(erro).lower()
+    return isinstance(erro, sqlite3.OperationalError) and ("locked" in msg or "busy" in msg)
+
+
+class _JobPerdido(Exception):
+    """O job foi retomado por outro processo: a transação do handler é desfeita"""
+
+
+class FilaJobs:
+    """Pool de threads que executa os jobs registrados na tabela `jobs`.
+
+    O progresso fica em memória (a thread do job pode estar segurando a trava de
+    escrita do SQLite); a tabela guarda os estados, tentativas, erro e resultado.
+    """
+
+    def __init__(self, workers=JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="peegflow-job")
+        self._progresso = {}
+        self._lock = threading.Lock()
+        # Identifica este processo (e esta fila) como dono dos jobs que reivindica
+        self.dono = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        self._ativos = set()
+        threading.Thread(target=self._bater, name="peegflow-batimento", daemon=True).start()
+
+    def enfileirar(self, tipo, params=None, usuario=None):
+        if tipo not in HANDLERS:
+            raise ValueError(f"tipo de job desconhecido: {tipo}")
+        # Conferência e INSERT na mesma transação: dois cliques simultâneos não criam dois jobs únicos
+        with transacao('jobs') as conn:
+            if tipo in UNICOS:
+                existente = conn.execute("SELECT id FROM jobs WHERE tipo=? AND status IN (?,?) ORDER BY id LIMIT 1",
+                                         (tipo, PENDENTE, EXECUTANDO)).fetchone()
+                if existente:
+                    return existente[0]
+            job_id = conn.execute("INSERT INTO jobs (tipo, params, status, usuario, criado_em) VALUES (?,?,?,?,?)",
+                                  (tipo, json.dumps(params or {}, default=str), PENDENTE, usuario, _agora())).lastrowid
+        self._executor.submit(self._executar, job_id)
+        return job_id
+
+    def retomar_pendentes(self):
+        """Reenfileira os jobs pendentes e os abandonados (em andamento sem batimento recente).
+
+        Os jobs que outro processo vivo está executando ficam com ele. O abandonado que
+        não pode ser repetido do zero (SEM_REPETICAO) vira Erro em vez de rodar de novo.
+        """
+        limite = (datetime.now() - timedelta(seconds=JOB_ABANDONADO_S)).isoformat(timespec='seconds')
+        abandonado = "status=? AND (batimento IS NULL OR batimento < ?)"
+        sem_repeticao = sorted(SEM_REPETICAO)
+        with transacao('jobs') as conn:
+            conn.execute(f"UPDATE jobs SET status=?, erro=?, concluido_em=? WHERE {abandonado} "
+                         f"AND tipo IN ({','.join('?' * len(sem_repeticao))})",
+                         (ERRO, "Interrompido: o processo que executava o job parou", _agora(), EXECUTANDO, limite,
+                          *sem_repeticao))
+            conn.execute(f"UPDATE jobs SET status=?, dono=NULL WHERE {abandonado}", (PENDENTE, EXECUTANDO, limite))
+            pendentes = [i for (i,) in conn.execute("SELECT id FROM jobs WHERE status=? ORDER BY id", (PENDENTE,))]
+        for job_id in pendentes:
+            self._executor.submit(self._executar, job_id)
+
+    def _bater(self):
+        """Grava o batimento dos jobs em execução nesta fila a cada BATIMENTO_S"""
+        while True:
+            time.sleep(BATIMENTO_S)
+            with self._lock:
+                if not self._ativos:
+                    continue
+            try:
+                with transacao('jobs') as conn:
+                    conn.execute("UPDATE jobs SET batimento=? WHERE dono=? AND status=?", (_agora(), self.dono, EXECUTANDO))
+            except sqlite3.OperationalError:
+                # Banco ocupado: o próximo batimento tenta de novo
+                pass
+
+    def progresso(self, job_id):
+        with self._lock:
+            return self._progresso.get(job_id, (0.0, ""))
+
+    def _reportar(self, job_id, fracao, mensagem=""):
+        with self._lock:
+            self._progresso[job_id] = (max(0.0, min(1.0, fracao)), mensagem)
+
+    def _reivindicar(self, job_id):
+        """(tipo, params) do job pendente, agora Em Andamento com este dono; None se outro já o pegou"""
+        with transacao('jobs') as conn:
+            linha = conn.execute("SELECT tipo, params FROM jobs WHERE id=? AND status=?", (job_id, PENDENTE)).fetchone()
+            if not linha:
+                return None
+            if linha[0] not in HANDLERS:
+                conn.execute("UPDATE jobs SET status=?, erro=?, concluido_em=? WHERE id=?",
+                             (ERRO, f"tipo de job desconhecido: {linha[0]}", _agora(), job_id))
+                return None
+            conn.execute("UPDATE jobs SET status=?, dono=?, batimento=?, iniciado_em=? WHERE id=?",
+                         (EXECUTANDO, self.dono, _agora(), _agora(), job_id))
+        return linha[0], json.loads(linha[1] or "{}")
+
+    def _concluir(self, conn, job_id, tentativa, resultado):
+        """Marca o job como Concluído na transação `conn`; False se ele já não é desta fila"""
+        return conn.execute("UPDATE jobs SET status=?, tentativas=?, resultado=?, mensagem=NULL, concluido_em=? "
+                            "WHERE id=? AND dono=? AND status=?",
+                            (CONCLUIDO, tentativa, json.dumps(resultado, default=str), _agora(), job_id, self.dono,
+                             EXECUTANDO)).rowcount > 0
+
+    def _executar(self, job_id):
+        reivindicado = self._reivindicar(job_id)
+        if reivindicado is None:
+            return
+        tipo, params = reivindicado
+        with self._lock:
+            self._ativos.add(job_id)
+        try:
+            self._rodar(job_id, tipo, params)
+        finally:
+            with self._lock:
+                self._ativos.discard(job_id)
+
+    def _rodar(self, job_id, tipo, params):
+        def progresso(fracao, mensagem=""):
+            self._reportar(job_id, fracao, mensagem)
+
+        tabelas = TRANSACIONAIS.get(tipo)
+        tentativas = 1 if tipo in SEM_REPETICAO else MAX_TENTATIVAS
+        for tentativa in range(1, tentativas + 1):
+            try:
+                if tabelas:
+                    # Escritas do handler e conclusão do job num só commit: o job gravado não roda de novo
+                    with transacao('jobs', *tabelas) as conn:
+                        resultado = HANDLERS[tipo](params, progresso, conn)
+                        if not self._concluir(conn, job_id, tentativa, resultado):
+                            raise _JobPerdido()
+                else:
+                    resultado = HANDLERS[tipo](params, progresso)
+                    with transacao('jobs') as conn:
+                        self._concluir(conn, job_id, tentativa, resultado)
+            except _JobPerdido:
+                return
+            except Exception as e:
+                if _bloqueado(e) and tentativa < tentativas:
+                    run_query("UPDATE jobs SET tentativas=?, mensagem=? WHERE id=?",
+                              (tentativa, f"Banco ocupado, nova tentativa ({tentativa})", job_id))
+                    time.sleep(ESPERA_INICIAL_S * 2 ** (tentativa - 1))
+                    continue
+                run_query("UPDATE jobs SET status=?, tentativas=?, erro=?, concluido_em=? WHERE id=? AND dono=?",
+                          (ERRO, tentativa, "".join(traceback.format_exception_only(e)).strip(), _agora(), job_id,
+                           self.dono))
+                return
+            self._reportar(job_id, 1.0, "Concluído")
+            return
+
+
+@st.cache_resource
+def get_fila():
+    """Uma fila por processo do servidor Streamlit, compartilhada entre sessões"""
+    fila = FilaJobs()
+    fila.retomar_pendentes()
+    return fila
+
+
+def jobs_devidos(agora=None):
+    """Tipos da AGENDA sem job ativo cujo último job foi criado há mais que o intervalo"""
+    agora = agora or datetime.now()
+    devidos = []
+    for tipo, intervalo in AGENDA.items():
+        if intervalo <= 0:
+            continue
+        ultimo = run_query("SELECT status, criado_em FROM jobs WHERE tipo=? ORDER BY id DESC LIMIT 1", (tipo,), fetch=True)
+        if ultimo.empty:
+            devidos.append(tipo)
+        elif ultimo['status'].iloc[0] in (CONCLUIDO, ERRO) and \
+                (agora - datetime.fromisoformat(ultimo['criado_em'].iloc[0])).total_seconds() >= intervalo:
+            devidos.append(tipo)
+    return devidos
+
+
+@st.cache_resource
+def get_agendador():
+    """Thread do processo que enfileira os jobs da AGENDA quando chega a hora (o último job fica na tabela)"""
+    fila = get_fila()
+
+    def conferir():
+        while True:
+            try:
+                for tipo in jobs_devidos():
+                    fila.enfileirar(tipo, usuario="agendador")
+            except sqlite3.OperationalError:
+                # Banco ocupado: confere de novo na próxima volta
+                pass
+            time.sleep(VERIFICACAO_AGENDA_S)
+
+    agendador = threading.Thread(target=conferir, name="peegflow-agendador", daemon=True)
+    agendador.start()
+    return agendador
+
+
+def jobs_por_id(ids):
+    """Estado atual dos jobs (mais recentes primeiro), com o progresso em memória"""
+    if not ids:
+        return run_query("SELECT id, tipo, status, mensagem, erro, resultado FROM jobs WHERE 0", fetch=True)
+    marcadores = ",".join("?" * len(ids))
+    df = run_query(f"SELECT id, tipo, status, mensagem, erro, resultado FROM jobs WHERE id IN ({marcadores}) "
+                   "ORDER BY id DESC", tuple(ids), fetch=True)
+    fila = get_fila()
+    df['progresso'] = [1.0 if s == CONCLUIDO else fila.progresso(int(i))[0] for i, s in zip(df['id'], df['status'])]
+    return df
+
+
+def ultimo_job(tipo, **params):
+    """Job mais recente do tipo cujos parâmetros batem com `params` (Series ou None)"""
+    filtro = "".join(f" AND json_extract(params, '$.{k}') = ?" for k in params)
+    df = run_query(f"SELECT id, status, mensagem, erro, resultado FROM jobs WHERE tipo=?{filtro} ORDER BY id DESC LIMIT 1",
+                   (tipo, *params.values()), fetch=True)
+    return None if df.empty else df.iloc[0]
+
+# --- JOBS ---
+
+@job("contrato", tabelas=('contratos', 'financeiro'))
+def job_contrato(params, progresso, conn):
+    """Cria o contrato e gera as parcelas (na transação que conclui o job)"""
+    from automacao import firmar_contrato
+
+    progresso(0.1, "Gravando contrato e parcelas")
+    ct_id = firmar_contrato(params['cliente_id'], params['tipo'], params['valor'], params['parcelas'], params['inicio'],
+                            params.get('primeiro_vencimento'), params.get('dia_vencimento'), conn=conn)
+    return {'contrato_id': ct_id}
+
+
+@job("demo", unico=True)
+def job_demo(params, progresso):
+    """Popula a base de demonstração"""
+    from demo import gerar_demo_robusta
+
+    progresso(0.05, "Gerando dados de demonstração")
+    gerar_demo_robusta(progresso=lambda f: progresso(0.05 + 0.95 * f, "Gerando dados de demonstração"))
+    return {}
+
+
+@job("importacao", repetir=False)
+def job_importacao(params, progresso):
+    """Importa o arquivo enviado; os blocos já gravados não são refeitos em caso de erro"""
+    from importacao import importar
+
+    try:
+        return importar(params['caminho'], params['tabela'], progresso)
+    finally:
+        if params.get('apagar') and os.path.exists(params['caminho']):
+            os.remove(params['caminho'])
+
+
+@job("inadimplencia")
+def job_inadimplencia(params, progresso):
+    """Marca as parcelas vencidas como Atrasado e recalcula o aging dos recebíveis"""
+    progresso(0.1, "Marcando atrasos e recalculando o aging")
+    return atualizar_inadimplencia()
@@ -0,0 +1,99 @@
+"""Tarefas de manutenção do banco do PeegFlow (para rodar fora do Streamlit ou via cron).
+
+Uso: python manutencao.py {reconstruir-resumo,verificar-resumo,importar,podar-mudancas,inadimplencia,proteger-senhas,senha}
+"""
+import argparse
+import getpass
+import sys
+from datetime import date
+
+from db import init_db, reconstruir_resumo_mensal, verificar_resumo_mensal
+from importacao import LOTE_IMPORTACAO, importar
+from inadimplencia import atualizar_inadimplencia
+from mudancas import MUDANCAS_RETIDAS, podar_mudancas
+from usuarios import definir_senha, proteger_senhas
+
+
+def cmd_reconstruir_resumo(args):
+    reconstruir_resumo_mensal()
+    print("financeiro_mensal reconstruído a partir do livro.")
+
+
+def cmd_verificar_resumo(args):
+    divergencias = verificar_resumo_mensal()
+    if divergencias.empty:
+        print("financeiro_mensal consistente com o livro.")
+        return 0
+    print(divergencias.to_string(index=False))
+    print(f"\n{len(divergencias)} chave(s) divergente(s); rode 'reconstruir-resumo'.", file=sys.stderr)
+    return 1
+
+
+def cmd_importar(args):
+    def progresso(fracao, mensagem):
+        print(f"\r{fracao:6.1%}  {mensagem}", end="", file=sys.stderr, flush=True)
+
+    res = importar(args.arquivo, args.tabela, progresso, rejeitados=args.rejeitados, lote=args.lote)
+    print(file=sys.stderr)
+    print(f"{res['importadas']} de {res['lidas']} linha(s) importada(s) em {res['segundos']:.1f}s "
+          f"({res['linhas_s'] or 0:,} linhas/s).")
+    if res['rejeitadas']:
+        print(f"{res['rejeitadas']} linha(s) recusada(s), com o motivo, em {res['rejeitados']}.", file=sys.stderr)
+        return 1
+
+
+def cmd_podar_mudancas(args):
+    apagadas = podar_mudancas(args.manter)
+    print(f"{apagadas} mudança(s) antiga(s) apagada(s) do log; mantidas as últimas {args.manter}.")
+
+
+def cmd_inadimplencia(args):
+    res = atualizar_inadimplencia(args.data)
+    print(f"{res['atrasados']} lançamento(s) marcado(s) como Atrasado; aging recalculado em "
+          f"{res['faixas']} faixa(s) cliente/contrato (referência {res['referencia']}).")
+
+
+def cmd_proteger_senhas(args):
+    print(f"{proteger_senhas()} senha(s) em texto puro trocada(s) pelo hash.")
+
+
+def cmd_senha(args):
+    senha = getpass.getpass(f"Nova senha de {args.usuario}: ")
+    if senha != getpass.getpass("Repita a senha: "):
+        print("As senhas não conferem.", file=sys.stderr)
+        return 1
+    if not definir_senha(args.usuario, senha):
+        print(f"Usuário {args.usuario} não encontrado.", file=sys.stderr)
+        return 1
+    print(f"Senha de {args.usuario} trocada; as sessões abertas foram encerradas.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("reconstruir-resumo", help="recalcula financeiro_mensal (backfill)").set_defaults(fn=cmd_reconstruir_resumo)
+    sub.add_parser("verificar-resumo", help="compara financeiro_mensal com o livro").set_defaults(fn=cmd_verificar_resumo)
+    imp = sub.add_parser("importar", help="importa CSV/Parquet em blocos para clientes ou financeiro")
+    imp.add_argument("tabela", choices=["clientes", "financeiro"])
+    imp.add_argument("arquivo")
+    imp.add_argument("--lote", type=int, default=LOTE_IMPORTACAO, help="linhas por bloco/transação")
+    imp.add_argument("--rejeitados", help="CSV das linhas recusadas (padrão: ao lado do arquivo)")
+    imp.set_defaults(fn=cmd_importar)
+    poda = sub.add_parser("podar-mudancas", help="apaga o começo do log de mudanças")
+    poda.add_argument("--manter", type=int, default=MUDANCAS_RETIDAS, help="mudanças mais recentes mantidas")
+    poda.set_defaults(fn=cmd_podar_mudancas)
+    ina = sub.add_parser("inadimplencia", help="marca parcelas vencidas como Atrasado e recalcula o aging (cron)")
+    ina.add_argument("--data", type=date.fromisoformat, help="data de referência AAAA-MM-DD (padrão: hoje)")
+    ina.set_defaults(fn=cmd_inadimplencia)
+    sub.add_parser("proteger-senhas", help="troca senhas em texto puro pelo hash (scrypt)").set_defaults(fn=cmd_proteger_senhas)
+    sen = sub.add_parser("senha", help="define a senha de um usuário e encerra suas sessões")
+    sen.add_argument("usuario")
+    sen.set_defaults(fn=cmd_senha)
+    args = parser.parse_args()
+
+    init_db()
+    return args.fn(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
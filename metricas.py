@@ -0,0 +1,151 @@
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+# --- INSTRUMENTAÇÃO (consultas, telas, gráficos e reruns) ---
+
+# Quantas medições ficam em memória (as mais antigas são descartadas)
+METRICAS_BUFFER = int(os.environ.get("PEEGFLOW_METRICAS_BUFFER", "5000"))
+# Se definido, cada medição também é acrescentada a este arquivo JSONL
+METRICAS_LOG = os.environ.get("PEEGFLOW_METRICAS_LOG")
+
+
+def resumir_sql(sql, limite=300):
+    """SQL em uma linha só, para agrupar e exibir"""
+    texto = " ".join(str(sql).split())
+    return texto if len(texto) <= limite else texto[:limite - 1] + "…"
+
+
+def formato_params(params):
+    """Forma dos parâmetros sem os valores: '3' (consulta) ou '500x6' (lote)"""
+    if isinstance(params, dict):
+        return str(len(params))
+    params = list(params) if params is not None else []
+    if params and isinstance(params[0], (tuple, list)):
+        return f"{len(params)}x{len(params[0])}"
+    return str(len(params))
+
+
+class Metricas:
+    """Buffer circular de medições; cada uma é ligada ao rerun da thread que a fez"""
+
+    def __init__(self, tamanho=METRICAS_BUFFER, log=METRICAS_LOG):
+        self.tamanho = tamanho
+        self._medicoes = deque(maxlen=tamanho)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self.log = log
+
+    def registrar(self, tipo, nome, segundos, **extra):
+        medicao = {'tipo': tipo, 'nome': nome, 'ms': segundos * 1000, 'quando': time.time(),
+                   'rerun': getattr(self._local, 'rerun', None), **extra}
+        with self._lock:
+            self._medicoes.append(medicao)
+            if self.log:
+                with open(self.log, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(medicao, ensure_ascii=False, default=str) + "\n")
+
+    @contextmanager
+    def medir(self, tipo, nome, **extra):
+        """Cronometra o bloco; o dicionário devolvido aceita campos extras (ex.: linhas)"""
+        t0 = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            self.registrar(tipo, nome, time.perf_counter() - t0, **extra)
+
+    def cronometrar(self, tipo):
+        """Decorador: mede cada chamada da função com o nome dela"""
+        def decorar(fn):
+            @functools.wraps(fn)
+            def medida(*args, **kwargs):
+                with self.medir(tipo, fn.__name__):
+                    return fn(*args, **kwargs)
+            return medida
+        return decorar
+
+    @contextmanager
+    def rerun(self, pagina=None, inicio=None):
+        """Agrupa as medições de uma execução do script; `info['pagina']` pode ser definido depois.
+
+        `inicio` (perf_counter) permite começar a contar antes dos imports do script:
+        assim o primeiro rerun do processo mede o tempo real até a tela aparecer.
+        """
+        anterior = getattr(self._local, 'rerun', None)
+        self._local.rerun = id_rerun = next(self._ids)
+        info = {'pagina': pagina}
+        t0 = time.perf_counter() if inicio is None else inicio
+        try:
+            yield info
+        finally:
+            # Também quando o script é interrompido por st.rerun() / st.stop()
+            self.registrar("rerun", info['pagina'] or "?", time.perf_counter() - t0, id=id_rerun,
+                           pagina=info['pagina'], primeiro=id_rerun == 1)
+            self._local.rerun = anterior
+
+    def rerun_atual(self):
+        """Id do rerun desta thread, para repassar a threads auxiliares"""
+        return getattr(self._local, 'rerun', None)
+
+    @contextmanager
+    def no_rerun(self, id_rerun):
+        """Liga as medições desta thread ao rerun `id_rerun` (ex.: consultas em paralelo)"""
+        anterior = getattr(self._local, 'rerun', None)
+        self._local.rerun = id_rerun
+        try:
+            yield
+        finally:
+            self._local.rerun = anterior
+
+    def medicoes(self, tipo=None):
+        import pandas as pd
+
+        with self._lock:
+            dados = list(self._medicoes)
+        df = pd.DataFrame(dados, columns=None if dados else ['tipo', 'nome', 'ms', 'quando', 'rerun'])
+        return df if tipo is None else df[df['tipo'] == tipo]
+
+    def percentis(self, tipo):
+        """p50/p95/máximo e contagem por nome, do mais lento (p95) para o mais rápido.
+
+        Leituras servidas pelo cache de consultas ficam de fora (custo ~0).
+        """
+        import pandas as pd
+
+        df = self.medicoes(tipo)
+        if 'cache' in df:
+            df = df[df['cache'].ne(True)]
+        if df.empty:
+            return pd.DataFrame(columns=['nome', 'qtd', 'p50_ms', 'p95_ms', 'max_ms', 'total_ms'])
+        g = df.groupby('nome')['ms']
+        return (pd.DataFrame({'qtd': g.size(), 'p50_ms': g.median(), 'p95_ms': g.quantile(0.95),
+                              'max_ms': g.max(), 'total_ms': g.sum()})
+                .reset_index().sort_values('p95_ms', ascending=False))
+
+    def reruns_lentos(self, n=20):
+        """Reruns mais lentos ainda no buffer, com quantas consultas fizeram e o tempo nelas"""
+        import pandas as pd
+
+        df = self.medicoes()
+        reruns = df[df['tipo'] == "rerun"]
+        if reruns.empty:
+            return pd.DataFrame(columns=['quando', 'pagina', 'ms', 'consultas', 'consultas_ms'])
+        consultas = df[df['tipo'] == "consulta"].groupby('rerun')['ms'].agg(['size', 'sum'])
+        out = reruns.set_index('id')[['quando', 'pagina', 'ms']].join(consultas).fillna({'size': 0, 'sum': 0})
+        out = out.rename(columns={'size': 'consultas', 'sum': 'consultas_ms'}).nlargest(n, 'ms')
+        out['quando'] = [datetime.fromtimestamp(t).strftime("%d/%m %H:%M:%S") for t in out['quando']]
+        return out.reset_index(drop=True)
+
+    def limpar(self):
+        with self._lock:
+            self._medicoes.clear()
+
+
+metricas = Metricas()
@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+
+from db import conexao, invalidar, run_query, transacao
+
+# --- LOG DE MUDANÇAS (sessões relendo só o que mudou) ---
+
+# Intervalo (s) do modo de atualização automática
+INTERVALO_ATUALIZACAO = float(os.environ.get("PEEGFLOW_INTERVALO_ATUALIZACAO", "5"))
+# Idade máxima (s) da última seq lida por quem só faz polling: muitas sessões, uma consulta
+IDADE_SEQ = 1.0
+# Quantas mudanças a poda mantém no log
+MUDANCAS_RETIDAS = int(os.environ.get("PEEGFLOW_MUDANCAS_RETIDAS", "100000"))
+
+_ultima = {'seq': 0, 'quando': float('-inf')}
+_ultima_lock = threading.Lock()
+# Última seq já refletida no cache de consultas deste processo
+_sincronizada = {'seq': None}
+_sincronizada_lock = threading.Lock()
+
+
+def ultima_seq(max_idade=0.0):
+    """Número da última mudança gravada; com max_idade > 0 aceita um valor lido há pouco"""
+    with _ultima_lock:
+        if time.monotonic() - _ultima['quando'] <= max_idade:
+            return _ultima['seq']
+    with conexao() as conn:
+        seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM mudancas").fetchone()[0]
+    with _ultima_lock:
+        _ultima.update(seq=seq, quando=time.monotonic())
+    return seq
+
+
+def mudancas_desde(seq, tabela=None):
+    """Lista de (seq, tabela, linha, operacao) depois de `seq`, opcionalmente de uma tabela só"""
+    sql, args = "SELECT seq, tabela, linha, operacao FROM mudancas WHERE seq > ?", [seq]
+    if tabela:
+        sql, args = sql + " AND tabela = ?", args + [tabela]
+    with conexao() as conn:
+        return conn.execute(sql + " ORDER BY seq", args).fetchall()
+
+
+def _log_cobre(seq):
+    """O log ainda tem tudo depois de `seq`? (a poda pode ter apagado o começo)"""
+    with conexao() as conn:
+        primeira = conn.execute("SELECT MIN(seq) FROM mudancas").fetchone()[0]
+    return primeira is None or primeira <= seq + 1
+
+
+def sincronizar():
+    """Invalida no cache deste processo as tabelas escritas por outros processos; devolve a seq atual.
+
+    Escritas feitas por este processo já invalidam o cache na hora; esta chamada
+    cobre as demais (manutencao.py, outro servidor) lendo só o log novo.
+    """
+    seq = ultima_seq(IDADE_SEQ)
+    with _sincronizada_lock:
+        vista = _sincronizada['seq']
+        if vista is None:
+            # Processo novo: o cache começa vazio, nada a invalidar
+            _sincronizada['seq'] = seq
+        elif seq > vista:
+            tabelas = {t for _, t, _, _ in mudancas_desde(vista)} if _log_cobre(vista) else ()
+            invalidar(*tabelas)
+            _sincronizada['seq'] = seq
+    return seq
+
+
+def podar_mudancas(manter=MUDANCAS_RETIDAS):
+    """Apaga o começo do log, mantendo as `manter` mudanças mais recentes; devolve quantas apagou"""
+    with transacao() as conn:
+        return conn.execute("DELETE FROM mudancas WHERE seq <= (SELECT MAX(seq) FROM mudancas) - ?",
+                            (manter,)).rowcount
+
+
+class FrameIncremental:
+    """DataFrame de uma consulta mantido em dia pelo log: só as linhas alteradas são relidas.
+
+    `sql` lê `tabela` (já com WHERE) e traz a coluna id. Linhas alteradas que deixaram
+    de atender ao filtro, ou foram apagadas, saem do frame; linhas novas que atendem entram.
+    """
+
+    # Ids por consulta ao reler linhas alteradas (abaixo do limite de parâmetros do SQLite)
+    FATIA = 900
+
+    def __init__(self, tabela, sql, args=(), tipos=None):
+        self.tabela, self.sql, self.args, self.tipos = tabela, sql, tuple(args), tipos
+        self.recarregar()
+
+    def recarregar(self):
+        self.seq = ultima_seq()
+        self.df = run_query(f"{self.sql} ORDER BY id", self.args, fetch=True, tipos=self.tipos)
+
+    def atualizar(self):
+        """Aplica as mudanças desde a última leitura; devolve quantas linhas foram relidas (-1: recarga)"""
+        import pandas as pd
+
+        seq = ultima_seq()
+        if seq <= self.seq:
+            return 0
+        log = mudancas_desde(self.seq, self.tabela)
+        if not _log_cobre(self.seq) or any(op == 'R' for _, _, _, op in log):
+            self.recarregar()
+            return -1
+        ids = sorted({linha for _, _, linha, _ in log})
+        frescas = [run_query(f"{self.sql} AND id IN ({','.join('?' * len(fatia))})", self.args + tuple(fatia),
+                             fetch=True, tipos=self.tipos)
+                   for fatia in (ids[i:i + self.FATIA] for i in range(0, len(ids), self.FATIA))]
+        base = self.df[~self.df['id'].isin(ids)]
+        self.df = pd.concat([base, *frescas], ignore_index=True).sort_values('id', ignore_index=True)
+        self.seq = seq
+        return len(ids)
@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# O banco dos testes precisa estar definido antes de importar a camada de dados
+os.environ["PEEGFLOW_DB"] = os.path.join(tempfile.mkdtemp(prefix="peegflow-testes-"), "testes.db")
+# scrypt barato: os testes conferem o formato e o rehash, não o custo
+os.environ.setdefault("PEEGFLOW_SCRYPT_N", "1024")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def banco():
+    """Banco temporário com todas as migrações aplicadas (um por execução dos testes)"""
+    from db import init_db
+
+    init_db()
+    return os.environ["PEEGFLOW_DB"]
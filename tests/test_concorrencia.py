@@ -0,0 +1,45 @@
+import random
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from db import atualizar_versionado, conexao, executar_lote
+
+EDITORES = 8
+EDICOES = 40
+LINHAS = 5
+
+
+def editor(n, ids):
+    """Soma R$ 1 a lançamentos sorteados como a grade: lê, grava valor + 1 e refaz o conflito.
+
+    Devolve os erros de banco travado (busy_timeout estourado).
+    """
+    rnd = random.Random(n)
+    travados = 0
+    for _ in range(EDICOES):
+        i = rnd.choice(ids)
+        while True:
+            try:
+                with conexao() as conn:
+                    valor, versao = conn.execute("SELECT valor, versao FROM financeiro WHERE id=?", (i,)).fetchone()
+                if not atualizar_versionado('financeiro', ['valor'], [(valor + 1, i, versao)]):
+                    break
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                travados += 1
+    return travados
+
+
+def test_edicao_concorrente_nao_perde_somas(banco):
+    executar_lote("INSERT INTO financeiro (tipo, categoria, valor, data_vencimento, status) "
+                  "VALUES ('Receita', 'Concorrência', 0, '2000-01-10', 'Pago')", [()] * LINHAS)
+    with conexao() as conn:
+        ids = [i for (i,) in conn.execute("SELECT id FROM financeiro WHERE categoria='Concorrência'")]
+    with ThreadPoolExecutor(max_workers=EDITORES) as pool:
+        travados = sum(pool.map(lambda n: editor(n, ids), range(EDITORES)))
+    with conexao() as conn:
+        total = conn.execute(f"SELECT SUM(valor) FROM financeiro WHERE id IN ({','.join('?' * len(ids))})",
+                             ids).fetchone()[0]
+    assert travados == 0
+    assert total == EDITORES * EDICOES
@@ -0,0 +1,47 @@
+import tracemalloc
+
+import pytest
+
+from db import transacao
+from exportacao import disponivel, exportar
+
+# Linhas por bloco nos testes: menor que o menor relatório, para os dois tamanhos passarem por vários blocos
+LOTE = 5_000
+# Teto do pico de memória de uma exportação (MB), qualquer que seja o tamanho do relatório
+TETO_MB = 16
+
+SQL = ("SELECT id, contrato_id, tipo, categoria, valor, data_vencimento, status FROM financeiro "
+       "WHERE id <= ? ORDER BY id")
+
+
+@pytest.fixture(scope="module")
+def livro(banco):
+    """100 mil lançamentos no banco de testes; devolve o maior id"""
+    with transacao('financeiro') as conn:
+        inicio = conn.execute("SELECT COALESCE(MAX(id), 0) FROM financeiro").fetchone()[0]
+        conn.execute("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000) "
+                     "INSERT INTO financeiro (contrato_id, tipo, categoria, valor, data_vencimento, status) "
+                     "SELECT i % 500, 'Receita', 'Parcela ' || (i % 12 + 1) || '/12', i * 1.25, "
+                     "date('2024-01-01', '+' || (i % 730) || ' days'), 'Aberto' FROM n")
+    return inicio
+
+
+def pico_mb(formato, ultimo_id):
+    tracemalloc.start()
+    try:
+        exportar(SQL, (ultimo_id,), formato, tamanho=LOTE).close()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("formato", ["CSV", "Parquet", "XLSX"])
+def test_pico_de_memoria_nao_cresce_com_o_relatorio(livro, formato):
+    if not disponivel(formato):
+        pytest.skip(f"{formato} indisponível neste ambiente")
+    # Fora da medição: o import do escritor (pyarrow, openpyxl) não é memória da exportação
+    exportar(SQL, (livro + 10,), formato).close()
+    pequeno, grande = pico_mb(formato, livro + 10_000), pico_mb(formato, livro + 100_000)
+    assert grande < TETO_MB
+    # 10x mais linhas, mesmo pico (folga para o ruído do alocador)
+    assert grande < pequeno * 1.5 + 1
@@ -0,0 +1,61 @@
+import json
+from datetime import datetime, timedelta
+
+import jobs
+from db import conexao, transacao
+from jobs import CONCLUIDO, EXECUTANDO, PENDENTE, FilaJobs, job
+
+
+@job("teste_cliente", tabelas=('clientes',))
+def job_teste_cliente(params, progresso, conn):
+    conn.execute("INSERT INTO clientes (nome) VALUES (?)", (params['nome'],))
+    return {}
+
+
+def criar_job(nome, status=PENDENTE, dono=None, batimento=None):
+    with transacao('jobs') as conn:
+        return conn.execute("INSERT INTO jobs (tipo, params, status, dono, batimento) VALUES (?,?,?,?,?)",
+                            ("teste_cliente", json.dumps({'nome': nome}), status, dono, batimento)).lastrowid
+
+
+def estado(job_id):
+    with conexao() as conn:
+        return conn.execute("SELECT status, dono FROM jobs WHERE id=?", (job_id,)).fetchone()
+
+
+def clientes(nome):
+    with conexao() as conn:
+        return conn.execute("SELECT COUNT(*) FROM clientes WHERE nome=?", (nome,)).fetchone()[0]
+
+
+def test_job_conclui_na_transacao_das_escritas(banco):
+    fila = FilaJobs(workers=1)
+    job_id = criar_job("cliente_job")
+    fila._executar(job_id)
+    assert estado(job_id) == (CONCLUIDO, fila.dono) and clientes("cliente_job") == 1
+    # Já concluído: executar de novo não grava outra vez
+    fila._executar(job_id)
+    assert clientes("cliente_job") == 1
+
+
+def test_job_retomado_por_outro_desfaz_as_escritas(banco):
+    fila = FilaJobs(workers=1)
+    job_id = criar_job("cliente_perdido")
+    tipo, params = fila._reivindicar(job_id)
+    # Sem batimento a tempo, outro processo retomou o job antes deste gravar
+    with transacao('jobs') as conn:
+        conn.execute("UPDATE jobs SET dono='outro' WHERE id=?", (job_id,))
+    fila._rodar(job_id, tipo, params)
+    assert estado(job_id) == (EXECUTANDO, "outro") and clientes("cliente_perdido") == 0
+
+
+def test_retomar_so_os_jobs_abandonados(banco, monkeypatch):
+    submetidos = []
+    fila = FilaJobs(workers=1)
+    monkeypatch.setattr(fila._executor, "submit", lambda fn, job_id: submetidos.append(job_id))
+    antigo = (datetime.now() - timedelta(seconds=jobs.JOB_ABANDONADO_S + 60)).isoformat(timespec='seconds')
+    vivo = criar_job("cliente_vivo", EXECUTANDO, "outro", datetime.now().isoformat(timespec='seconds'))
+    abandonado = criar_job("cliente_abandonado", EXECUTANDO, "outro", antigo)
+    fila.retomar_pendentes()
+    assert estado(vivo) == (EXECUTANDO, "outro")
+    assert estado(abandonado) == (PENDENTE, None) and abandonado in submetidos and vivo not in submetidos
@@ -0,0 +1,5 @@
+from consultas import verificar_planos
+
+
+def test_consultas_indexadas_usam_indice(banco):
+    assert verificar_planos() == {}
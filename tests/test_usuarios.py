@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+
+import mudancas
+import usuarios
+from db import DB_PATH, conexao, transacao
+from usuarios import autenticar, criar_sessao, definir_senha, encerrar_sessao, hash_senha, perfis, protegida, sessao
+
+
+def criar_usuario(usuario, senha_guardada):
+    with transacao('usuarios') as conn:
+        return conn.execute("INSERT INTO usuarios (usuario, senha, nome, cargo, perfil) VALUES (?,?,?,?,?)",
+                            (usuario, senha_guardada, f"Nome {usuario}", "Teste", "user")).lastrowid
+
+
+def senha_guardada(usuario_id):
+    with conexao() as conn:
+        return conn.execute("SELECT senha FROM usuarios WHERE id=?", (usuario_id,)).fetchone()[0]
+
+
+def test_senha_em_texto_puro_e_regravada_no_login(banco):
+    uid = criar_usuario("legado", "s3nha")
+    assert autenticar("legado", "s3nha") == (uid, "Nome legado", "user")
+    guardada = senha_guardada(uid)
+    assert protegida(guardada) and "s3nha" not in guardada
+    # A senha continua valendo depois do rehash
+    assert autenticar("legado", "s3nha") == (uid, "Nome legado", "user")
+
+
+def test_hash_com_custo_antigo_e_regravado_no_login(banco, monkeypatch):
+    with monkeypatch.context() as m:
+        m.setattr(usuarios, "SCRYPT_N", usuarios.SCRYPT_N // 2)
+        antiga = hash_senha("s3nha")
+    uid = criar_usuario("custo_antigo", antiga)
+    assert autenticar("custo_antigo", "s3nha") == (uid, "Nome custo_antigo", "user")
+    nova = senha_guardada(uid)
+    assert nova != antiga and nova.startswith(f"scrypt${usuarios.SCRYPT_N}$")
+
+
+@pytest.fixture(scope="module")
+def recusado(banco):
+    return criar_usuario("recusado", hash_senha("s3nha"))
+
+
+@pytest.mark.parametrize("usuario, senha", [("nao_existe", "s3nha"), ("recusado", "errada")])
+def test_usuario_desconhecido_ou_senha_errada_sao_recusados(recusado, usuario, senha):
+    assert autenticar(usuario, senha) is None
+
+
+def test_token_revogado_nao_retoma_a_sessao(banco):
+    uid = criar_usuario("sessao", hash_senha("s3nha"))
+    token = criar_sessao(uid)
+    assert sessao(token) == (uid, "Nome sessao", "user")
+    encerrar_sessao(token)
+    assert sessao(token) is None
+    # Trocar a senha também encerra as sessões abertas
+    outro = criar_sessao(uid)
+    assert definir_senha("sessao", "nova")
+    assert sessao(outro) is None
+
+
+def test_perfis_veem_escrita_de_outro_processo(banco, monkeypatch):
+    monkeypatch.setattr(mudancas, "IDADE_SEQ", 0.0)
+    uid = criar_usuario("externo", hash_senha("s3nha"))
+    assert perfis()[uid]['nome'] == "Nome externo"
+    # Conexão fora da camada de dados, como a de manutencao.py: não invalida o cache deste processo
+    conn = sqlite3.connect(DB_PATH)
+    with conn:
+        conn.execute("UPDATE usuarios SET nome='Renomeado' WHERE id=?", (uid,))
+    conn.close()
+    assert perfis()[uid]['nome'] == "Renomeado"
@@ -0,0 +1,43 @@
+from db import atualizar_versionado, conexao, executar_lote, transacao
+from inadimplencia import SQL_MARCAR_ATRASADOS
+
+
+def lancamento():
+    with transacao('financeiro') as conn:
+        return conn.execute("INSERT INTO financeiro (tipo, categoria, valor, data_vencimento, status) "
+                            "VALUES ('Receita', 'Teste', 100, '2000-01-10', 'Aberto')").lastrowid
+
+
+def mudancas(linha):
+    with conexao() as conn:
+        return conn.execute("SELECT operacao FROM mudancas WHERE tabela='financeiro' AND linha=? ORDER BY seq",
+                            (linha,)).fetchall()
+
+
+def versao(linha):
+    with conexao() as conn:
+        return conn.execute("SELECT versao FROM financeiro WHERE id=?", (linha,)).fetchone()[0]
+
+
+def test_update_sem_versao_incrementa_e_registra_uma_mudanca(banco):
+    i = lancamento()
+    executar_lote("UPDATE financeiro SET valor=? WHERE id=?", [(150, i)])
+    assert versao(i) == 1 and mudancas(i) == [('I',), ('U',)]
+    # A grade que leu a versão 0 não grava por cima da escrita em lote
+    assert atualizar_versionado('financeiro', ['valor'], [(175, i, 0)]) == [i]
+
+
+def test_update_versionado_incrementa_no_mesmo_comando(banco):
+    i = lancamento()
+    assert atualizar_versionado('financeiro', ['valor'], [(150, i, 0)]) == []
+    assert versao(i) == 1 and mudancas(i) == [('I',), ('U',)]
+    # A versão lida ficou para trás: a segunda gravação é recusada
+    assert atualizar_versionado('financeiro', ['valor'], [(175, i, 0)]) == [i]
+    assert versao(i) == 1
+
+
+def test_marcar_atrasados_incrementa_versao(banco):
+    i = lancamento()
+    with transacao('financeiro') as conn:
+        conn.execute(SQL_MARCAR_ATRASADOS, ('2000-02-01',))
+    assert versao(i) == 1 and mudancas(i) == [('I',), ('U',)]
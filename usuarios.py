@@ -0,0 +1,180 @@
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from db import conexao, transacao, versoes
+from mudancas import sincronizar
+
+# --- USUÁRIOS (senhas com scrypt, cadastro em cache e sessões por token) ---
+# Sem pandas aqui: o login e a retomada de sessão rodam antes do dashboard carregá-lo
+
+# Custo do scrypt: N dobra tempo e memória (128 * r * N bytes por cálculo, 16 MiB no padrão).
+# Ajuste pelo login_N_sessoes do benchmark.py: o login deve ficar na casa das dezenas de ms
+SCRYPT_N = int(os.environ.get("PEEGFLOW_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = 8
+SCRYPT_P = 1
+# Cálculos de scrypt ao mesmo tempo: logins simultâneos acima disto esperam a vez em vez de
+# disputar CPU e memória (o hashlib solta o GIL durante o cálculo)
+KDF_SIMULTANEOS = int(os.environ.get("PEEGFLOW_KDF_SIMULTANEOS", str(os.cpu_count() or 1)))
+# Validade do token de sessão (horas) e o cookie que o guarda no navegador. O Streamlit só grava
+# cookies por JavaScript, então o cookie não pode ser HttpOnly: a validade curta limita o estrago
+# de um token lido por um script na página
+SESSAO_HORAS = float(os.environ.get("PEEGFLOW_SESSAO_HORAS", "12"))
+COOKIE_SESSAO = "peegflow_sessao"
+
+_kdf_vagas = threading.BoundedSemaphore(KDF_SIMULTANEOS)
+# chave -> (versões de usuarios quando foi lido, valor); uma escrita em usuarios invalida
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _derivar(senha, sal, n, r, p):
+    with _kdf_vagas:
+        return hashlib.scrypt(senha.encode(), salt=sal, n=n, r=r, p=p, maxmem=256 * r * (n + p), dklen=32)
+
+
+def hash_senha(senha):
+    """Texto guardado em usuarios.senha: scrypt$N$r$p$sal$hash (sal aleatório por senha)"""
+    sal = secrets.token_bytes(16)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${sal.hex()}${_derivar(senha, sal, SCRYPT_N, SCRYPT_R, SCRYPT_P).hex()}"
+
+
+def protegida(guardada):
+    return bool(guardada) and guardada.startswith("scrypt$")
+
+
+def verificar_senha(senha, guardada):
+    """(confere, precisa_rehash): senhas antigas em texto puro, ou com outro custo, pedem rehash"""
+    if not guardada:
+        return False, False
+    if not protegida(guardada):
+        return hmac.compare_digest(senha.encode(), guardada.encode()), True
+    _, n, r, p, sal, esperado = guardada.split("$")
+    n, r, p = int(n), int(r), int(p)
+    confere = hmac.compare_digest(_derivar(senha, bytes.fromhex(sal), n, r, p), bytes.fromhex(esperado))
+    return confere, (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+@lru_cache(maxsize=1)
+def _hash_ficticio():
+    """Usuário inexistente também paga um scrypt: o tempo de resposta não revela quem existe"""
+    return hash_senha(secrets.token_urlsafe(16))
+
+
+def autenticar(usuario, senha):
+    """(id, nome, perfil) do usuário ou None; a senha antiga (texto puro ou outro custo) é regravada"""
+    with conexao() as conn:
+        linha = conn.execute("SELECT id, senha, nome, perfil FROM usuarios WHERE usuario=?", (usuario,)).fetchone()
+    confere, rehash = verificar_senha(senha, linha[1] if linha else _hash_ficticio())
+    if not (linha and confere):
+        return None
+    if rehash:
+        # O scrypt fica fora da transação; "AND senha=?" não sobrescreve uma troca feita no meio tempo
+        nova = hash_senha(senha)
+        with transacao('usuarios') as conn:
+            conn.execute("UPDATE usuarios SET senha=? WHERE id=? AND senha=?", (nova, linha[0], linha[1]))
+    return linha[0], linha[2], linha[3]
+
+
+def definir_senha(usuario, senha):
+    """Troca a senha e encerra as sessões abertas do usuário; False se ele não existe"""
+    nova = hash_senha(senha)
+    with transacao('usuarios', 'sessoes') as conn:
+        linha = conn.execute("SELECT id FROM usuarios WHERE usuario=?", (usuario,)).fetchone()
+        if not linha:
+            return False
+        conn.execute("UPDATE usuarios SET senha=? WHERE id=?", (nova, linha[0]))
+        conn.execute("DELETE FROM sessoes WHERE usuario_id=?", (linha[0],))
+    return True
+
+
+def proteger_senhas(conn=None):
+    """Troca as senhas ainda em texto puro pelo hash; devolve quantas foram protegidas"""
+    def proteger(conn):
+        legadas = [(u, s) for u, s in conn.execute("SELECT id, senha FROM usuarios") if s and not protegida(s)]
+        conn.executemany("UPDATE usuarios SET senha=? WHERE id=?", [(hash_senha(s), u) for u, s in legadas])
+        return len(legadas)
+
+    if conn is not None:
+        return proteger(conn)
+    with transacao('usuarios') as conn:
+        return proteger(conn)
+
+# --- CADASTRO EM CACHE (perfis e equipe para os selectboxes) ---
+
+def _cacheado(chave, carregar):
+    """Valor de `carregar()` guardado até a próxima escrita em usuarios (deste ou de outro processo).
+
+    As escritas de outros processos (manutencao.py senha, outro servidor) chegam pelo log
+    de mudanças: sincronizar() antes de conferir a versão, com atraso de até IDADE_SEQ.
+    """
+    sincronizar()
+    versao = versoes(('usuarios',))
+    with _cache_lock:
+        item = _cache.get(chave)
+        if item and item[0] == versao:
+            return item[1]
+    valor = carregar()
+    with _cache_lock:
+        _cache[chave] = (versao, valor)
+    return valor
+
+
+def perfis():
+    """id -> {usuario, nome, cargo, perfil} de todos os usuários"""
+    def carregar():
+        with conexao() as conn:
+            return {i: {'usuario': u, 'nome': n, 'cargo': c, 'perfil': p}
+                    for i, u, n, c, p in conn.execute("SELECT id, usuario, nome, cargo, perfil FROM usuarios")}
+    return _cacheado('perfis', carregar)
+
+
+def equipe():
+    """Nomes da equipe em ordem alfabética (opções de Responsável/Líder)"""
+    return _cacheado('equipe', lambda: sorted({p['nome'] for p in perfis().values() if p['nome']}))
+
+# --- SESSÕES (token no cookie; o banco guarda só o sha256) ---
+
+def _digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _agora():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def criar_sessao(usuario_id, horas=SESSAO_HORAS):
+    """Novo token de sessão do usuário (as sessões vencidas são apagadas de passagem)"""
+    token = secrets.token_urlsafe(32)
+    expira = (datetime.now() + timedelta(hours=horas)).isoformat(timespec='seconds')
+    with transacao('sessoes') as conn:
+        conn.execute("DELETE FROM sessoes WHERE expira_em <= ?", (_agora(),))
+        conn.execute("INSERT INTO sessoes (token, usuario_id, criada_em, expira_em) VALUES (?,?,?,?)",
+                     (_digest(token), usuario_id, _agora(), expira))
+    return token
+
+
+def sessao(token):
+    """(id, nome, perfil) do dono de um token válido ou None: busca pela chave primária, sem scrypt.
+
+    Além do vencimento gravado, a sessão precisa ter sido criada dentro da validade atual
+    (SESSAO_HORAS): encurtar a validade vale também para as sessões já abertas.
+    """
+    if not token:
+        return None
+    limite = (datetime.now() - timedelta(hours=SESSAO_HORAS)).isoformat(timespec='seconds')
+    with conexao() as conn:
+        linha = conn.execute("SELECT usuario_id FROM sessoes WHERE token=? AND expira_em > ? AND criada_em > ?",
+                             (_digest(token), _agora(), limite)).fetchone()
+    perfil = linha and perfis().get(linha[0])
+    return (linha[0], perfil['nome'], perfil['perfil']) if perfil else None
+
+
+def encerrar_sessao(token):
+    if token:
+        with transacao('sessoes') as conn:
+            conn.execute("DELETE FROM sessoes WHERE token=?", (_digest(token),))